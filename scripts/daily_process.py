@@ -30,7 +30,7 @@ async def main():
     settings = get_settings()
     processor = ClaudeProcessor(settings.vault_path, settings.todoist_api_key)
     git = VaultGit(settings.vault_path)
-    result = processor.process_daily(date.today())
+    result = await processor.process_daily(date.today())
     if 'error' in result:
         report = f'❌ Ошибка: {result["error"]}'
     else:
@@ -45,6 +45,7 @@ async def main():
             await bot.send_message(chat_id=user_id, text=report, parse_mode=None)
     finally:
         await bot.session.close()
+    await processor.drain()  # Day summary for the weekly digest
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""Update the vault graph index and print its statistics."""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from d_brain.config import get_settings
+from d_brain.services.graph import GraphBuilder
+from d_brain.services.manifest import VaultManifest
+from d_brain.services.state import ensure_state_dir
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Update the graph index; with --apply, also add related links."""
+    settings = get_settings()
+    state_dir = ensure_state_dir(settings.vault_path)
+    manifest = VaultManifest(settings.vault_path, state_dir / "manifest.json")
+    graph = GraphBuilder(settings.vault_path, state_dir / "graph.json", manifest)
+
+    update = graph.update(apply="--apply" in sys.argv[1:])
+    logger.info(
+        "Graph: %d notes, %d links, %d orphans (%d re-parsed, %d removed)",
+        update.stats["notes"],
+        update.stats["links"],
+        update.stats["orphans"],
+        update.reparsed,
+        update.removed,
+    )
+    for path in update.linked:
+        logger.info("Linked %s", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Move attachments from the vault's git history into the blob store.
+
+Moves every file under vault/attachments into ATTACHMENT_STORE, leaves a
+symlink and a pointer note in its place, and commits the switch. Files
+already in git history stay there; shrinking the repository itself takes
+a history rewrite (e.g. `git filter-repo --path attachments
+--invert-paths`) and a force push, which is left to the vault's owner.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from d_brain.config import get_settings
+from d_brain.services.attachments import POINTER_SUFFIX, BlobStoreBackend
+from d_brain.services.git import VaultGit
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Migrate attachments; pass --no-commit to leave git alone."""
+    settings = get_settings()
+    if not settings.attachment_store:
+        logger.error("ATTACHMENT_STORE is not set")
+        sys.exit(1)
+
+    backend = BlobStoreBackend(settings.vault_path, settings.attachment_store)
+    attachments_dir = settings.attachments_path
+    files = [
+        path
+        for path in sorted(attachments_dir.rglob("*"))
+        if path.is_file()
+        and not path.is_symlink()
+        and not path.name.startswith(".")
+        and not path.name.endswith(POINTER_SUFFIX)
+    ]
+    total = 0
+    for path in files:
+        relative_path = path.relative_to(settings.vault_path).as_posix()
+        total += path.stat().st_size
+        backend.put(path, relative_path)
+    logger.info("Moved %d attachments (%d bytes) to the blob store", len(files), total)
+
+    if not files or "--no-commit" in sys.argv[1:]:
+        return
+    git = VaultGit(settings.vault_path)
+    # A path-scoped commit would take the symlinks from the working tree
+    # again, so commit the index as staged by a full scan
+    if git.untrack([attachments_dir]) and git.commit_and_push(
+        "chore: move attachments to blob store"
+    ):
+        logger.info("Committed pointer notes")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,10 +31,29 @@ CHAT_ID="${ALLOWED_USER_IDS//[\[\]]/}"  # remove brackets from [123456]
 
 echo "=== d-brain processing for $TODAY ==="
 
+# Don't overlap with a /process run from the bot (same lock as ClaudeProcessor)
+exec 9>"$PROJECT_DIR/.process.lock"
+flock 9
+
+# Use the bot's warm MCP servers when its bridge is up, npx cold start otherwise.
+# The bridge answers 401 without its token (the generated config passes it
+# to Claude), so the probe sends it too
+MCP_CONFIG="$PROJECT_DIR/mcp-config.json"
+BRIDGE_CONFIG="$VAULT_DIR/.d-brain/mcp-config.json"
+BRIDGE_TOKEN_FILE="$VAULT_DIR/.d-brain/mcp-bridge.token"
+if [ -f "$BRIDGE_CONFIG" ] && [ -f "$BRIDGE_TOKEN_FILE" ] \
+    && curl -sf -m 2 -o /dev/null -X POST \
+    -H "Content-Type: application/json" \
+    -H "Authorization: Bearer $(cat "$BRIDGE_TOKEN_FILE")" \
+    -d '{"jsonrpc":"2.0","id":1,"method":"ping"}' \
+    "$(grep -o 'http://[^"]*' "$BRIDGE_CONFIG" | head -1)"; then
+    MCP_CONFIG="$BRIDGE_CONFIG"
+fi
+
 # Run Claude from vault/ for context (reads vault/.claude/CLAUDE.md)
 cd "$VAULT_DIR"
 REPORT=$(claude --print --dangerously-skip-permissions \
-    --mcp-config "$PROJECT_DIR/mcp-config.json" \
+    --mcp-config "$MCP_CONFIG" \
     -p "Today is $TODAY. Execute daily processing according to dbrain-processor skill.
 
 CRITICAL: MCP loads in 10-30 seconds. You are NOT in subprocess — MCP IS running, just initializing.
@@ -59,9 +78,7 @@ REPORT_CLEAN=$(echo "$REPORT" | sed '/<!--/,/-->/d')
 
 # Rebuild vault graph (keeps structure up to date)
 echo "=== Rebuilding vault graph ==="
-cd "$VAULT_DIR"
-uv run .claude/skills/graph-builder/scripts/analyze.py || echo "Graph rebuild failed (non-critical)"
-cd "$PROJECT_DIR"
+uv run python scripts/graph.py || echo "Graph rebuild failed (non-critical)"
 
 # Git commit
 git add -A
@@ -85,4 +102,8 @@ if [ -n "$REPORT_CLEAN" ] && [ -n "$CHAT_ID" ]; then
     fi
 fi
 
+# Cache today's summary for the weekly digest (after the report is sent)
+echo "=== Summarizing the day ==="
+uv run python scripts/summarize_days.py || echo "Day summary failed (non-critical)"
+
 echo "=== Done ==="
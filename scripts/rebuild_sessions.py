@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""Rebuild session indexes and usage counters from the raw JSONL logs."""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from d_brain.config import get_settings
+from d_brain.services.session import SessionStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Rebuild the index of every session log (or of the given user IDs)."""
+    settings = get_settings()
+    session = SessionStore(settings.vault_path)
+
+    user_ids = [int(arg) for arg in sys.argv[1:]] or session.list_users()
+    for user_id in user_ids:
+        index = session.rebuild_index(user_id)
+        total = sum(sum(counts.values()) for counts in index["counts"].values())
+        logger.info(
+            "Rebuilt session index for %s: %d entries over %d days",
+            user_id,
+            total,
+            len(index["counts"]),
+        )
+
+
+if __name__ == "__main__":
+    main()
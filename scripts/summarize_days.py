@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""Cache day summaries for the weekly digest.
+
+Run by process.sh after the scheduled daily processing, like /process does
+in the bot, so the weekly digest only has to summarize days that changed
+since. Summarizes today, or the ISO dates given as arguments.
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from d_brain.config import get_settings
+from d_brain.services.processor import ClaudeProcessor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Summarize the given days (default: today)."""
+    settings = get_settings()
+    processor = ClaudeProcessor(settings.vault_path, settings.todoist_api_key)
+    days = [date.fromisoformat(arg) for arg in sys.argv[1:]] or [date.today()]
+
+    summaries = await processor.summarize_days(days)
+    logger.info("Summarized %d of %d days", len(summaries), len(days))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -32,7 +32,7 @@ async def main() -> None:
 
     logger.info("Starting weekly digest generation...")
 
-    result = processor.generate_weekly()
+    result = await processor.generate_weekly()
 
     if "error" in result:
         report = f"Error: {result['error']}"
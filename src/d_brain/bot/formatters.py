@@ -200,3 +200,43 @@ def format_empty_daily() -> str:
         "📭 <b>Нет записей для обработки</b>\n\n"
         "<i>Добавьте голосовые сообщения или текст в течение дня</i>"
     )
+
+
+def format_progress(
+    title: str,
+    elapsed: int,
+    last_action: str = "",
+    files_written: int = 0,
+    todoist_calls: int = 0,
+    tool_calls: int = 0,
+    queue_position: int = 0,
+) -> str:
+    """Format status message of a running Claude job.
+
+    Args:
+        title: What is running, e.g. "Processing..."
+        elapsed: Seconds since the job started
+        last_action: Most recent tool call
+        files_written: Number of distinct files edited so far
+        todoist_calls: Number of Todoist MCP calls so far
+        tool_calls: Total number of tool calls so far
+        queue_position: Place in the job queue, 0 if already running
+
+    Returns:
+        Formatted HTML message
+    """
+    if queue_position:
+        return (
+            f"🕒 {html.escape(title)}\n"
+            f"<i>В очереди: {queue_position} ({elapsed // 60}m {elapsed % 60}s)</i>"
+        )
+
+    lines = [f"⏳ {html.escape(title)} ({elapsed // 60}m {elapsed % 60}s)"]
+    if last_action:
+        lines.append(f"🔧 <code>{html.escape(last_action[:100])}</code>")
+    if tool_calls:
+        lines.append(
+            f"<i>Шагов: {tool_calls} · Файлов изменено: {files_written}"
+            f" · Todoist: {todoist_calls}</i>"
+        )
+    return "\n".join(lines)
@@ -2,11 +2,14 @@
 
 from d_brain.bot.handlers import (
     buttons,
+    cancel,
     commands,
     do,
     forward,
     photo,
     process,
+    search,
+    tasks,
     text,
     voice,
     weekly,
@@ -14,11 +17,14 @@ from d_brain.bot.handlers import (
 
 __all__ = [
     "buttons",
+    "cancel",
     "commands",
     "do",
     "forward",
     "photo",
     "process",
+    "search",
+    "tasks",
     "text",
     "voice",
     "weekly",
@@ -0,0 +1,24 @@
+"""Cancel button handler for running Claude jobs."""
+
+import logging
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+
+from d_brain.bot.keyboards import CANCEL_PREFIX
+from d_brain.services.container import ServiceContainer
+
+router = Router(name="cancel")
+logger = logging.getLogger(__name__)
+
+
+@router.callback_query(F.data.startswith(CANCEL_PREFIX))
+async def cb_cancel(callback: CallbackQuery, services: ServiceContainer) -> None:
+    """Handle the cancel button under a status message."""
+    job_id = (callback.data or "").removeprefix(CANCEL_PREFIX)
+
+    if services.jobs.cancel(job_id):
+        logger.info("Job %s cancelled by user %s", job_id, callback.from_user.id)
+        await callback.answer("Отменяю...")
+    else:
+        await callback.answer("Задача уже завершена")
@@ -7,9 +7,7 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from d_brain.bot.keyboards import get_main_keyboard
-from d_brain.config import get_settings
-from d_brain.services.session import SessionStore
-from d_brain.services.storage import VaultStorage
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="commands")
 
@@ -30,6 +28,8 @@ async def cmd_start(message: Message) -> None:
         "/process - обработать записи\n"
         "/do - выполнить произвольный запрос\n"
         "/weekly - недельный дайджест\n"
+        "/tasks - задачи на сегодня\n"
+        "/search - поиск по заметкам\n"
         "/help - справка",
         reply_markup=get_main_keyboard(),
     )
@@ -50,38 +50,36 @@ async def cmd_help(message: Message) -> None:
         "/status - сколько записей сегодня\n"
         "/process - обработать записи\n"
         "/do - выполнить произвольный запрос\n"
-        "/weekly - недельный дайджест\n\n"
-        "<i>Пример: /do перенеси просроченные задачи на понедельник</i>"
+        "/weekly - недельный дайджест\n"
+        "/tasks - задачи на сегодня\n"
+        "/search - поиск по заметкам\n\n"
+        "<i>Пример: /do перенеси просроченные задачи на понедельник</i>\n"
+        "<i>Поиск: /search термез #horeca type:task</i>"
     )
 
 
 @router.message(Command("status"))
-async def cmd_status(message: Message) -> None:
+async def cmd_status(message: Message, services: ServiceContainer) -> None:
     """Handle /status command."""
     user_id = message.from_user.id if message.from_user else 0
-    settings = get_settings()
-    storage = VaultStorage(settings.vault_path)
+    session = services.session
 
     # Log command
-    session = SessionStore(settings.vault_path)
     session.append(user_id, "command", cmd="/status")
 
     today = date.today()
-    content = storage.read_daily(today)
+    counts = services.storage.entry_counts(today)
 
-    if not content:
+    if not counts:
         await message.answer(f"📅 <b>{today}</b>\n\nЗаписей пока нет.")
         return
 
-    lines = content.strip().split("\n")
-    entries = [line for line in lines if line.startswith("## ")]
-
-    voice_count = sum(1 for e in entries if "[voice]" in e)
-    text_count = sum(1 for e in entries if "[text]" in e)
-    photo_count = sum(1 for e in entries if "[photo]" in e)
-    forward_count = sum(1 for e in entries if "[forward from:" in e)
+    voice_count = counts["voice"]
+    text_count = counts["text"]
+    photo_count = counts["photo"]
+    forward_count = counts["forward"]
 
-    total = len(entries)
+    total = counts.total()
 
     # Get weekly stats from session
     week_stats = ""
@@ -91,6 +89,10 @@ async def cmd_status(message: Message) -> None:
         for entry_type, count in sorted(stats.items()):
             week_stats += f"\n• {entry_type}: {count}"
 
+    pending = services.commit_worker.pending
+    if pending:
+        week_stats += f"\n\n⏳ Ожидают синхронизации: {pending}"
+
     await message.answer(
         f"📅 <b>{today}</b>\n\n"
         f"Всего записей: <b>{total}</b>\n"
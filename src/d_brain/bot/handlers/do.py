@@ -1,6 +1,5 @@
 """Handler for /do command - arbitrary Claude requests."""
 
-import asyncio
 import logging
 
 from aiogram import Bot, Router
@@ -8,25 +7,29 @@ from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from d_brain.bot.formatters import format_process_report
+from d_brain.bot.jobs import follow_job
+from d_brain.bot.keyboards import get_cancel_keyboard
 from d_brain.bot.states import DoCommandState
-from d_brain.config import get_settings
-from d_brain.services.git import VaultGit
-from d_brain.services.processor import ClaudeProcessor
-from d_brain.services.transcription import DeepgramTranscriber
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="do")
 logger = logging.getLogger(__name__)
 
 
 @router.message(Command("do"))
-async def cmd_do(message: Message, command: CommandObject, state: FSMContext) -> None:
+async def cmd_do(
+    message: Message,
+    command: CommandObject,
+    bot: Bot,
+    state: FSMContext,
+    services: ServiceContainer,
+) -> None:
     """Handle /do command."""
     user_id = message.from_user.id if message.from_user else 0
 
     # Check for inline text: /do move overdue tasks
     if command.args:
-        await process_request(message, command.args, user_id)
+        await process_request(message, bot, command.args, services, user_id)
         return
 
     # Otherwise, wait for next message
@@ -38,7 +41,12 @@ async def cmd_do(message: Message, command: CommandObject, state: FSMContext) ->
 
 
 @router.message(DoCommandState.waiting_for_input)
-async def handle_do_input(message: Message, bot: Bot, state: FSMContext) -> None:
+async def handle_do_input(
+    message: Message,
+    bot: Bot,
+    state: FSMContext,
+    services: ServiceContainer,
+) -> None:
     """Handle voice/text input after /do command."""
     await state.clear()  # Clear state immediately
 
@@ -47,22 +55,25 @@ async def handle_do_input(message: Message, bot: Bot, state: FSMContext) -> None
     # Handle voice input
     if message.voice:
         await message.chat.do(action="typing")
-        settings = get_settings()
-        transcriber = DeepgramTranscriber(settings.deepgram_api_key)
 
         try:
-            file = await bot.get_file(message.voice.file_id)
-            if not file.file_path:
-                await message.answer("❌ Не удалось скачать голосовое")
-                return
-
-            file_bytes = await bot.download_file(file.file_path)
-            if not file_bytes:
-                await message.answer("❌ Не удалось скачать голосовое")
-                return
-
-            audio_bytes = file_bytes.read()
-            prompt = await transcriber.transcribe(audio_bytes)
+            voice_id = message.voice.file_unique_id
+            prompt = services.transcriber.cached(voice_id)
+            if prompt is None:
+                file = await bot.get_file(message.voice.file_id)
+                if not file.file_path:
+                    await message.answer("❌ Не удалось скачать голосовое")
+                    return
+
+                file_bytes = await bot.download_file(file.file_path)
+                if not file_bytes:
+                    await message.answer("❌ Не удалось скачать голосовое")
+                    return
+
+                audio_bytes = file_bytes.read()
+                prompt = await services.transcriber.transcribe(
+                    audio_bytes, message.voice.duration, key=voice_id
+                )
         except Exception as e:
             logger.exception("Failed to transcribe voice for /do")
             await message.answer(f"❌ Не удалось транскрибировать: {e}")
@@ -84,44 +95,23 @@ async def handle_do_input(message: Message, bot: Bot, state: FSMContext) -> None
         return
 
     user_id = message.from_user.id if message.from_user else 0
-    await process_request(message, prompt, user_id)
+    await process_request(message, bot, prompt, services, user_id)
 
 
-async def process_request(message: Message, prompt: str, user_id: int = 0) -> None:
+async def process_request(
+    message: Message,
+    bot: Bot,
+    prompt: str,
+    services: ServiceContainer,
+    user_id: int = 0,
+) -> None:
     """Process the user's request with Claude."""
-    status_msg = await message.answer("⏳ Выполняю...")
-
-    settings = get_settings()
-    processor = ClaudeProcessor(settings.vault_path, settings.todoist_api_key)
-
-    async def run_with_progress() -> dict:
-        task = asyncio.create_task(
-            asyncio.to_thread(processor.execute_prompt, prompt, user_id)
-        )
-
-        elapsed = 0
-        while not task.done():
-            await asyncio.sleep(30)
-            elapsed += 30
-            if not task.done():
-                try:
-                    await status_msg.edit_text(
-                        f"⏳ Выполняю... ({elapsed // 60}m {elapsed % 60}s)"
-                    )
-                except Exception:
-                    pass
-
-        return await task
-
-    report = await run_with_progress()
-
-    # Commit and push any changes Claude made to vault
-    git = VaultGit(settings.vault_path)
-    await asyncio.to_thread(git.commit_and_push, "chore: do command vault update")
-
-    formatted = format_process_report(report)
-    try:
-        await status_msg.edit_text(formatted)
-    except Exception:
-        # Fallback: send without HTML parsing
-        await status_msg.edit_text(formatted, parse_mode=None)
+    job, created = services.submit_job(
+        "do", f"{user_id}:{prompt}", prompt=prompt, user_id=user_id
+    )
+    status_msg = await message.answer(
+        "⏳ Выполняю...", reply_markup=get_cancel_keyboard(job.id)
+    )
+    await follow_job(
+        bot, services, job, status_msg.chat.id, status_msg.message_id, created
+    )
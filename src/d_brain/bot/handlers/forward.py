@@ -1,28 +1,24 @@
 """Forwarded message handler."""
 
+import asyncio
 import logging
 from datetime import datetime
 
 from aiogram import Router
 from aiogram.types import Message
 
-from d_brain.config import get_settings
-from d_brain.services.session import SessionStore
-from d_brain.services.storage import VaultStorage
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="forward")
 logger = logging.getLogger(__name__)
 
 
 @router.message(lambda m: m.forward_origin is not None)
-async def handle_forward(message: Message) -> None:
+async def handle_forward(message: Message, services: ServiceContainer) -> None:
     """Handle forwarded messages."""
     if not message.from_user:
         return
 
-    settings = get_settings()
-    storage = VaultStorage(settings.vault_path)
-
     # Determine source name
     source_name = "Unknown"
     origin = message.forward_origin
@@ -42,11 +38,12 @@ async def handle_forward(message: Message) -> None:
     msg_type = f"[forward from: {source_name}]"
 
     timestamp = datetime.fromtimestamp(message.date.timestamp())
-    storage.append_to_daily(content, timestamp, msg_type)
+    daily_file = await asyncio.to_thread(
+        services.storage.append_to_daily, content, timestamp, msg_type
+    )
 
     # Log to session
-    session = SessionStore(settings.vault_path)
-    session.append(
+    session_dir = services.session.append(
         message.from_user.id,
         "forward",
         text=content,
@@ -54,5 +51,9 @@ async def handle_forward(message: Message) -> None:
         msg_id=message.message_id,
     )
 
+    services.commit_worker.notify(
+        "chore: add forwarded entry", [daily_file, session_dir]
+    )
+
     await message.answer(f"✓ Сохранено (от {source_name})")
     logger.info("Forwarded message saved from: %s", source_name)
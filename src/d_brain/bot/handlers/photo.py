@@ -1,75 +1,97 @@
 """Photo message handler."""
 
+import asyncio
 import logging
 from datetime import datetime
+from typing import BinaryIO, cast
 
 from aiogram import Bot, Router
 from aiogram.types import Message
 
-from d_brain.config import get_settings
-from d_brain.services.session import SessionStore
-from d_brain.services.storage import VaultStorage
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="photo")
 logger = logging.getLogger(__name__)
 
 
 @router.message(lambda m: m.photo is not None)
-async def handle_photo(message: Message, bot: Bot) -> None:
+async def handle_photo(message: Message, bot: Bot, services: ServiceContainer) -> None:
     """Handle photo messages."""
     if not message.photo or not message.from_user:
         return
 
-    settings = get_settings()
-    storage = VaultStorage(settings.vault_path)
-
     # Get largest photo
     photo = message.photo[-1]
 
     try:
-        file = await bot.get_file(photo.file_id)
-        if not file.file_path:
-            await message.answer("Failed to download photo")
-            return
-
-        file_bytes = await bot.download_file(file.file_path)
-        if not file_bytes:
-            await message.answer("Failed to download photo")
-            return
-
         timestamp = datetime.fromtimestamp(message.date.timestamp())
-        photo_bytes = file_bytes.read()
-
-        # Determine extension from file path
-        extension = "jpg"
-        if file.file_path and "." in file.file_path:
-            extension = file.file_path.rsplit(".", 1)[-1]
-
-        # Save photo and get relative path
-        relative_path = storage.save_attachment(
-            photo_bytes,
-            timestamp.date(),
-            timestamp,
-            extension,
-        )
+
+        attachments = services.attachments
+
+        # A re-sent photo is already stored, no need to download it again
+        relative_path = attachments.find(photo.file_unique_id)
+        if relative_path is None:
+            file = await bot.get_file(photo.file_id)
+            if not file.file_path:
+                await message.answer("Failed to download photo")
+                return
+
+            # Determine extension from file path
+            extension = "jpg"
+            if "." in file.file_path:
+                extension = file.file_path.rsplit(".", 1)[-1]
+
+            # Stream to disk, hashing on the way, and save under the hash
+            with attachments.upload() as upload:
+                # Not a full BinaryIO, but has the write() and flush() that
+                # download_file uses with seek=False
+                await bot.download_file(
+                    file.file_path, cast(BinaryIO, upload), seek=False
+                )
+                relative_path = attachments.commit(
+                    upload, extension, photo.file_unique_id
+                )
+
+        changed_paths = attachments.vault_files(relative_path)
+        saved_bytes = 0
 
         # Create content with Obsidian embed
         content = f"![[{relative_path}]]"
+        images = services.images
+        if images is not None and images.accepts(relative_path):
+            try:
+                result = await images.process(relative_path)
+                saved_bytes = result.saved_bytes
+                content = f"![[{result.thumbnail}]]\n[[{result.path}|Полный размер]]"
+                changed_paths += attachments.vault_files(result.thumbnail)
+                if result.original:
+                    changed_paths += attachments.vault_files(result.original)
+            except Exception:
+                # Keep the photo as received
+                logger.exception("Failed to recompress %s", relative_path)
+
         if message.caption:
             content += f"\n\n{message.caption}"
 
-        storage.append_to_daily(content, timestamp, "[photo]")
+        daily_file = await asyncio.to_thread(
+            services.storage.append_to_daily, content, timestamp, "[photo]"
+        )
 
         # Log to session
-        session = SessionStore(settings.vault_path)
-        session.append(
+        session_dir = services.session.append(
             message.from_user.id,
             "photo",
             path=relative_path,
             caption=message.caption,
+            saved_bytes=saved_bytes,
             msg_id=message.message_id,
         )
 
+        services.commit_worker.notify(
+            "chore: add photo entry",
+            [*changed_paths, daily_file, session_dir],
+        )
+
         await message.answer("📷 ✓ Сохранено")
         logger.info("Photo saved: %s", relative_path)
 
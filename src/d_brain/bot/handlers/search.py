@@ -0,0 +1,53 @@
+"""Handler for /search command - full-text search over the vault."""
+
+import asyncio
+import html
+import logging
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from d_brain.services.container import ServiceContainer
+from d_brain.services.search import MATCH_END, MATCH_START, SearchHit
+
+router = Router(name="search")
+logger = logging.getLogger(__name__)
+
+
+def _format_hit(hit: SearchHit) -> str:
+    snippet = (
+        html.escape(hit.snippet).replace(MATCH_START, "<b>").replace(MATCH_END, "</b>")
+    )
+    return (
+        f"📄 <b>{html.escape(hit.title)}</b>\n"
+        f"<code>{html.escape(hit.path)}</code>\n"
+        f"{snippet}"
+    )
+
+
+@router.message(Command("search"))
+async def cmd_search(
+    message: Message, command: CommandObject, services: ServiceContainer
+) -> None:
+    """Handle /search command - ranked matches from the local index."""
+    if not command.args:
+        await message.answer(
+            "🔍 <b>Поиск по заметкам</b>\n\n"
+            "<i>/search слова #тег ключ:значение</i>\n"
+            "<i>Пример: /search термез #horeca type:task</i>"
+        )
+        return
+
+    user_id = message.from_user.id if message.from_user else 0
+    services.session.append(user_id, "command", cmd="/search")
+
+    hits = await asyncio.to_thread(services.index.search, command.args)
+    if not hits:
+        await message.answer(f"🔍 Ничего не найдено: {html.escape(command.args)}")
+        return
+
+    await message.answer(
+        f"🔍 <b>{html.escape(command.args)}</b>\n\n"
+        + "\n\n".join(_format_hit(hit) for hit in hits)
+    )
@@ -0,0 +1,45 @@
+"""Handler for /tasks command - tasks from the local Todoist mirror."""
+
+import html
+import logging
+from datetime import date
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from d_brain.services.container import ServiceContainer
+
+router = Router(name="tasks")
+logger = logging.getLogger(__name__)
+
+
+@router.message(Command("tasks"))
+async def cmd_tasks(message: Message, services: ServiceContainer) -> None:
+    """Handle /tasks command - today's and overdue tasks without calling Claude."""
+    todoist = services.todoist
+    if todoist is None:
+        await message.answer("❌ Todoist не настроен (TODOIST_API_KEY)")
+        return
+
+    if todoist.synced_at is None:
+        try:
+            await todoist.sync()
+        except Exception:
+            logger.exception("Todoist sync for /tasks failed")
+            await message.answer("❌ Не удалось получить задачи из Todoist")
+            return
+
+    today = date.today()
+    tasks = todoist.tasks_due(today)
+    synced_at = todoist.synced_at
+    synced = synced_at.astimezone().strftime("%H:%M") if synced_at else "?"
+    if not tasks:
+        await message.answer(f"✅ На {today} задач нет\n\n<i>Обновлено в {synced}</i>")
+        return
+
+    await message.answer(
+        f"📋 <b>Задачи на {today}</b>\n\n"
+        f"{html.escape(todoist.format_tasks(tasks))}\n\n"
+        f"<i>Обновлено в {synced}</i>"
+    )
@@ -7,39 +7,33 @@ from datetime import datetime
 from aiogram import Router
 from aiogram.types import Message
 
-from d_brain.config import get_settings
-from d_brain.services.git import VaultGit
-from d_brain.services.session import SessionStore
-from d_brain.services.storage import VaultStorage
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="text")
 logger = logging.getLogger(__name__)
 
 
 @router.message(lambda m: m.text is not None and not m.text.startswith("/"))
-async def handle_text(message: Message) -> None:
+async def handle_text(message: Message, services: ServiceContainer) -> None:
     """Handle text messages (excluding commands)."""
     if not message.text or not message.from_user:
         return
 
-    settings = get_settings()
-    storage = VaultStorage(settings.vault_path)
-
     timestamp = datetime.fromtimestamp(message.date.timestamp())
-    storage.append_to_daily(message.text, timestamp, "[text]")
+    daily_file = await asyncio.to_thread(
+        services.storage.append_to_daily, message.text, timestamp, "[text]"
+    )
 
     # Log to session
-    session = SessionStore(settings.vault_path)
-    session.append(
+    session_dir = services.session.append(
         message.from_user.id,
         "text",
         text=message.text,
         msg_id=message.message_id,
     )
 
-    # Push to GitHub in background
-    git = VaultGit(settings.vault_path)
-    asyncio.create_task(asyncio.to_thread(git.commit_and_push, "chore: add text entry"))
+    # Push to GitHub in background (batched with other entries)
+    services.commit_worker.notify("chore: add text entry", [daily_file, session_dir])
 
     await message.answer("✓ Сохранено")
     logger.info("Text message saved: %d chars", len(message.text))
@@ -7,52 +7,51 @@ from datetime import datetime
 from aiogram import Bot, Router
 from aiogram.types import Message
 
-from d_brain.config import get_settings
-from d_brain.services.git import VaultGit
-from d_brain.services.session import SessionStore
-from d_brain.services.storage import VaultStorage
-from d_brain.services.transcription import DeepgramTranscriber
+from d_brain.services.container import ServiceContainer
 
 router = Router(name="voice")
 logger = logging.getLogger(__name__)
 
 
 @router.message(lambda m: m.voice is not None)
-async def handle_voice(message: Message, bot: Bot) -> None:
+async def handle_voice(message: Message, bot: Bot, services: ServiceContainer) -> None:
     """Handle voice messages."""
     if not message.voice or not message.from_user:
         return
 
     await message.chat.do(action="typing")
 
-    settings = get_settings()
-    storage = VaultStorage(settings.vault_path)
-    transcriber = DeepgramTranscriber(settings.deepgram_api_key)
-
     try:
-        file = await bot.get_file(message.voice.file_id)
-        if not file.file_path:
-            await message.answer("Failed to download voice message")
-            return
-
-        file_bytes = await bot.download_file(file.file_path)
-        if not file_bytes:
-            await message.answer("Failed to download voice message")
-            return
-
-        audio_bytes = file_bytes.read()
-        transcript = await transcriber.transcribe(audio_bytes)
+        voice_id = message.voice.file_unique_id
+        # A forwarded or re-sent voice note is already transcribed
+        transcript = services.transcriber.cached(voice_id)
+        if transcript is None:
+            file = await bot.get_file(message.voice.file_id)
+            if not file.file_path:
+                await message.answer("Failed to download voice message")
+                return
+
+            file_bytes = await bot.download_file(file.file_path)
+            if not file_bytes:
+                await message.answer("Failed to download voice message")
+                return
+
+            audio_bytes = file_bytes.read()
+            transcript = await services.transcriber.transcribe(
+                audio_bytes, message.voice.duration, key=voice_id
+            )
 
         if not transcript:
             await message.answer("Could not transcribe audio")
             return
 
         timestamp = datetime.fromtimestamp(message.date.timestamp())
-        storage.append_to_daily(transcript, timestamp, "[voice]")
+        daily_file = await asyncio.to_thread(
+            services.storage.append_to_daily, transcript, timestamp, "[voice]"
+        )
 
         # Log to session
-        session = SessionStore(settings.vault_path)
-        session.append(
+        session_dir = services.session.append(
             message.from_user.id,
             "voice",
             text=transcript,
@@ -60,9 +59,10 @@ async def handle_voice(message: Message, bot: Bot) -> None:
             msg_id=message.message_id,
         )
 
-        # Push to GitHub in background
-        git = VaultGit(settings.vault_path)
-        asyncio.create_task(asyncio.to_thread(git.commit_and_push, "chore: add voice entry"))
+        # Push to GitHub in background (batched with other entries)
+        services.commit_worker.notify(
+            "chore: add voice entry", [daily_file, session_dir]
+        )
 
         await message.answer(f"🎤 {transcript}\n\n✓ Сохранено")
         logger.info("Voice message saved: %d chars", len(transcript))
@@ -0,0 +1,130 @@
+"""Showing Claude jobs in Telegram and delivering their results."""
+
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot
+
+from d_brain.bot.formatters import format_process_report
+from d_brain.bot.keyboards import get_cancel_keyboard
+from d_brain.bot.progress import StatusReporter
+from d_brain.services.container import ServiceContainer
+from d_brain.services.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_TITLES = {
+    "process": "Processing...",
+    "weekly": "Генерирую дайджест...",
+    "do": "Выполняю...",
+}
+
+# Strong references to recovery tasks, the event loop only keeps weak ones
+_recovery_tasks: set[asyncio.Task[Any]] = set()
+
+
+async def _commit_job(
+    services: ServiceContainer, job: Job, report: dict[str, Any]
+) -> None:
+    """Commit the vault changes of a finished job."""
+    # Without a list of touched paths (e.g. the manifest could not be read,
+    # or the job itself changed nothing but Obsidian or process.sh did),
+    # fall back to a full scan
+    touched_paths = report.get("touched_paths") or None
+    if job.kind == "process" and "error" not in report:
+        await services.commit_worker.commit(
+            f"chore: process daily {job.params.get('day', job.key)}", touched_paths
+        )
+    elif job.kind == "weekly" and "error" not in report:
+        # Commit any changes (weekly goal updates, etc)
+        await services.commit_worker.commit("chore: weekly digest", touched_paths)
+    elif job.kind == "do":
+        # Commit and push any changes Claude made to vault
+        await services.commit_worker.commit(
+            "chore: do command vault update", touched_paths
+        )
+
+
+async def follow_job(
+    bot: Bot,
+    services: ServiceContainer,
+    job: Job,
+    chat_id: int,
+    message_id: int,
+    deliver: bool,
+) -> dict[str, Any]:
+    """Keep a status message updated until the job ends, then show its report.
+
+    Args:
+        bot: Bot instance
+        services: Service container
+        job: Job to follow
+        chat_id: Chat of the status message
+        message_id: Status message to edit
+        deliver: Whether this caller commits the job's changes and then
+            drops it from the job store (the one who created the job)
+
+    Returns:
+        The job's report
+    """
+    services.jobs.add_message(job, chat_id, message_id)
+
+    cancel_kb = get_cancel_keyboard(job.id)
+    reporter = StatusReporter(
+        bot, chat_id, message_id, JOB_TITLES.get(job.kind, "..."), cancel_kb
+    )
+    job.add_listener(reporter.on_event)
+    report = await reporter.run(job.wait())
+
+    formatted = format_process_report(report)
+    try:
+        await bot.edit_message_text(formatted, chat_id=chat_id, message_id=message_id)
+    except Exception:
+        # Fallback: send without HTML parsing
+        await bot.edit_message_text(
+            formatted, chat_id=chat_id, message_id=message_id, parse_mode=None
+        )
+
+    # Report first, then commit (once, by whoever delivers the job)
+    if deliver:
+        await _commit_job(services, job, report)
+        services.jobs.forget(job)
+    return report
+
+
+async def _deliver_restored(bot: Bot, services: ServiceContainer, job: Job) -> None:
+    if not job.messages:
+        # Nobody to show it to, just finish it
+        report = await job.wait()
+        await _commit_job(services, job, report)
+        services.jobs.forget(job)
+        return
+
+    results = await asyncio.gather(
+        *(
+            follow_job(bot, services, job, chat_id, message_id, deliver=index == 0)
+            for index, (chat_id, message_id) in enumerate(job.messages)
+        ),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error("Failed to deliver job %s: %s", job.id, result)
+
+
+def recover_jobs(bot: Bot, services: ServiceContainer) -> int:
+    """Restore jobs of a previous bot process and deliver them in the background.
+
+    Running jobs are attached to, finished ones that were not delivered yet
+    get their report sent and their changes committed.
+
+    Returns:
+        Number of restored jobs
+    """
+    jobs = services.restore_jobs()
+    for job in jobs:
+        task = asyncio.create_task(_deliver_restored(bot, services, job))
+        _recovery_tasks.add(task)
+        task.add_done_callback(_recovery_tasks.discard)
+    return len(jobs)
@@ -1,7 +1,9 @@
 """Reply keyboards for Telegram bot."""
 
-from aiogram.types import ReplyKeyboardMarkup
-from aiogram.utils.keyboard import ReplyKeyboardBuilder
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
+
+CANCEL_PREFIX = "cancel:"
 
 
 def get_main_keyboard() -> ReplyKeyboardMarkup:
@@ -16,3 +18,10 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     builder.button(text="❓ Помощь")
     builder.adjust(3, 2)  # 3 in first row, 2 in second
     return builder.as_markup(resize_keyboard=True, is_persistent=True)
+
+
+def get_cancel_keyboard(job_id: str) -> InlineKeyboardMarkup:
+    """Inline keyboard with a button that cancels a running Claude job."""
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✖️ Отменить", callback_data=f"{CANCEL_PREFIX}{job_id}")
+    return builder.as_markup()
@@ -1,6 +1,8 @@
 """Telegram bot initialization and polling."""
 
+import asyncio
 import logging
+import signal
 from collections.abc import Awaitable, Callable
 from typing import Any
 
@@ -10,7 +12,9 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Update
 
+from d_brain.bot.jobs import recover_jobs
 from d_brain.config import Settings
+from d_brain.services.container import ServiceContainer
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +29,18 @@ def create_bot(settings: Settings) -> Bot:
 
 def create_dispatcher() -> Dispatcher:
     """Create and configure the dispatcher with routers."""
-    from d_brain.bot.handlers import buttons, commands, do, forward, photo, process, text, voice, weekly
+    from d_brain.bot.handlers import buttons, cancel, commands, do, forward, photo, process, search, tasks, text, voice, weekly
 
     # Use memory storage for FSM (required for /do command state)
     dp = Dispatcher(storage=MemoryStorage())
 
     # Register routers - ORDER MATTERS
     dp.include_router(commands.router)
+    dp.include_router(cancel.router)  # Inline cancel buttons of running jobs
     dp.include_router(process.router)
     dp.include_router(weekly.router)
+    dp.include_router(tasks.router)
+    dp.include_router(search.router)
     dp.include_router(do.router)  # Before voice/text to catch FSM state
     dp.include_router(buttons.router)  # Reply keyboard buttons
     dp.include_router(voice.router)
@@ -47,7 +54,7 @@ MiddlewareHandler = Callable[[Update, dict[str, Any]], Awaitable[Any]]
 MiddlewareType = Callable[[MiddlewareHandler, Update, dict[str, Any]], Awaitable[Any]]
 
 
-def create_auth_middleware(settings: Settings) -> MiddlewareType:
+def create_auth_middleware(services: ServiceContainer) -> MiddlewareType:
     """Create middleware to check user authorization."""
 
     async def auth_middleware(
@@ -55,6 +62,9 @@ def create_auth_middleware(settings: Settings) -> MiddlewareType:
         event: Update,
         data: dict[str, Any],
     ) -> Any:
+        # Read settings on every update so a reload takes effect immediately
+        settings = services.settings
+
         # If explicitly allowed all users, just bypass check
         if settings.allow_all_users:
             return await handler(event, data)
@@ -80,16 +90,58 @@ def create_auth_middleware(settings: Settings) -> MiddlewareType:
     return auth_middleware
 
 
+def _log_index_update(task: asyncio.Task[int]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Search index update failed", exc_info=task.exception())
+
+
 async def run_bot(settings: Settings) -> None:
     """Run the bot with polling."""
     bot = create_bot(settings)
     dp = create_dispatcher()
 
+    # Build services once; handlers receive them as the `services` argument
+    services = ServiceContainer(settings)
+    dp["services"] = services
+
+    # SIGHUP (systemctl reload) re-reads .env and rebuilds services
+    asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, services.reload)
+
     # Always add auth middleware for security (it handles allow_all_users internally)
-    dp.update.middleware(create_auth_middleware(settings))
+    dp.update.middleware(create_auth_middleware(services))
+
+    services.writer.start()
+    services.commit_worker.start()
+    if services.todoist is not None:
+        services.todoist.start()
+    if services.mcp_bridge is not None:
+        try:
+            await services.mcp_bridge.start()
+        except Exception:
+            # Claude runs fall back to starting MCP servers themselves
+            logger.exception("Failed to start MCP bridge")
+
+    # Catch up on notes changed while the bot was down (e.g. by process.sh)
+    index_update = asyncio.create_task(asyncio.to_thread(services.index.update))
+    index_update.add_done_callback(_log_index_update)
+
+    # Pick up Claude jobs that were running or undelivered before a restart
+    restored = recover_jobs(bot, services)
+    if restored:
+        logger.info("Restored %d jobs from the previous run", restored)
 
     logger.info("Starting bot polling...")
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        # Don't lose entries saved during the last commit window
+        await services.commit_worker.stop()
+        await services.writer.stop()
+        await services.transcriber.close()
+        if services.images is not None:
+            services.images.shutdown()
+        if services.todoist is not None:
+            await services.todoist.stop()
+        if services.mcp_bridge is not None:
+            await services.mcp_bridge.stop()
         await bot.session.close()
@@ -0,0 +1,112 @@
+"""Live status messages for long-running Claude jobs."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable
+from typing import Any
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+
+from d_brain.bot.formatters import format_progress
+from d_brain.services.progress import ProgressEvent
+
+logger = logging.getLogger(__name__)
+
+MIN_EDIT_INTERVAL = 3.0  # Telegram rate-limits message edits
+HEARTBEAT_INTERVAL = 30.0  # Refresh elapsed time even without events
+
+
+class StatusReporter:
+    """Keeps a status message in sync with progress events of a job.
+
+    Events arrive through `on_event` (passed to the processor as
+    on_progress). The message is edited when something changed, at most
+    once per MIN_EDIT_INTERVAL, and `run` returns as soon as the job ends.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        message_id: int,
+        title: str,
+        reply_markup: InlineKeyboardMarkup | None = None,
+    ) -> None:
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.reply_markup = reply_markup
+        self._started = time.monotonic()
+        self._changed = asyncio.Event()
+        self._last_text = ""
+        self._last_action = ""
+        self._files_written: set[str] = set()
+        self._todoist_calls = 0
+        self._tool_calls = 0
+        self._queue_position = 0
+
+    def on_event(self, event: ProgressEvent) -> None:
+        """Record a progress event from the running job."""
+        if event.kind == "queue":
+            self._queue_position = int(event.detail or 0)
+            self._changed.set()
+            return
+
+        self._tool_calls += 1
+        if event.kind == "write" and event.path:
+            self._files_written.add(event.path)
+        elif event.kind == "todoist":
+            self._todoist_calls += 1
+        self._last_action = f"{event.tool} {event.detail}".strip()
+        self._changed.set()
+
+    async def run(self, job: Awaitable[dict[str, Any]]) -> dict[str, Any]:
+        """Await the job while updating the status message.
+
+        Args:
+            job: Processor coroutine to wait for
+
+        Returns:
+            The job's report
+        """
+        updater = asyncio.create_task(self._update_loop())
+        try:
+            return await job
+        finally:
+            updater.cancel()
+
+    async def _update_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=HEARTBEAT_INTERVAL)
+            except TimeoutError:
+                pass
+            self._changed.clear()
+            await self._edit()
+            await asyncio.sleep(MIN_EDIT_INTERVAL)
+
+    async def _edit(self) -> None:
+        text = format_progress(
+            self.title,
+            int(time.monotonic() - self._started),
+            self._last_action,
+            len(self._files_written),
+            self._todoist_calls,
+            self._tool_calls,
+            self._queue_position,
+        )
+        if text == self._last_text:
+            return
+        try:
+            await self.bot.edit_message_text(
+                text,
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                reply_markup=self.reply_markup,
+            )
+            self._last_text = text
+        except Exception:
+            logger.debug("Status message edit failed", exc_info=True)
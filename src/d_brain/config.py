@@ -1,6 +1,7 @@
 """Application configuration using Pydantic Settings."""
 
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -21,6 +22,34 @@ class Settings(BaseSettings):
     telegram_bot_token: str = Field(description="Telegram Bot API token")
     deepgram_api_key: str = Field(description="Deepgram API key for transcription")
     todoist_api_key: str = Field(default="", description="Todoist API key for tasks")
+    deepgram_url: str = Field(
+        default="https://api.deepgram.com",
+        description="Base URL of the Deepgram API (e.g. a local fake for tests)",
+    )
+    deepgram_max_concurrent: int = Field(
+        default=4,
+        description="Maximum number of transcriptions in flight at the same time",
+    )
+    deepgram_retries: int = Field(
+        default=3,
+        description="Retries of failed transcriptions, with exponential backoff",
+    )
+    transcription_policy: Literal["remote", "local", "auto"] = Field(
+        default="remote",
+        description="Transcribe with Deepgram, the local model, or route by duration",
+    )
+    local_transcription_model: str = Field(
+        default="small",
+        description="Whisper model of local transcription (size name or path)",
+    )
+    local_transcription_threads: int = Field(
+        default=0,
+        description="CPU threads of the local model (0 = all cores)",
+    )
+    local_max_duration: float = Field(
+        default=30.0,
+        description="Longest voice note, in seconds, that auto routing keeps local",
+    )
     vault_path: Path = Field(
         default=Path("./vault"),
         description="Path to Obsidian vault directory",
@@ -33,6 +62,66 @@ class Settings(BaseSettings):
         default=False,
         description="Whether to allow access to all users (security risk!)",
     )
+    max_claude_jobs: int = Field(
+        default=1,
+        description="Maximum number of Claude runs executing at the same time",
+    )
+    mcp_bridge: bool = Field(
+        default=True,
+        description="Keep stdio MCP servers running and share them with Claude runs",
+    )
+    mcp_bridge_port: int = Field(
+        default=8931,
+        description="Local port of the MCP bridge (0 = any free port)",
+    )
+    todoist_sync_interval: float = Field(
+        default=300.0,
+        description="Seconds between syncs of the local Todoist mirror",
+    )
+    append_fsync: Literal["always", "batch", "never"] = Field(
+        default="batch",
+        description="When appends to daily notes and session logs are fsynced",
+    )
+    append_fsync_interval: float = Field(
+        default=1.0,
+        description="Seconds between fsyncs of appended entries in batch mode",
+    )
+    attachment_store: Path | None = Field(
+        default=None,
+        description="Blob store for attachments outside git (unset = in the vault)",
+    )
+    image_pipeline: bool = Field(
+        default=False,
+        description="Recompress photos and embed thumbnails (needs Pillow)",
+    )
+    image_max_size: int = Field(
+        default=2048,
+        description="Longest side of recompressed photos, in pixels",
+    )
+    image_quality: int = Field(
+        default=82,
+        description="JPEG quality of recompressed photos and thumbnails",
+    )
+    image_thumb_size: int = Field(
+        default=320,
+        description="Longest side of photo thumbnails, in pixels",
+    )
+    image_keep_originals: bool = Field(
+        default=False,
+        description="Keep received photos next to their recompressed version",
+    )
+    image_workers: int = Field(
+        default=1,
+        description="Worker processes for photo recompression",
+    )
+    graph_links: bool = Field(
+        default=False,
+        description="Add related wiki-links to thoughts/ notes after Claude runs",
+    )
+    git_commit_window: float = Field(
+        default=10.0,
+        description="Seconds to collect vault changes into a single commit and push",
+    )
 
     @property
     def daily_path(self) -> Path:
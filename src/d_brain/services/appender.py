@@ -0,0 +1,173 @@
+"""Shared append-only writer for daily notes and session logs."""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy = Literal["always", "batch", "never"]
+
+FSYNC_INTERVAL = 1.0
+IDLE_TIMEOUT = 60.0
+
+
+@dataclass
+class _Handle:
+    fd: int
+    inode: tuple[int, int]  # (st_dev, st_ino) of the file the fd points to
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    dirty: bool = False
+    closed: bool = False
+
+
+class AppendWriter:
+    """Appends to files through cached handles, one writer per file.
+
+    Handles are opened with O_APPEND and kept open, so an entry costs a
+    stat and a write instead of mkdir, open and close. Each append is a
+    single write(2) under a per-file lock: entries from concurrent
+    handlers never interleave, and O_APPEND keeps them whole next to
+    other appenders. The stat catches files that were replaced (e.g.
+    rewritten by Claude or Obsidian) and reopens them.
+
+    Durability depends on `fsync`:
+    - "always": fsync after every append;
+    - "batch": appends within `fsync_interval` share one fsync, done by
+      the background loop (group commit);
+    - "never": leave it to the OS.
+
+    The background loop (`start`) also closes handles idle for
+    `idle_timeout` seconds; `stop` syncs and closes everything.
+    """
+
+    def __init__(
+        self,
+        fsync: FsyncPolicy = "batch",
+        fsync_interval: float = FSYNC_INTERVAL,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ) -> None:
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.idle_timeout = idle_timeout
+        self._handles: dict[Path, _Handle] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start the background sync loop (requires a running event loop)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="append-writer")
+
+    async def stop(self) -> None:
+        """Stop the background loop, then sync and close all handles."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.close_all)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            try:
+                await asyncio.to_thread(self.sync, True)
+            except Exception:
+                logger.exception("Append writer sync failed")
+
+    def _open(self, path: Path) -> _Handle:
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC
+        try:
+            fd = os.open(path, flags, 0o644)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, flags, 0o644)
+        stat = os.fstat(fd)
+        return _Handle(fd, (stat.st_dev, stat.st_ino))
+
+    def _handle(self, path: Path) -> _Handle:
+        """Cached handle of `path`, reopened if the file was replaced."""
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None:
+                try:
+                    stat = path.stat()
+                    current = (stat.st_dev, stat.st_ino)
+                except FileNotFoundError:
+                    current = None
+                if current == handle.inode:
+                    return handle
+                self._close(path, handle)
+            handle = self._open(path)
+            self._handles[path] = handle
+            return handle
+
+    def append(self, path: Path, data: bytes) -> int:
+        """Append `data` to a file, creating it (and its directory) if needed.
+
+        Args:
+            path: File to append to
+            data: Bytes to write
+
+        Returns:
+            Offset in the file at which `data` starts
+        """
+        path = Path(path)
+        while True:
+            handle = self._handle(path)
+            with handle.lock:
+                if handle.closed:  # Closed as idle or replaced meanwhile
+                    continue
+                written = os.write(handle.fd, data)
+                while written < len(data):  # Short writes are rare, but possible
+                    written += os.write(handle.fd, data[written:])
+                # With O_APPEND the offset is the end of what we just wrote
+                end = os.lseek(handle.fd, 0, os.SEEK_CUR)
+                handle.last_used = time.monotonic()
+                if self.fsync == "always":
+                    os.fsync(handle.fd)
+                elif self.fsync == "batch":
+                    handle.dirty = True
+                return end - len(data)
+
+    def sync(self, close_idle: bool = False) -> None:
+        """Fsync files with pending appends.
+
+        Args:
+            close_idle: Also close handles unused for `idle_timeout`
+        """
+        now = time.monotonic()
+        with self._lock:
+            handles = list(self._handles.items())
+        for path, handle in handles:
+            with handle.lock:
+                if handle.dirty and not handle.closed:
+                    os.fsync(handle.fd)
+                    handle.dirty = False
+            if close_idle and now - handle.last_used > self.idle_timeout:
+                with self._lock:
+                    if self._handles.get(path) is handle:
+                        self._close(path, handle)
+
+    def _close(self, path: Path, handle: _Handle) -> None:
+        with handle.lock:
+            if handle.dirty:
+                os.fsync(handle.fd)
+            os.close(handle.fd)
+            handle.closed = True
+        del self._handles[path]
+
+    def close_all(self) -> None:
+        """Sync and close all cached handles."""
+        with self._lock:
+            for path, handle in list(self._handles.items()):
+                self._close(path, handle)
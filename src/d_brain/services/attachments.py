@@ -0,0 +1,313 @@
+"""Content-addressed attachment storage with deduplication."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from types import TracebackType
+from typing import TypedDict
+
+logger = logging.getLogger(__name__)
+
+HASH_CHARS = 32  # 128 bits of sha256 in file names
+POINTER_SUFFIX = ".md"
+
+# attachments/.gitignore of the blob store backend: only pointer notes
+BLOB_GITIGNORE = """\
+# Attachment files live in the blob store, only pointer notes are committed
+*
+!*/
+!*.md
+!.gitignore
+"""
+
+
+class _AttachmentIndex(TypedDict):
+    sources: dict[str, str]  # Source ID -> vault-relative path
+
+
+def _file_sha256(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class AttachmentBackend:
+    """Where attachment files are kept (files directly in the vault).
+
+    Attachments are addressed by vault-relative paths such as
+    attachments/ab/abcdef.jpg, which is also what notes embed. A backend
+    decides what is actually stored under that path and which vault files
+    have to be committed for it.
+    """
+
+    def __init__(self, vault_path: Path) -> None:
+        self.vault_path = Path(vault_path)
+
+    def exists(self, relative_path: str) -> bool:
+        """Whether an attachment is stored under this path."""
+        return (self.vault_path / relative_path).exists()
+
+    def local_path(self, relative_path: str) -> Path:
+        """Readable local file with the attachment's content."""
+        return self.vault_path / relative_path
+
+    def put(self, source: Path, relative_path: str) -> None:
+        """Move `source` in as the attachment at `relative_path`, replacing it."""
+        target = self.vault_path / relative_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(source, 0o644)  # Uploads are created as 0600
+        os.replace(source, target)
+
+    def vault_files(self, relative_path: str) -> list[Path]:
+        """Vault files to commit after `put`."""
+        return [self.vault_path / relative_path]
+
+
+class BlobStoreBackend(AttachmentBackend):
+    """Attachment content in a blob store outside the vault's git history.
+
+    Blobs are kept content-addressed at {store}/{h[:2]}/{h}{ext} (h being
+    the full sha256), a local-filesystem stand-in for an object store. In
+    the vault each attachment gets:
+    - a symlink at its path, so Obsidian on this machine resolves embeds;
+    - a small pointer note next to it ({name}.md) with the blob's key,
+      hash and size, which is what git commits.
+
+    attachments/.gitignore keeps everything but pointer notes out of git.
+    """
+
+    def __init__(self, vault_path: Path, store_path: Path) -> None:
+        super().__init__(vault_path)
+        # Absolute, so vault symlinks resolve
+        self.store_path = Path(store_path).expanduser().resolve()
+
+    def _pointer(self, relative_path: str) -> Path:
+        return self.vault_path / (relative_path + POINTER_SUFFIX)
+
+    def _read_pointer(self, relative_path: str) -> dict[str, str] | None:
+        try:
+            text = self._pointer(relative_path).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        fields = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition(":")
+            if sep and key in ("blob", "sha256", "size"):
+                fields[key] = value.strip()
+        return fields if "blob" in fields else None
+
+    def exists(self, relative_path: str) -> bool:
+        """Whether the attachment has a pointer and its blob is present."""
+        pointer = self._read_pointer(relative_path)
+        return pointer is not None and (self.store_path / pointer["blob"]).exists()
+
+    def local_path(self, relative_path: str) -> Path:
+        """The blob behind an attachment (also without a vault symlink)."""
+        pointer = self._read_pointer(relative_path)
+        if pointer is None:
+            raise FileNotFoundError(relative_path)
+        return self.store_path / pointer["blob"]
+
+    def _ensure_gitignore(self) -> Path:
+        gitignore = self.vault_path / "attachments" / ".gitignore"
+        if not gitignore.exists():
+            gitignore.parent.mkdir(parents=True, exist_ok=True)
+            gitignore.write_text(BLOB_GITIGNORE, encoding="utf-8")
+        return gitignore
+
+    def put(self, source: Path, relative_path: str) -> None:
+        """Move `source` into the blob store and point the vault path at it."""
+        digest = _file_sha256(source)
+        size = source.stat().st_size
+        key = f"{digest[:2]}/{digest}{Path(relative_path).suffix}"
+        blob = self.store_path / key
+        if blob.exists():
+            source.unlink()
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(source, 0o644)
+            # The store may be on another file system
+            tmp_blob = blob.with_name(blob.name + ".tmp")
+            shutil.move(source, tmp_blob)
+            os.replace(tmp_blob, blob)
+
+        self._ensure_gitignore()
+        link = self.vault_path / relative_path
+        link.parent.mkdir(parents=True, exist_ok=True)
+        tmp_link = link.with_name(f".{link.name}.tmp")
+        tmp_link.unlink(missing_ok=True)
+        tmp_link.symlink_to(blob)
+        os.replace(tmp_link, link)
+        self._pointer(relative_path).write_text(
+            f"---\nblob: {key}\nsha256: {digest}\nsize: {size}\n---\n",
+            encoding="utf-8",
+        )
+
+    def vault_files(self, relative_path: str) -> list[Path]:
+        """The pointer note and the .gitignore that keeps the blob out."""
+        return [self._pointer(relative_path), self._ensure_gitignore()]
+
+
+class AttachmentUpload:
+    """Writable sink that hashes what is streamed into a temp file.
+
+    Passed as the destination of a download (e.g. aiogram's
+    `Bot.download_file`), so the file is never held in memory. Use it as
+    a context manager; the temp file is removed unless the upload was
+    committed to an AttachmentStore.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=directory, suffix=".part")
+        self.path = Path(name)
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        """Write a chunk and add it to the hash."""
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        """Flush buffered data to the temp file."""
+        self._file.flush()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Seek within the temp file (downloaders rewind when done)."""
+        return self._file.seek(offset, whence)
+
+    def close(self) -> None:
+        """Close the temp file."""
+        self._file.close()
+
+    @property
+    def digest(self) -> str:
+        """Hex sha256 of everything written so far."""
+        return self._hash.hexdigest()
+
+    def __enter__(self) -> "AttachmentUpload":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class AttachmentStore:
+    """Attachments named by content hash, deduplicated by hash and source ID.
+
+    Files are stored as attachments/{h[:2]}/{h}.{ext}, where h is the start
+    of the sha256 of the received content, so the same photo sent twice is
+    one attachment and two photos sent in the same second never collide.
+    A small index maps source IDs (Telegram's `file_unique_id`) to stored
+    files, so a re-sent photo is not even downloaded again.
+
+    Uploads are streamed to a temp dir in the bot's state dir, ignored by
+    git, and handed to the backend: files in the vault by default, or a
+    BlobStoreBackend that keeps them out of git.
+    """
+
+    def __init__(
+        self,
+        vault_path: Path,
+        state_dir: Path,
+        backend: AttachmentBackend | None = None,
+    ) -> None:
+        self.vault_path = Path(vault_path)
+        self.backend = backend or AttachmentBackend(self.vault_path)
+        self.uploads_dir = Path(state_dir) / "uploads"
+        self.index_path = Path(state_dir) / "attachments.json"
+        self._index = self._load_index()
+
+    def _load_index(self) -> _AttachmentIndex:
+        try:
+            index: _AttachmentIndex = json.loads(
+                self.index_path.read_text(encoding="utf-8")
+            )
+            return index
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"sources": {}}
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._index), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+
+    def find(self, source_id: str) -> str | None:
+        """Vault-relative path of a file already stored for this source ID."""
+        relative_path = self._index["sources"].get(source_id)
+        if relative_path and self.backend.exists(relative_path):
+            return relative_path
+        return None
+
+    def exists(self, relative_path: str) -> bool:
+        """Whether an attachment is stored under this path."""
+        return self.backend.exists(relative_path)
+
+    def local_path(self, relative_path: str) -> Path:
+        """Readable local file with the attachment's content."""
+        return self.backend.local_path(relative_path)
+
+    def vault_files(self, relative_path: str) -> list[Path]:
+        """Vault files to commit for an attachment."""
+        return self.backend.vault_files(relative_path)
+
+    def upload(self) -> AttachmentUpload:
+        """Start streaming a new attachment."""
+        return AttachmentUpload(self.uploads_dir)
+
+    def put(self, source: Path, relative_path: str) -> None:
+        """Store a finished file under a given path, replacing what is there.
+
+        Args:
+            source: File to move in (e.g. from a temp dir in `uploads_dir`)
+            relative_path: Vault-relative attachment path
+        """
+        self.backend.put(source, relative_path)
+
+    def commit(
+        self, upload: AttachmentUpload, extension: str, source_id: str | None = None
+    ) -> str:
+        """Move a finished upload to its content-addressed path.
+
+        Args:
+            upload: Upload whose data was fully written
+            extension: File extension without the dot
+            source_id: ID of the source file for `find`, e.g. file_unique_id
+
+        Returns:
+            Relative path for an Obsidian embed:
+            attachments/ab/abcdef....ext
+        """
+        upload.close()
+        digest = upload.digest[:HASH_CHARS]
+        relative_path = f"attachments/{digest[:2]}/{digest}.{extension}"
+
+        if self.backend.exists(relative_path):
+            logger.info("Attachment %s already stored", relative_path)
+            upload.path.unlink(missing_ok=True)
+        else:
+            self.backend.put(upload.path, relative_path)
+            logger.info("Stored attachment %s (%d bytes)", relative_path, upload.size)
+
+        if source_id:
+            self._index["sources"][source_id] = relative_path
+            self._save_index()
+        return relative_path
+
+    def save(self, data: bytes, extension: str, source_id: str | None = None) -> str:
+        """Store an attachment that is already in memory (see `commit`)."""
+        with self.upload() as upload:
+            upload.write(data)
+            return self.commit(upload, extension, source_id)
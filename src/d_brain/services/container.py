@@ -0,0 +1,232 @@
+"""Process-wide service container for the bot."""
+
+import logging
+from typing import Any
+
+from d_brain.config import Settings, get_settings
+from d_brain.services.appender import AppendWriter
+from d_brain.services.attachments import (
+    AttachmentStore,
+    BlobStoreBackend,
+)
+from d_brain.services.git import CommitWorker, VaultGit
+from d_brain.services.images import ImagePipeline
+from d_brain.services.jobs import Job, JobFactory, JobScheduler, JobStore
+from d_brain.services.manifest import VaultManifest
+from d_brain.services.mcp_bridge import McpBridge
+from d_brain.services.processor import ClaudeProcessor
+from d_brain.services.runner import ProcessRunner
+from d_brain.services.search import VaultIndex
+from d_brain.services.session import SessionStore
+from d_brain.services.state import ensure_state_dir
+from d_brain.services.storage import VaultStorage
+from d_brain.services.todoist import TodoistMirror
+from d_brain.services.transcription import (
+    DeepgramTranscriber,
+    LocalWhisperTranscriber,
+    TranscriptCache,
+    TranscriptionRouter,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Long-lived services shared by all handlers.
+
+    Built once in `run_bot` and injected into handlers through dispatcher
+    workflow data as `services`, so settings are parsed and clients are
+    created once per process instead of once per message.
+    """
+
+    # Rebuilt by `_build` on every reload
+    settings: Settings
+    manifest: VaultManifest
+    index: VaultIndex
+    attachments: AttachmentStore
+    images: ImagePipeline | None
+    storage: VaultStorage
+    session: SessionStore
+    git: VaultGit
+    processor: ClaudeProcessor
+
+    def __init__(self, settings: Settings) -> None:
+        # Survive reloads so running Claude jobs stay cancellable. Claude
+        # output is spooled next to the job records so runs outlive restarts.
+        state_dir = ensure_state_dir(settings.vault_path)
+        self.job_store = JobStore(state_dir / "jobs")
+        self.runner = ProcessRunner(spool_dir=self.job_store.jobs_dir)
+        self.jobs = JobScheduler(
+            settings.max_claude_jobs,
+            cancel_running=self.runner.cancel,
+            store=self.job_store,
+        )
+        self.mcp_bridge = (
+            McpBridge(
+                settings.vault_path.parent / "mcp-config.json",
+                state_dir / "mcp-config.json",
+                env=_todoist_env(settings),
+                port=settings.mcp_bridge_port,
+                token_path=state_dir / "mcp-bridge.token",
+            )
+            if settings.mcp_bridge
+            else None
+        )
+        # Shared by daily notes and session logs, keeps its open handles
+        # across reloads
+        self.writer = AppendWriter(
+            settings.append_fsync, settings.append_fsync_interval
+        )
+        self.todoist = (
+            TodoistMirror(
+                settings.todoist_api_key,
+                state_dir / "todoist.json",
+                interval=settings.todoist_sync_interval,
+            )
+            if settings.todoist_api_key
+            else None
+        )
+        # Keeps its connection pool, loaded model and transcript cache
+        # across reloads
+        self.transcriber = TranscriptionRouter(
+            DeepgramTranscriber(
+                settings.deepgram_api_key,
+                api_url=settings.deepgram_url,
+                max_concurrent=settings.deepgram_max_concurrent,
+                retries=settings.deepgram_retries,
+            ),
+            local=_local_transcriber(settings),
+            cache=TranscriptCache(state_dir / "transcripts"),
+            policy=settings.transcription_policy,
+            local_max_duration=settings.local_max_duration,
+        )
+        self._build(settings)
+        self.commit_worker = CommitWorker(self.git, settings.git_commit_window)
+
+    def _build(self, settings: Settings) -> None:
+        self.settings = settings
+        state_dir = ensure_state_dir(settings.vault_path)
+        # Keep the open index (and the manifest it reads) unless the vault
+        # moved; running jobs may still be using it
+        index: VaultIndex | None = getattr(self, "index", None)
+        if index is None or index.vault_path != settings.vault_path:
+            if index is not None:
+                index.close()
+            self.manifest = VaultManifest(
+                settings.vault_path, state_dir / "manifest.json"
+            )
+            self.index = VaultIndex(
+                settings.vault_path, state_dir / "search.db", self.manifest
+            )
+        self.attachments = AttachmentStore(
+            settings.vault_path,
+            state_dir,
+            backend=(
+                BlobStoreBackend(settings.vault_path, settings.attachment_store)
+                if settings.attachment_store
+                else None
+            ),
+        )
+        images: ImagePipeline | None = getattr(self, "images", None)
+        if images is not None:
+            images.shutdown()
+        self.images = (
+            ImagePipeline(
+                self.attachments,
+                state_dir / "images.json",
+                max_size=settings.image_max_size,
+                quality=settings.image_quality,
+                thumb_size=settings.image_thumb_size,
+                keep_originals=settings.image_keep_originals,
+                workers=settings.image_workers,
+            )
+            if settings.image_pipeline
+            else None
+        )
+        self.storage = VaultStorage(
+            settings.vault_path, index=self.index, writer=self.writer
+        )
+        self.session = SessionStore(settings.vault_path, writer=self.writer)
+        self.git = VaultGit(settings.vault_path)
+        self.processor = ClaudeProcessor(
+            settings.vault_path,
+            settings.todoist_api_key,
+            session=self.session,
+            runner=self.runner,
+            mcp_config_path=self.mcp_bridge.config_path if self.mcp_bridge else None,
+            todoist=self.todoist,
+            index=self.index,
+            manifest=self.manifest,
+            graph_links=settings.graph_links,
+        )
+
+    def _job_factory(self, kind: str, params: dict[str, Any]) -> JobFactory:
+        # Look the processor up at start time, so jobs use the current one
+        return lambda job_id, on_progress: self.processor.run_job(
+            kind, params, job_id, on_progress
+        )
+
+    def submit_job(self, kind: str, key: str, **params: Any) -> tuple[Job, bool]:
+        """Schedule a Claude job (see ClaudeProcessor.run_job for kinds).
+
+        Args:
+            kind: Job kind
+            key: Dedupe key within the kind
+            **params: JSON-serializable job parameters
+
+        Returns:
+            Tuple of (job, True if this call created it)
+        """
+        return self.jobs.submit(kind, key, self._job_factory(kind, params), params)
+
+    def restore_jobs(self) -> list[Job]:
+        """Restore jobs left by a previous bot process and reap orphans.
+
+        Returns:
+            Restored jobs, in the order they were created
+        """
+        records = self.job_store.load()
+        reaped = self.runner.reap_orphans({record["id"] for record in records})
+        if reaped:
+            logger.warning("Killed %d orphaned Claude processes", reaped)
+        return [
+            self.jobs.restore(
+                record, self._job_factory(record["kind"], record.get("params", {}))
+            )
+            for record in records
+        ]
+
+    def reload(self) -> None:
+        """Re-read settings from the environment and rebuild all services."""
+        self._build(get_settings())
+        # Keep the worker (and its pending changes), point it at the new repo
+        self.commit_worker.git = self.git
+        self.commit_worker.window = self.settings.git_commit_window
+        self.jobs.max_concurrent = self.settings.max_claude_jobs
+        self.writer.fsync = self.settings.append_fsync
+        self.writer.fsync_interval = self.settings.append_fsync_interval
+        self.transcriber.remote.api_key = self.settings.deepgram_api_key
+        self.transcriber.remote.retries = self.settings.deepgram_retries
+        self.transcriber.policy = self.settings.transcription_policy
+        self.transcriber.local_max_duration = self.settings.local_max_duration
+        logger.info("Services reloaded, vault path: %s", self.settings.vault_path)
+
+
+def _local_transcriber(settings: Settings) -> LocalWhisperTranscriber | None:
+    """Local Whisper backend, if the policy uses it and it is installed."""
+    if settings.transcription_policy == "remote":
+        return None
+    if not LocalWhisperTranscriber.is_available():
+        logger.warning("faster-whisper is not installed, transcribing with Deepgram")
+        return None
+    return LocalWhisperTranscriber(
+        settings.local_transcription_model,
+        threads=settings.local_transcription_threads,
+    )
+
+
+def _todoist_env(settings: Settings) -> dict[str, str]:
+    """Environment for MCP servers, as ClaudeProcessor passes it to Claude."""
+    if settings.todoist_api_key:
+        return {"TODOIST_API_KEY": settings.todoist_api_key}
+    return {}
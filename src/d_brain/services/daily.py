@@ -0,0 +1,66 @@
+"""Parsing of daily notes written by VaultStorage."""
+
+import hashlib
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+PROCESSED_MARKER = "<!-- ✓ processed -->"
+
+# "## 14:30 [voice]", "## 09:05 [forward from: Name]"
+ENTRY_HEADER = re.compile(r"^## (\d{2}:\d{2}) (\[[^\]\n]*\])?.*$", re.MULTILINE)
+
+
+@dataclass
+class DailyEntry:
+    """One "## HH:MM [type]" section of a daily file."""
+
+    time: str
+    kind: str
+    text: str  # Whole section, header included
+    processed: bool
+
+
+def parse_daily(content: str) -> list[DailyEntry]:
+    """Split a daily file into entries.
+
+    Text before the first entry header (if any) is ignored.
+
+    Args:
+        content: Daily file content
+
+    Returns:
+        Entries in file order
+    """
+    headers = list(ENTRY_HEADER.finditer(content))
+    entries = []
+    for header, next_header in zip(headers, [*headers[1:], None], strict=True):
+        end = next_header.start() if next_header else len(content)
+        text = content[header.start() : end].strip()
+        entries.append(
+            DailyEntry(
+                time=header.group(1),
+                kind=(header.group(2) or "").strip("[]"),
+                text=text,
+                processed=PROCESSED_MARKER in text,
+            )
+        )
+    return entries
+
+
+def entry_type(msg_type: str) -> str:
+    """Entry type of a header marker: "[forward from: Name]" -> "forward"."""
+    words = msg_type.strip("[]").split(":", 1)[0].split()
+    return words[0].lower() if words else ""
+
+
+def count_entries(content: str) -> Counter[str]:
+    """Number of entries in a daily file by type ("voice", "text", ...)."""
+    return Counter(
+        entry_type(header.group(2) or "") for header in ENTRY_HEADER.finditer(content)
+    )
+
+
+def fingerprint(content: str) -> str:
+    """Content hash of a daily file."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
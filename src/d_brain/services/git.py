@@ -1,7 +1,10 @@
 """Git automation service for vault."""
 
+import asyncio
 import logging
+import os
 import subprocess
+from collections.abc import Iterable
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -13,24 +16,60 @@ class VaultGit:
     def __init__(self, vault_path: Path) -> None:
         self.vault_path = Path(vault_path)
 
-    def _run_git(self, *args: str) -> subprocess.CompletedProcess[str]:
+    def _run_git(
+        self, *args: str, input: str | None = None
+    ) -> subprocess.CompletedProcess[str]:
         """Run git command in vault directory."""
         return subprocess.run(
             ["git", *args],
             cwd=self.vault_path,
+            input=input,
             capture_output=True,
             text=True,
             check=False,
         )
 
-    def get_status(self) -> str:
-        """Get git status."""
-        result = self._run_git("status", "--porcelain")
+    def get_status(self, paths: Iterable[Path] | None = None) -> str:
+        """Get git status, of the whole vault or of the given paths."""
+        pathspec = [] if paths is None else ["--", *self._pathspec(paths)]
+        result = self._run_git("status", "--porcelain", *pathspec)
         return result.stdout
 
-    def has_changes(self) -> bool:
-        """Check if there are uncommitted changes."""
-        return bool(self.get_status().strip())
+    def has_changes(self, paths: Iterable[Path] | None = None) -> bool:
+        """Check if there are uncommitted changes (to the given paths)."""
+        return bool(self.get_status(paths).strip())
+
+    def _pathspec(self, paths: Iterable[Path]) -> list[str]:
+        return sorted({os.path.relpath(path, self.vault_path) for path in paths})
+
+    def _committable(self, pathspec: list[str]) -> list[str]:
+        """Drop paths `git add` would reject and fail the whole batch on.
+
+        Those are paths outside the vault, paths that neither exist nor
+        are tracked, and ignored untracked paths (e.g. blob symlinks).
+        """
+        pathspec = [spec for spec in pathspec if not spec.startswith("..")]
+        if not pathspec:
+            return []
+        tracked = set(
+            self._run_git("ls-files", "-z", "--", *pathspec).stdout.split("\0")
+        )
+        ignored = set(
+            self._run_git(
+                "check-ignore", "-z", "--stdin", input="\0".join(pathspec)
+            ).stdout.split("\0")
+        )
+        kept = []
+        for spec in pathspec:
+            is_tracked = spec in tracked or any(
+                file.startswith(spec + "/") for file in tracked
+            )
+            exists = os.path.lexists(self.vault_path / spec)
+            if is_tracked or (exists and spec not in ignored):
+                kept.append(spec)
+            else:
+                logger.debug("Not committing %s (missing or ignored)", spec)
+        return kept
 
     def commit_changes(self, message: str) -> bool:
         """Stage all changes and commit.
@@ -60,6 +99,63 @@ class VaultGit:
         logger.info("Committed: %s", message)
         return True
 
+    def commit_paths(self, message: str, paths: Iterable[Path]) -> bool:
+        """Stage and commit only the given paths.
+
+        Unlike `commit_changes`, this never scans the whole vault, so its
+        cost depends on the size of the change rather than of the vault.
+
+        Args:
+            message: Commit message
+            paths: Files or directories that were changed
+
+        Returns:
+            True if commit was made, False otherwise
+        """
+        pathspec = self._committable(self._pathspec(paths))
+        if not pathspec:
+            logger.info("No changes to commit")
+            return False
+
+        add_result = self._run_git("add", "-A", "--", *pathspec)
+        if add_result.returncode != 0:
+            logger.error("Git add failed: %s", add_result.stderr)
+            return False
+
+        # Exit code 0 means nothing staged for these paths
+        diff_result = self._run_git("diff", "--cached", "--quiet", "--", *pathspec)
+        if diff_result.returncode == 0:
+            logger.info("No changes to commit")
+            return False
+
+        commit_result = self._run_git("commit", "-m", message, "--", *pathspec)
+        if commit_result.returncode != 0:
+            logger.error("Git commit failed: %s", commit_result.stderr)
+            return False
+
+        logger.info("Committed %d paths: %s", len(pathspec), message)
+        return True
+
+    def untrack(self, paths: Iterable[Path]) -> bool:
+        """Stop tracking files, keeping them in the working tree.
+
+        Args:
+            paths: Files or directories to remove from the index
+
+        Returns:
+            True if successful
+        """
+        pathspec = self._pathspec(paths)
+        if not pathspec:
+            return True
+        result = self._run_git(
+            "rm", "-r", "--cached", "--quiet", "--ignore-unmatch", "--", *pathspec
+        )
+        if result.returncode != 0:
+            logger.error("Git rm failed: %s", result.stderr)
+            return False
+        return True
+
     def push(self) -> bool:
         """Push to remote.
 
@@ -74,15 +170,157 @@ class VaultGit:
         logger.info("Pushed to remote")
         return True
 
-    def commit_and_push(self, message: str) -> bool:
-        """Commit all changes and push.
+    def commit_and_push(
+        self, message: str, paths: Iterable[Path] | None = None
+    ) -> bool:
+        """Commit changes and push.
 
         Args:
             message: Commit message
+            paths: Changed paths to commit; None scans the whole vault
 
         Returns:
             True if successful
         """
-        if self.commit_changes(message):
+        if paths is None:
+            committed = self.commit_changes(message)
+        else:
+            committed = self.commit_paths(message, paths)
+        if committed:
             return self.push()
         return True  # No changes is not an error
+
+
+class CommitWorker:
+    """Debounced, single-flight commit/push worker for the vault.
+
+    Handlers call `notify` after writing to the vault. The first
+    notification opens a window of `window` seconds; everything that
+    arrives within it goes into one commit and one push. Git runs in a
+    worker thread and at most one git operation is in flight at a time.
+
+    Notifications that name the paths they touched are committed with a
+    path-scoped `git add`; a single notification without paths (e.g. after
+    a Claude run edited the vault) makes the whole batch fall back to a
+    full status scan.
+    """
+
+    def __init__(self, git: VaultGit, window: float = 10.0) -> None:
+        self.git = git
+        self.window = window
+        self._pending: list[tuple[str, list[Path] | None]] = []
+        self._unpushed = False
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        """Number of change notifications not yet committed."""
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Start the background loop (requires a running event loop)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="vault-commit-worker")
+
+    async def stop(self) -> None:
+        """Stop the background loop and commit whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def notify(self, message: str, paths: Iterable[Path] | None = None) -> None:
+        """Record a vault change to be committed with the next batch.
+
+        Args:
+            message: Commit message describing the change
+            paths: Paths that were changed; None if unknown
+        """
+        self._pending.append((message, None if paths is None else list(paths)))
+        self._wakeup.set()
+
+    async def commit(self, message: str, paths: Iterable[Path] | None = None) -> bool:
+        """Commit and push right away, together with any pending changes.
+
+        Args:
+            message: Commit message
+            paths: Paths that were changed; None if unknown
+
+        Returns:
+            True if successful
+        """
+        self.notify(message, paths)
+        return await self.flush()
+
+    async def flush(self) -> bool:
+        """Commit and push all pending changes now.
+
+        Returns:
+            True if successful (no pending changes is not an error)
+        """
+        async with self._lock:
+            if not self._pending and not self._unpushed:
+                return True
+            pending, self._pending = self._pending, []
+            self._wakeup.clear()
+
+            if pending:
+                messages = [message for message, _ in pending]
+                changed_paths: set[Path] = set()
+                for _, changed in pending:
+                    changed_paths.update(changed or ())
+                # Any change with unknown paths makes it a full scan
+                unknown = any(changed is None for _, changed in pending)
+                paths = None if unknown else changed_paths
+                if not await asyncio.to_thread(
+                    self._commit, self._format_message(messages), paths
+                ):
+                    # Keep the changes, they are retried with the next batch
+                    self._pending[:0] = pending
+                    return False
+
+            if not self._unpushed:
+                return True
+            if not await asyncio.to_thread(self.git.push):
+                return False  # The commit is pushed with the next batch
+            self._unpushed = False
+            return True
+
+    def _commit(self, message: str, paths: set[Path] | None) -> bool:
+        """Commit in a worker thread.
+
+        Returns:
+            True if the changes were committed or there was nothing to
+            commit, False if they are still uncommitted
+        """
+        if paths is None:
+            committed = self.git.commit_changes(message)
+        else:
+            committed = self.git.commit_paths(message, paths)
+        if committed:
+            self._unpushed = True
+            return True
+        return not self.git.has_changes(paths)
+
+    @staticmethod
+    def _format_message(messages: list[str]) -> str:
+        unique = list(dict.fromkeys(messages))
+        if len(unique) == 1:
+            return unique[0]
+        details = "\n".join(f"- {message}" for message in unique)
+        return f"chore: vault update ({len(messages)} changes)\n\n{details}"
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Vault commit failed")
@@ -0,0 +1,243 @@
+"""Incremental wiki-link graph of the vault."""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from d_brain.services.manifest import VaultManifest
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+SKIP_DIRS = {"attachments", "templates"}
+LINKED_DIRS = ("thoughts/",)  # Notes that get related links added
+MIN_SHARED_TAGS = 2
+MAX_NEW_LINKS = 3
+LINKS_HEADING = "## Связи"
+
+WIKI_LINK = re.compile(r"\[\[([^\]|#\n]+)(?:#[^\]|\n]*)?(?:\|[^\]\n]*)?\]\]")
+FRONTMATTER = re.compile(r"\A---\n(.*?)\n---\n", re.DOTALL)
+TAGS_LINE = re.compile(r"^tags:\s*\[(.*)\]\s*$", re.MULTILINE)
+TITLE = re.compile(r"^# (.+)$", re.MULTILINE)
+
+
+@dataclass
+class GraphUpdate:
+    """Result of a graph update."""
+
+    scanned: int = 0
+    reparsed: int = 0
+    removed: int = 0
+    linked: list[Path] = field(default_factory=list)
+    stats: dict[str, int] = field(default_factory=dict)
+
+
+def _parse_note(text: str, fallback_title: str) -> dict[str, Any]:
+    tags: list[str] = []
+    frontmatter = FRONTMATTER.match(text)
+    if frontmatter and (tags_line := TAGS_LINE.search(frontmatter.group(1))):
+        tags = [
+            tag.strip().strip("'\"").lower()
+            for tag in tags_line.group(1).split(",")
+            if tag.strip()
+        ]
+    title = TITLE.search(text)
+    return {
+        "title": title.group(1).strip() if title else fallback_title,
+        "tags": tags,
+        "links": sorted({m.group(1).strip() for m in WIKI_LINK.finditer(text)}),
+    }
+
+
+class GraphBuilder:
+    """Keeps a persisted index of notes, tags and wiki-links in the vault.
+
+    `update` takes the notes changed since its previous run from the vault
+    manifest and re-parses only those, so repeated updates on a large vault
+    cost little more than a manifest refresh. With `apply`, notes under
+    thoughts/ that changed get up to MAX_NEW_LINKS links to notes sharing
+    at least MIN_SHARED_TAGS tags, appended to their "## Связи" section.
+    """
+
+    def __init__(
+        self, vault_path: Path, index_path: Path, manifest: VaultManifest
+    ) -> None:
+        self.vault_path = Path(vault_path)
+        self.index_path = Path(index_path)
+        self.manifest = manifest
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> dict[str, Any]:
+        try:
+            index: dict[str, Any] = json.loads(
+                self.index_path.read_text(encoding="utf-8")
+            )
+            if index.get("version") == INDEX_VERSION:
+                return index
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {"version": INDEX_VERSION, "checkpoint": 0, "notes": {}}
+
+    def _save_index(self, index: dict[str, Any]) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _is_note(key: str) -> bool:
+        return key.endswith(".md") and not SKIP_DIRS.intersection(key.split("/")[:-1])
+
+    def _parse(self, key: str, stat: os.stat_result) -> dict[str, Any]:
+        text = (self.vault_path / key).read_text(encoding="utf-8", errors="replace")
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            **_parse_note(text, Path(key).stem),
+        }
+
+    def update(self, apply: bool = False) -> GraphUpdate:
+        """Bring the index up to date with the vault.
+
+        Args:
+            apply: Add related links to changed notes under thoughts/
+
+        Returns:
+            What was re-parsed and linked, plus graph statistics
+        """
+        with self._lock:
+            index = self._load_index()
+            notes: dict[str, Any] = index["notes"]
+            changes = self.manifest.changes_since(index["checkpoint"])
+            candidates = [key for key in changes.changed if self._is_note(key)]
+
+            removed = set(changes.removed)
+            if changes.full:
+                removed |= notes.keys() - set(candidates)
+            dropped = removed & notes.keys()
+            for key in dropped:
+                del notes[key]
+
+            changed = []
+            for key in candidates:
+                try:
+                    stat = (self.vault_path / key).stat()
+                except FileNotFoundError:
+                    notes.pop(key, None)
+                    continue
+                note = notes.get(key)
+                # Skip notes this builder wrote itself (links added last time)
+                if note and (note["mtime_ns"], note["size"]) == (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                ):
+                    continue
+                notes[key] = self._parse(key, stat)
+                changed.append(key)
+            result = GraphUpdate(
+                scanned=len(notes),
+                reparsed=len(changed),
+                removed=len(dropped),
+            )
+
+            # A full rebuild sees every note as changed; only link new edits
+            if apply and not changes.full:
+                for key in changed:
+                    if key.startswith(LINKED_DIRS) and self._add_related(notes, key):
+                        result.linked.append(self.vault_path / key)
+
+            index["checkpoint"] = changes.checkpoint
+            self._save_index(index)
+            result.stats = self._stats(notes)
+            logger.info(
+                "Graph updated: %d notes, %d re-parsed, %d linked",
+                result.scanned,
+                result.reparsed,
+                len(result.linked),
+            )
+            return result
+
+    @staticmethod
+    def _resolver(notes: dict[str, Any]) -> Callable[[str], str | None]:
+        """Build a function that maps wiki-link targets to note keys.
+
+        Targets are tried as vault-relative paths first (with or without a
+        "vault/" prefix), then as bare note names, as Obsidian does.
+        """
+        by_name: dict[str, str] = {}
+        for key in sorted(notes):
+            by_name.setdefault(key.rsplit("/", 1)[-1], key)
+
+        def resolve(target: str) -> str | None:
+            target = target.removeprefix("vault/").removesuffix(".md")
+            if f"{target}.md" in notes:
+                return f"{target}.md"
+            return by_name.get(f"{target.rsplit('/', 1)[-1]}.md")
+
+        return resolve
+
+    def _add_related(self, notes: dict[str, Any], key: str) -> bool:
+        """Append links to notes sharing tags with `key`; True if it changed."""
+        note = notes[key]
+        tags = set(note["tags"])
+        if not tags:
+            return False
+
+        resolve = self._resolver(notes)
+        linked = {resolve(target) for target in note["links"]}
+        shared = Counter(
+            {
+                other: len(tags & set(data["tags"]))
+                for other, data in notes.items()
+                if other != key and other not in linked
+            }
+        )
+        related = [
+            other
+            for other, count in shared.most_common(MAX_NEW_LINKS)
+            if count >= MIN_SHARED_TAGS
+        ]
+        if not related:
+            return False
+
+        path = self.vault_path / key
+        text = path.read_text(encoding="utf-8")
+        links = "\n".join(
+            f"- [[{other.removesuffix('.md')}|{notes[other]['title']}]]"
+            for other in related
+        )
+        heading = text.find(f"\n{LINKS_HEADING}\n")
+        if heading == -1:
+            text = text.rstrip("\n") + f"\n\n{LINKS_HEADING}\n\n{links}\n"
+        else:
+            # Add to the end of the existing section
+            next_section = text.find("\n## ", heading + 1)
+            end = len(text) if next_section == -1 else next_section
+            text = f"{text[:end].rstrip(chr(10))}\n{links}\n{text[end:]}"
+        path.write_text(text, encoding="utf-8")
+
+        notes[key] = self._parse(key, path.stat())
+        logger.info("Linked %s to %s", key, ", ".join(related))
+        return True
+
+    def _stats(self, notes: dict[str, Any]) -> dict[str, int]:
+        """Note, link and orphan counts, like the graph-builder analyze step."""
+        resolve = self._resolver(notes)
+        outgoing = {
+            key: {resolve(target) for target in data["links"]} - {None}
+            for key, data in notes.items()
+        }
+        incoming = {target for targets in outgoing.values() for target in targets}
+        return {
+            "notes": len(notes),
+            "links": sum(len(targets) for targets in outgoing.values()),
+            "orphans": sum(
+                1 for key in notes if not outgoing[key] and key not in incoming
+            ),
+        }
@@ -0,0 +1,213 @@
+"""Recompression and thumbnails for photo attachments.
+
+Needs Pillow (the `images` extra); without it the pipeline stays off.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from d_brain.services.attachments import AttachmentStore
+
+try:
+    from PIL import Image, ImageOps
+
+    HAS_PILLOW = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_PILLOW = False
+
+logger = logging.getLogger(__name__)
+
+THUMB_SUFFIX = ".thumb.jpg"
+ORIGINAL_MARKER = ".orig"
+SUPPORTED_SUFFIXES = {".jpg", ".jpeg"}  # Re-encoded as JPEG under the same name
+
+
+@dataclass
+class ImageResult:
+    """Outcome of processing one image."""
+
+    path: str  # Vault-relative path of the (recompressed) image
+    thumbnail: str  # Vault-relative path of its thumbnail
+    original: str | None  # Vault-relative path of the kept original, if any
+    saved_bytes: int
+
+
+def _recompress(
+    path: str,
+    work_dir: str,
+    max_size: int,
+    quality: int,
+    thumb_size: int,
+    keep_original: bool,
+) -> tuple[int, int, str, str | None, str | None]:
+    """Re-encode an image and make its thumbnail (runs in a worker).
+
+    Results are written to temp files in `work_dir`; the source is left
+    untouched, it may be a blob shared with other attachments.
+
+    Returns:
+        Tuple of (original size, new size, thumbnail file, recompressed
+        file or None if it is not smaller, copy of the original or None)
+    """
+    source = Path(path)
+    original_size = source.stat().st_size
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        thumb = image.copy()
+        thumb.thumbnail((thumb_size, thumb_size))
+        fd, thumb_path = tempfile.mkstemp(dir=work_dir, suffix=THUMB_SUFFIX)
+        with os.fdopen(fd, "wb") as f:
+            thumb.save(f, "JPEG", quality=quality, optimize=True)
+
+        image.thumbnail((max_size, max_size))
+        fd, tmp_path = tempfile.mkstemp(dir=work_dir, suffix=".jpg")
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, "JPEG", quality=quality, optimize=True, progressive=True)
+
+    new_size = Path(tmp_path).stat().st_size
+    if new_size >= original_size:
+        # Already small enough: keep the received file as it is
+        os.unlink(tmp_path)
+        return original_size, original_size, thumb_path, None, None
+
+    original = None
+    if keep_original:
+        fd, original = tempfile.mkstemp(dir=work_dir, suffix=source.suffix)
+        os.close(fd)
+        shutil.copyfile(source, original)
+    return original_size, new_size, thumb_path, tmp_path, original
+
+
+class ImagePipeline:
+    """Shrinks photo attachments and makes thumbnails in a process pool.
+
+    Images are downscaled to fit `max_size` pixels, re-encoded as JPEG with
+    `quality`, and get a `thumb_size` thumbnail next to them
+    ({stem}.thumb.jpg). The recompressed image keeps the attachment's path,
+    so embeds and the attachment index stay valid; the received file is
+    kept as {stem}.orig.{ext} only with `keep_originals`. Decoding and
+    encoding run in worker processes, never on the event loop, and results
+    are stored through the attachment store like any other attachment.
+
+    Bytes saved are logged and added up in `stats_path`.
+    """
+
+    def __init__(
+        self,
+        attachments: AttachmentStore,
+        stats_path: Path,
+        max_size: int = 2048,
+        quality: int = 82,
+        thumb_size: int = 320,
+        keep_originals: bool = False,
+        workers: int = 1,
+    ) -> None:
+        self.attachments = attachments
+        self.stats_path = Path(stats_path)
+        self.max_size = max_size
+        self.quality = quality
+        self.thumb_size = thumb_size
+        self.keep_originals = keep_originals
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        if not HAS_PILLOW:
+            logger.warning("Pillow is not installed, photos are stored as received")
+
+    @property
+    def available(self) -> bool:
+        """Whether Pillow is installed."""
+        return HAS_PILLOW
+
+    def accepts(self, relative_path: str) -> bool:
+        """Whether an attachment can be processed."""
+        suffix = Path(relative_path).suffix.lower()
+        return self.available and suffix in SUPPORTED_SUFFIXES
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes once running jobs are done."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def process(self, relative_path: str) -> ImageResult:
+        """Recompress an attachment and create its thumbnail.
+
+        Args:
+            relative_path: Vault-relative path of the image
+
+        Returns:
+            Paths of the results and bytes saved
+        """
+        path = PurePosixPath(relative_path)
+        thumb_path = str(path.with_name(path.stem + THUMB_SUFFIX))
+        original_path = str(path.with_name(path.stem + ORIGINAL_MARKER + path.suffix))
+        if self.attachments.exists(thumb_path):
+            # Processed when it was first received (deduplicated attachment)
+            return ImageResult(
+                path=relative_path,
+                thumbnail=thumb_path,
+                original=(
+                    original_path if self.attachments.exists(original_path) else None
+                ),
+                saved_bytes=0,
+            )
+
+        work_dir = self.attachments.uploads_dir
+        work_dir.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        outcome = await loop.run_in_executor(
+            self._get_executor(),
+            _recompress,
+            str(self.attachments.local_path(relative_path)),
+            str(work_dir),
+            self.max_size,
+            self.quality,
+            self.thumb_size,
+            self.keep_originals,
+        )
+        original_size, new_size, thumb_file, image_file, original_file = outcome
+        # Original first, so it is in place before the image is replaced
+        if original_file:
+            self.attachments.put(Path(original_file), original_path)
+        if image_file:
+            self.attachments.put(Path(image_file), relative_path)
+        self.attachments.put(Path(thumb_file), thumb_path)
+
+        saved = original_size - new_size
+        self._record(original_size, new_size)
+        logger.info(
+            "Recompressed %s: %d -> %d bytes", relative_path, original_size, new_size
+        )
+        return ImageResult(
+            path=relative_path,
+            thumbnail=thumb_path,
+            original=original_path if original_file else None,
+            saved_bytes=saved,
+        )
+
+    def _record(self, original_size: int, new_size: int) -> None:
+        try:
+            stats = json.loads(self.stats_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            stats = {"images": 0, "bytes_in": 0, "bytes_out": 0}
+        stats["images"] += 1
+        stats["bytes_in"] += original_size
+        stats["bytes_out"] += new_size
+        tmp_path = self.stats_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(stats), encoding="utf-8")
+        os.replace(tmp_path, self.stats_path)
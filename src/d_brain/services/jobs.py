@@ -0,0 +1,323 @@
+"""Scheduler for long-running Claude jobs."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from d_brain.services.progress import ProgressCallback, ProgressEvent
+
+logger = logging.getLogger(__name__)
+
+JobFactory = Callable[[str, ProgressCallback], Awaitable[dict[str, Any]]]
+
+
+CANCELLED_REPORT: dict[str, Any] = {"error": "Cancelled", "processed_entries": 0}
+
+
+class JobStore:
+    """Job records on disk, so jobs survive bot restarts.
+
+    Each job is a small JSON file at {jobs_dir}/{job_id}.json with its kind,
+    parameters, state ("queued", "running" or "done"), result and the status
+    messages showing it. The process runner spools the output of the job's
+    Claude run into the same directory; `delete` removes both.
+    """
+
+    def __init__(self, jobs_dir: Path) -> None:
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(self, record: dict[str, Any]) -> None:
+        """Write a job record atomically."""
+        path = self.jobs_dir / f"{record['id']}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def delete(self, job_id: str) -> None:
+        """Remove a job record and the spooled output of its run."""
+        for path in self.jobs_dir.glob(f"{job_id}.*"):
+            path.unlink(missing_ok=True)
+
+    def load(self) -> list[dict[str, Any]]:
+        """Load all job records, oldest first."""
+        records = []
+        for path in self.jobs_dir.glob("*.json"):
+            if path.name.endswith(".proc.json"):
+                continue
+            try:
+                records.append(json.loads(path.read_text(encoding="utf-8")))
+            except (json.JSONDecodeError, OSError):
+                logger.warning("Skipping unreadable job record %s", path)
+        return sorted(records, key=lambda r: r.get("created_at", 0))
+
+
+class Job:
+    """A scheduled Claude run shared by everyone who asked for it."""
+
+    def __init__(
+        self,
+        kind: str,
+        key: str,
+        params: dict[str, Any] | None = None,
+        job_id: str | None = None,
+    ) -> None:
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.params = params or {}
+        self.state = "queued"
+        self.created_at = time.time()
+        self.result: dict[str, Any] | None = None
+        self.messages: list[tuple[int, int]] = []  # (chat_id, message_id)
+        self.position = 0  # 0 = running or about to start, N = N-th in queue
+        self.running = False
+        self.cancel_requested = False
+        self.waiters = 1
+        self.task: asyncio.Task[dict[str, Any]] | None = None
+        self._go = asyncio.Event()
+        self._listeners: list[ProgressCallback] = []
+
+    def add_listener(self, listener: ProgressCallback) -> None:
+        """Subscribe to progress events; the current queue state is sent first."""
+        self._listeners.append(listener)
+        listener(self._queue_event())
+
+    def emit(self, event: ProgressEvent) -> None:
+        """Forward a progress event to every listener."""
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Job listener failed")
+
+    def _queue_event(self) -> ProgressEvent:
+        return ProgressEvent("queue", "queue", str(self.position))
+
+    def to_record(self) -> dict[str, Any]:
+        """Serialize for the job store."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "params": self.params,
+            "state": self.state,
+            "created_at": self.created_at,
+            "result": self.result,
+            "messages": self.messages,
+        }
+
+    async def wait(self) -> dict[str, Any]:
+        """Wait for the shared result without cancelling the job for others."""
+        assert self.task is not None
+        try:
+            return await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if self.task.cancelled() and self.cancel_requested:
+                return dict(CANCELLED_REPORT)
+            raise
+
+
+class JobScheduler:
+    """Single-flight, bounded-concurrency scheduler for Claude jobs.
+
+    Jobs are identified by (kind, key), e.g. ("process", "2026-02-21").
+    Submitting a job that is already queued or running attaches to it
+    instead of starting another Claude process; all waiters get the same
+    result. At most `max_concurrent` jobs run at once, the rest wait in
+    FIFO order and see their queue position through progress events.
+
+    With a `store`, every state change is written to disk and `restore`
+    brings jobs of a previous bot process back after a restart.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        cancel_running: Callable[[str], bool] | None = None,
+        store: JobStore | None = None,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self._cancel_running = cancel_running
+        self.store = store
+        self._jobs: dict[tuple[str, str], Job] = {}
+        self._queue: list[Job] = []
+        self._running = 0
+
+    def submit(
+        self,
+        kind: str,
+        key: str,
+        factory: JobFactory,
+        params: dict[str, Any] | None = None,
+    ) -> tuple[Job, bool]:
+        """Submit a job or attach to an identical one.
+
+        Args:
+            kind: Job type, e.g. "process", "weekly", "do"
+            key: Dedupe key within the kind, e.g. the day
+            factory: Called with (job_id, on_progress) to start the run
+            params: Parameters stored with the job to restore it after a restart
+
+        Returns:
+            Tuple of (job, True if this call created it)
+        """
+        existing = self._jobs.get((kind, key))
+        if existing is not None:
+            existing.waiters += 1
+            logger.info(
+                "Attached to %s job %s (%d waiters)",
+                kind,
+                existing.id,
+                existing.waiters,
+            )
+            return existing, False
+
+        job = Job(kind, key, params)
+        self._start(job, factory)
+        logger.info("Submitted %s job %s (key %s)", kind, job.id, key)
+        return job, True
+
+    def restore(self, record: dict[str, Any], factory: JobFactory) -> Job:
+        """Bring back a job recorded by a previous bot process.
+
+        Finished jobs resolve to their stored result right away. Queued and
+        running jobs are scheduled again; a run that was already started
+        is attached to by the runner instead of being repeated.
+
+        Args:
+            record: Job record from the store
+            factory: Called with (job_id, on_progress) to resume the run
+
+        Returns:
+            The restored job
+        """
+        job = Job(record["kind"], record["key"], record.get("params"), record["id"])
+        job.created_at = record.get("created_at", job.created_at)
+        job.messages = [tuple(m) for m in record.get("messages", [])]
+        job.waiters = 0
+
+        if record.get("state") == "done":
+            job.state = "done"
+            job.result = record.get("result") or dict(CANCELLED_REPORT)
+            result = job.result
+            self._jobs[(job.kind, job.key)] = job
+
+            async def stored() -> dict[str, Any]:
+                return result
+
+            job.task = asyncio.create_task(stored(), name=f"job-{job.kind}-{job.id}")
+            job.task.add_done_callback(lambda _: self._finish(job))
+        else:
+            self._start(job, factory)
+        logger.info("Restored %s job %s (%s)", job.kind, job.id, record.get("state"))
+        return job
+
+    def add_message(self, job: Job, chat_id: int, message_id: int) -> None:
+        """Remember a status message showing the job, for delivery after restarts."""
+        if (chat_id, message_id) not in job.messages:
+            job.messages.append((chat_id, message_id))
+            self._persist(job)
+
+    def forget(self, job: Job) -> None:
+        """Drop a job from the store once its result was delivered."""
+        if self.store is not None:
+            self.store.delete(job.id)
+
+    def _persist(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save(job.to_record())
+        except OSError:
+            logger.exception("Failed to save job %s", job.id)
+
+    def _start(self, job: Job, factory: JobFactory) -> None:
+        self._jobs[(job.kind, job.key)] = job
+        self._queue.append(job)
+        job.task = asyncio.create_task(
+            self._run(job, factory), name=f"job-{job.kind}-{job.id}"
+        )
+        job.task.add_done_callback(lambda _: self._finish(job))
+        self._persist(job)
+        self._dispatch()
+
+    def get(self, job_id: str) -> Job | None:
+        """Find a queued or running job by ID."""
+        return next((job for job in self._jobs.values() if job.id == job_id), None)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job for all of its waiters.
+
+        Returns:
+            True if the job was found
+        """
+        job = self.get(job_id)
+        if job is None or job.task is None:
+            return False
+        if job.running and self._cancel_running is not None:
+            # Kill the Claude process; the job then finishes with an error
+            if self._cancel_running(job.id):
+                return True
+        job.cancel_requested = True
+        job.task.cancel()
+        return True
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while there are free slots."""
+        while self._queue and self._running < self.max_concurrent:
+            job = self._queue.pop(0)
+            self._running += 1
+            job.running = True
+            job.state = "running"
+            self._persist(job)
+            job._go.set()
+
+        for index, job in enumerate(self._queue, start=1):
+            if job.position != index:
+                job.position = index
+                job.emit(job._queue_event())
+
+    def _finish(self, job: Job) -> None:
+        if job in self._queue:
+            self._queue.remove(job)
+        if job.running:
+            job.running = False
+            self._running -= 1
+        self._jobs.pop((job.kind, job.key), None)
+
+        assert job.task is not None
+        if not job.task.cancelled():
+            job.state = "done"
+            exc = job.task.exception()
+            if exc is not None:
+                job.result = {"error": str(exc), "processed_entries": 0}
+            else:
+                job.result = job.task.result()
+            self._persist(job)
+        elif job.cancel_requested:
+            job.state = "done"
+            job.result = dict(CANCELLED_REPORT)
+            self._persist(job)
+        # Otherwise the bot is shutting down: keep the record as it is so the
+        # job is restored on the next start
+        self._dispatch()
+
+    async def _run(self, job: Job, factory: JobFactory) -> dict[str, Any]:
+        try:
+            await job._go.wait()
+            if job.position:
+                job.position = 0
+                job.emit(job._queue_event())
+            return await factory(job.id, job.emit)
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                raise
+            logger.info("%s job %s cancelled", job.kind, job.id)
+            return dict(CANCELLED_REPORT)
@@ -0,0 +1,187 @@
+"""Change tracking for vault files, shared by everything that reacts to edits."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypedDict
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class _ManifestState(TypedDict):
+    version: int
+    base: int  # Checkpoints below it predate the manifest
+    seq: int
+    files: dict[str, dict[str, Any]]
+
+
+@dataclass
+class VaultChanges:
+    """Files that changed between a checkpoint and the current manifest.
+
+    With `full` set, the checkpoint is older than the manifest itself (e.g.
+    the first run of a consumer): `changed` then lists every file, and
+    anything the consumer knows about that is not in it was removed.
+    """
+
+    checkpoint: int
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    full: bool = False
+
+    @property
+    def paths(self) -> list[str]:
+        """Changed and removed files, vault-relative."""
+        return self.changed + self.removed
+
+
+class VaultManifest:
+    """(mtime, size, sha256) of every file in the vault, with change sequence.
+
+    `refresh` stats the vault and hashes only files whose stat changed, so
+    touched-but-unchanged files do not count as changes. Every refresh that
+    finds changes advances the checkpoint; each file remembers the
+    checkpoint it last changed at, and removed files leave a tombstone.
+    Consumers (graph, search index, git staging) keep their own last
+    checkpoint and ask for `changes_since` it instead of scanning the vault
+    themselves.
+
+    Dot directories (.git, .obsidian, the bot's state dir) are not tracked.
+    """
+
+    def __init__(self, vault_path: Path, store_path: Path) -> None:
+        self.vault_path = Path(vault_path)
+        self.store_path = Path(store_path)
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self) -> _ManifestState:
+        try:
+            state: _ManifestState = json.loads(
+                self.store_path.read_text(encoding="utf-8")
+            )
+            if state.get("version") == MANIFEST_VERSION:
+                return state
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        # Start above every checkpoint a consumer may still hold from an
+        # earlier manifest, so they all get a full listing
+        base = time.time_ns()
+        return {"version": MANIFEST_VERSION, "base": base, "seq": base, "files": {}}
+
+    def _save(self) -> None:
+        tmp_path = self.store_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._state), encoding="utf-8")
+        os.replace(tmp_path, self.store_path)
+
+    @property
+    def checkpoint(self) -> int:
+        """Checkpoint of the last refresh."""
+        return self._state["seq"]
+
+    def _scan(self) -> dict[str, os.stat_result]:
+        found: dict[str, os.stat_result] = {}
+        stack = [self.vault_path]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        path = Path(entry.path).relative_to(self.vault_path)
+                        found[path.as_posix()] = entry.stat()
+        return found
+
+    def _hash(self, key: str) -> str | None:
+        try:
+            with (self.vault_path / key).open("rb") as f:
+                return hashlib.file_digest(f, "sha256").hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> VaultChanges:
+        """Record changes made to the vault since the previous refresh.
+
+        Returns:
+            The changes found by this refresh
+        """
+        with self._lock:
+            files = self._state["files"]
+            previous = self._state["seq"]
+            seq = previous + 1
+            changes = VaultChanges(checkpoint=seq)
+            dirty = False
+
+            found = self._scan()
+            for key, known in files.items():
+                if key not in found and not known.get("removed"):
+                    files[key] = {"seq": seq, "removed": True}
+                    changes.removed.append(key)
+
+            for key, stat in found.items():
+                entry = files.get(key)
+                if (
+                    entry
+                    and not entry.get("removed")
+                    and (entry["mtime_ns"], entry["size"])
+                    == (stat.st_mtime_ns, stat.st_size)
+                ):
+                    continue
+                digest = self._hash(key)
+                if digest is None:  # Removed while scanning
+                    continue
+                dirty = True
+                changed = not entry or entry.get("removed") or entry["sha256"] != digest
+                files[key] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha256": digest,
+                    "seq": seq if changed or entry is None else entry["seq"],
+                }
+                if changed:
+                    changes.changed.append(key)
+
+            if changes.paths:
+                self._state["seq"] = seq
+                logger.info(
+                    "Vault manifest: %d changed, %d removed",
+                    len(changes.changed),
+                    len(changes.removed),
+                )
+            else:
+                changes.checkpoint = previous
+            if changes.paths or dirty:
+                self._save()
+            return changes
+
+    def changes_since(self, checkpoint: int, refresh: bool = True) -> VaultChanges:
+        """Files changed after `checkpoint`.
+
+        Args:
+            checkpoint: A checkpoint from an earlier call (0 for everything)
+            refresh: Refresh the manifest first
+
+        Returns:
+            Changes; their `checkpoint` is the one to pass next time
+        """
+        if refresh:
+            self.refresh()
+        with self._lock:
+            full = checkpoint < self._state["base"]
+            changes = VaultChanges(checkpoint=self._state["seq"], full=full)
+            for key, entry in self._state["files"].items():
+                if entry.get("removed"):
+                    if not full and entry["seq"] > checkpoint:
+                        changes.removed.append(key)
+                elif full or entry["seq"] > checkpoint:
+                    changes.changed.append(key)
+            return changes
@@ -0,0 +1,509 @@
+"""Warm MCP servers shared by all Claude runs.
+
+Claude CLI starts every stdio MCP server from mcp-config.json for each run,
+which for `npx -y @doist/todoist-ai` costs 10-30 seconds. The bridge keeps
+one instance of each stdio server running and exposes it on localhost over
+the MCP streamable HTTP transport, so Claude runs connect to a warm server.
+"""
+
+import asyncio
+import hmac
+import itertools
+import json
+import logging
+import os
+import secrets
+import signal
+import uuid
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "2025-06-18"
+READY_TIMEOUT = 90.0  # npx may have to download the package first
+REQUEST_TIMEOUT = 120.0
+HEALTH_INTERVAL = 30.0
+HEALTH_TIMEOUT = 10.0
+RESTART_BACKOFF_MAX = 60.0
+MAX_BODY_BYTES = 10_000_000
+STREAM_LIMIT = 16 * 1024 * 1024  # A tool result is a single JSON line
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+}
+
+
+def _rpc_error(msg_id: Any, code: int, message: str) -> dict[str, Any]:
+    error = {"code": code, "message": message}
+    return {"jsonrpc": "2.0", "id": msg_id, "error": error}
+
+
+def _write_private(path: Path, text: str) -> None:
+    """Write a file only the bot's user can read (it holds the token)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # In case it already existed
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class StdioMcpServer:
+    """One long-lived stdio MCP server process, shared by many clients.
+
+    Client request IDs are rewritten to unique upstream IDs, so requests of
+    concurrent Claude runs never collide. The server is initialized once by
+    the bridge itself; `initialize` requests of clients are answered from
+    that handshake. A health check pings the server and restarts it when it
+    dies or stops answering.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: str,
+        args: list[str],
+        env: dict[str, str] | None = None,
+    ) -> None:
+        self.name = name
+        self.command = command
+        self.args = args
+        self.env = env
+        self.init_result: dict[str, Any] | None = None
+        self._process: asyncio.subprocess.Process | None = None
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._ready = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._supervisor: asyncio.Task[None] | None = None
+        self._readers: set[asyncio.Task[None]] = set()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the server is running and initialized."""
+        return self._ready.is_set()
+
+    async def wait_ready(self, timeout: float = READY_TIMEOUT) -> bool:
+        """Wait until the server is initialized.
+
+        Returns:
+            False if it did not become ready within `timeout` seconds
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def start(self) -> None:
+        """Start the server and keep it running in the background."""
+        if self._supervisor is None:
+            self._supervisor = asyncio.create_task(
+                self._supervise(), name=f"mcp-{self.name}"
+            )
+
+    async def stop(self) -> None:
+        """Stop supervising and kill the server."""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        await self._kill()
+
+    async def request(
+        self, message: dict[str, Any], timeout: float = REQUEST_TIMEOUT
+    ) -> dict[str, Any]:
+        """Send a JSON-RPC request and wait for its response.
+
+        Args:
+            message: Request with the client's own "id"
+            timeout: Seconds to wait for the server
+
+        Returns:
+            Response carrying the client's "id"
+        """
+        client_id = message.get("id")
+        if not await self.wait_ready():
+            return _rpc_error(client_id, -32000, f"MCP server {self.name} not ready")
+
+        upstream_id = next(self._ids)
+        future: asyncio.Future[dict[str, Any]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[upstream_id] = future
+        try:
+            await self._send({**message, "id": upstream_id})
+            response = await asyncio.wait_for(future, timeout=timeout)
+        except TimeoutError:
+            return _rpc_error(client_id, -32001, "MCP request timed out")
+        except (ConnectionError, RuntimeError) as e:
+            return _rpc_error(client_id, -32000, f"MCP server {self.name}: {e}")
+        finally:
+            self._pending.pop(upstream_id, None)
+        return {**response, "id": client_id}
+
+    async def notify(self, message: dict[str, Any]) -> None:
+        """Forward a client notification (other than the handshake ones)."""
+        if message.get("method") == "notifications/initialized":
+            return  # Sent by the bridge itself
+        if self.ready:
+            try:
+                await self._send(message)
+            except (ConnectionError, RuntimeError):
+                logger.debug("Dropped notification for %s", self.name)
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        process = self._process
+        if process is None or process.stdin is None or process.returncode is not None:
+            raise RuntimeError("not running")
+        data = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        async with self._write_lock:
+            process.stdin.write(data)
+            await process.stdin.drain()
+
+    async def _supervise(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self._spawn()
+                await self._handshake()
+                self._ready.set()
+                backoff = 1.0
+                logger.info("MCP server %s is ready", self.name)
+                await self._health_loop()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("MCP server %s failed: %s", self.name, e)
+
+            self._ready.clear()
+            await self._kill()
+            logger.info("Restarting MCP server %s in %.0fs", self.name, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    async def _spawn(self) -> None:
+        env = {**os.environ, **(self.env or {})}
+        self._process = await asyncio.create_subprocess_exec(
+            self.command,
+            *self.args,
+            env=env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=STREAM_LIMIT,
+        )
+        logger.info("Started MCP server %s (pid %d)", self.name, self._process.pid)
+        # Responses are matched per process, so a dying one only fails its own
+        self._pending = {}
+        for reader in (self._read_stdout, self._read_stderr):
+            task = asyncio.create_task(reader(self._process))
+            self._readers.add(task)
+            task.add_done_callback(self._readers.discard)
+
+    async def _handshake(self) -> None:
+        upstream_id = next(self._ids)
+        future: asyncio.Future[dict[str, Any]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[upstream_id] = future
+        try:
+            await self._send(
+                {
+                    "jsonrpc": "2.0",
+                    "id": upstream_id,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": {"name": "d-brain-bridge", "version": "1.0"},
+                    },
+                }
+            )
+            response = await asyncio.wait_for(future, timeout=READY_TIMEOUT)
+        finally:
+            self._pending.pop(upstream_id, None)
+        if "result" not in response:
+            raise RuntimeError(f"initialize failed: {response.get('error')}")
+        self.init_result = response["result"]
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def _health_loop(self) -> None:
+        assert self._process is not None
+        process = self._process
+        while True:
+            try:
+                await asyncio.wait_for(process.wait(), timeout=HEALTH_INTERVAL)
+                raise RuntimeError(f"exited with code {process.returncode}")
+            except TimeoutError:
+                pass
+            response = await self.request(
+                {"jsonrpc": "2.0", "id": "health", "method": "ping"},
+                timeout=HEALTH_TIMEOUT,
+            )
+            if "error" in response:
+                raise RuntimeError(f"health check failed: {response['error']}")
+
+    async def _read_stdout(self, process: asyncio.subprocess.Process) -> None:
+        assert process.stdout is not None
+        pending = self._pending
+        try:
+            while line := await process.stdout.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.debug("%s: %s", self.name, line[:200])
+                    continue
+                await self._dispatch(message, pending)
+        except (ValueError, ConnectionError) as e:
+            logger.warning("MCP server %s output failed: %s", self.name, e)
+        finally:
+            # Fail everything still waiting on this process
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server exited"))
+
+    async def _dispatch(
+        self,
+        message: dict[str, Any],
+        pending: dict[int, asyncio.Future[dict[str, Any]]],
+    ) -> None:
+        if "method" not in message:
+            future = pending.get(message.get("id"))  # type: ignore[arg-type]
+            if future is not None and not future.done():
+                future.set_result(message)
+            return
+        if "id" in message:
+            # Server-to-client requests (sampling, roots) are not supported
+            await self._send(_rpc_error(message["id"], -32601, "Not supported"))
+
+    async def _read_stderr(self, process: asyncio.subprocess.Process) -> None:
+        assert process.stderr is not None
+        while line := await process.stderr.readline():
+            text = line.decode("utf-8", errors="replace").rstrip()
+            logger.debug("%s stderr: %s", self.name, text)
+
+    async def _kill(self) -> None:
+        process = self._process
+        self._process = None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except ProcessLookupError:
+            pass
+        except TimeoutError:
+            os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+
+
+class McpBridge:
+    """Serves warm stdio MCP servers to Claude runs over local HTTP.
+
+    Reads the servers from mcp-config.json, keeps every stdio server running
+    as a StdioMcpServer and listens on 127.0.0.1 for the streamable HTTP
+    transport at /mcp/{name}. `config_path` is a generated mcp-config that
+    points Claude at the bridge (other server types are copied unchanged).
+
+    Any local process can reach the port, so every request must carry the
+    bearer token that the generated config passes to Claude. The token is
+    kept in `token_path` (when given) and reused, so with a fixed `port`
+    Claude runs that outlived a bot restart reconnect to the new bridge:
+    client sessions are not tied to a bridge instance.
+    """
+
+    def __init__(
+        self,
+        source_config: Path,
+        config_path: Path,
+        env: dict[str, str] | None = None,
+        port: int = 0,
+        token_path: Path | None = None,
+    ) -> None:
+        self.source_config = Path(source_config)
+        self.config_path = Path(config_path)
+        self.env = env or {}
+        self.port = port
+        self.token_path = token_path
+        self.token = ""
+        self.servers: dict[str, StdioMcpServer] = {}
+        self._other: dict[str, Any] = {}
+        self._http: asyncio.Server | None = None
+        self._sessions: set[str] = set()
+
+    async def start(self) -> None:
+        """Start the servers and the HTTP listener, then write the config."""
+        config = json.loads(self.source_config.read_text(encoding="utf-8"))
+        for name, server in config.get("mcpServers", {}).items():
+            if server.get("type", "stdio") == "stdio" and "command" in server:
+                self.servers[name] = StdioMcpServer(
+                    name,
+                    server["command"],
+                    list(server.get("args", [])),
+                    {**server.get("env", {}), **self.env},
+                )
+            else:
+                self._other[name] = server
+
+        for server in self.servers.values():
+            server.start()
+
+        self.token = self._load_token()
+        self._http = await asyncio.start_server(
+            self._handle_connection, "127.0.0.1", self.port, limit=STREAM_LIMIT
+        )
+        port = self._http.sockets[0].getsockname()[1]
+        bridged = {
+            name: {
+                "type": "http",
+                "url": f"http://127.0.0.1:{port}/mcp/{name}",
+                "headers": {"Authorization": f"Bearer {self.token}"},
+            }
+            for name in self.servers
+        }
+        _write_private(
+            self.config_path,
+            json.dumps({"mcpServers": {**self._other, **bridged}}, indent=2),
+        )
+        logger.info("MCP bridge listening on port %d: %s", port, ", ".join(bridged))
+
+    async def stop(self) -> None:
+        """Stop the listener and all servers."""
+        self.config_path.unlink(missing_ok=True)
+        if self._http is not None:
+            self._http.close()
+            await self._http.wait_closed()
+            self._http = None
+        for server in self.servers.values():
+            await server.stop()
+
+    def _load_token(self) -> str:
+        """The stored token, or a new one (stored when there is a path)."""
+        if self.token_path is not None:
+            try:
+                token = self.token_path.read_text(encoding="utf-8").strip()
+            except FileNotFoundError:
+                token = ""
+            if token:
+                return token
+        token = secrets.token_urlsafe(32)
+        if self.token_path is not None:
+            _write_private(self.token_path, token)
+        return token
+
+    def _authorized(self, headers: dict[str, str]) -> bool:
+        expected = f"Bearer {self.token}".encode("latin-1")
+        received = headers.get("authorization", "").encode("latin-1")
+        return bool(self.token) and hmac.compare_digest(received, expected)
+
+    @property
+    def ready(self) -> bool:
+        """Whether every bridged server is up."""
+        return self._http is not None and all(s.ready for s in self.servers.values())
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:  # Keep-alive: one request after another
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {
+                    key.strip().lower(): value.strip()
+                    for key, _, value in (h.partition(":") for h in header_lines if h)
+                }
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, extra = await self._handle_request(
+                    method, path, headers, body
+                )
+                await self._respond(writer, status, payload, extra)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except Exception:
+            logger.exception("MCP bridge request failed")
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, Any, dict[str, str]]:
+        if not self._authorized(headers):
+            return 401, None, {"WWW-Authenticate": "Bearer"}
+        server = self.servers.get(path.split("?")[0].removeprefix("/mcp/"))
+        if server is None:
+            return 404, None, {}
+        if method == "DELETE":
+            self._sessions.discard(headers.get("mcp-session-id", ""))
+            return 200, None, {}
+        if method != "POST":
+            # No server-initiated stream (GET): allowed by the transport spec
+            return 405, None, {"Allow": "POST, DELETE"}
+
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            return 400, _rpc_error(None, -32700, "Parse error"), {}
+
+        messages = payload if isinstance(payload, list) else [payload]
+        extra: dict[str, str] = {}
+        responses = []
+        for message in messages:
+            if "id" not in message or "method" not in message:
+                await server.notify(message)
+                continue
+            if message["method"] == "initialize":
+                response = await self._initialize(server, message)
+                session_id = uuid.uuid4().hex
+                self._sessions.add(session_id)
+                extra["Mcp-Session-Id"] = session_id
+            else:
+                response = await server.request(message)
+            responses.append(response)
+
+        if not responses:
+            return 202, None, extra
+        return 200, responses if isinstance(payload, list) else responses[0], extra
+
+    @staticmethod
+    async def _initialize(
+        server: StdioMcpServer, message: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Answer a client's initialize from the bridge's own handshake."""
+        if not await server.wait_ready():
+            return _rpc_error(message["id"], -32000, f"{server.name} not ready")
+        return {"jsonrpc": "2.0", "id": message["id"], "result": server.init_result}
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any = None,
+        extra: dict[str, str] | None = None,
+    ) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{key}: {value}" for key, value in (extra or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
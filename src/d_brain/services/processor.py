@@ -1,26 +1,92 @@
 """Claude processing service."""
 
+import asyncio
+import fcntl
+import json
 import logging
 import os
-import subprocess
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import date
 from pathlib import Path
 from typing import Any
 
+from d_brain.services.daily import PROCESSED_MARKER, fingerprint, parse_daily
+from d_brain.services.graph import GraphBuilder
+from d_brain.services.manifest import VaultManifest
+from d_brain.services.progress import (
+    ClaudeStreamParser,
+    ProgressCallback,
+    ProgressEvent,
+)
+from d_brain.services.runner import ProcessRunner, RunResult
+from d_brain.services.search import MATCH_END, MATCH_START, VaultIndex
 from d_brain.services.session import SessionStore
+from d_brain.services.state import ensure_state_dir
+from d_brain.services.todoist import TodoistMirror
+from d_brain.services.weekly import build_week_bundle, week_days
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 1200  # 20 minutes
+MAX_OUTPUT_BYTES = 20_000_000  # stream-json carries tool results too
+PROCESS_LOCK_POLL = 5.0  # seconds between attempts to take the process lock
+DAY_SUMMARY_TIMEOUT = 180
+DAY_SUMMARY_CONCURRENCY = 3  # Summary runs at a time, across all jobs
 
 
 class ClaudeProcessor:
-    """Service for triggering Claude Code processing."""
-
-    def __init__(self, vault_path: Path, todoist_api_key: str = "") -> None:
+    """Service for triggering Claude Code processing.
+
+    Reports carry a "touched_paths" list with the vault paths that were
+    changed. For Claude runs, which can edit any file in the vault, it comes
+    from the vault manifest: everything that changed between the start of
+    the run and its end. Without the list callers should fall back to a
+    full git scan.
+    """
+
+    def __init__(
+        self,
+        vault_path: Path,
+        todoist_api_key: str = "",
+        session: SessionStore | None = None,
+        runner: ProcessRunner | None = None,
+        mcp_config_path: Path | None = None,
+        todoist: TodoistMirror | None = None,
+        index: VaultIndex | None = None,
+        manifest: VaultManifest | None = None,
+        graph_links: bool = False,
+    ) -> None:
         self.vault_path = Path(vault_path)
         self.todoist_api_key = todoist_api_key
-        self._mcp_config_path = (self.vault_path.parent / "mcp-config.json").resolve()
+        self._session = session
+        self._todoist = todoist
+        self._index = index
+        self.runner = runner or ProcessRunner()
+        self._default_mcp_config_path = (
+            self.vault_path.parent / "mcp-config.json"
+        ).resolve()
+        # E.g. the config written by McpBridge; used while it exists
+        self._mcp_config_path = mcp_config_path
+        # Shared with scripts/process.sh (flock) so daily runs never overlap
+        self._process_lock_path = self.vault_path.parent / ".process.lock"
+        self._state_dir = ensure_state_dir(self.vault_path)
+        self._summary_slots = asyncio.Semaphore(DAY_SUMMARY_CONCURRENCY)
+        # Strong references to summaries made after /process
+        self._background: set[asyncio.Task[Any]] = set()
+        self._manifest = manifest or VaultManifest(
+            self.vault_path, self._state_dir / "manifest.json"
+        )
+        self._graph = GraphBuilder(
+            self.vault_path, self._state_dir / "graph.json", self._manifest
+        )
+        # Adding links edits the user's notes, so it is opt-in
+        self._graph_links = graph_links
+
+    def _get_mcp_config_path(self) -> Path:
+        if self._mcp_config_path is not None and self._mcp_config_path.exists():
+            return self._mcp_config_path
+        return self._default_mcp_config_path
 
     def _load_skill_content(self) -> str:
         """Load dbrain-processor skill content for inclusion in prompt.
@@ -52,7 +118,7 @@ class ClaudeProcessor:
         if user_id == 0:
             return ""
 
-        session = SessionStore(self.vault_path)
+        session = self._session or SessionStore(self.vault_path)
         today_entries = session.get_today(user_id)
         if not today_entries:
             return ""
@@ -67,6 +133,18 @@ class ClaudeProcessor:
         lines.append("=== END SESSION ===\n")
         return "\n".join(lines)
 
+    def _get_todoist_context(self, title: str, tasks: list[dict[str, Any]]) -> str:
+        """Tasks from the local Todoist mirror, formatted for the prompt.
+
+        Returns an empty string when there is no synced mirror, so the
+        prompt falls back to Claude fetching tasks through MCP.
+        """
+        if self._todoist is None or self._todoist.synced_at is None:
+            return ""
+        synced = self._todoist.synced_at.astimezone().strftime("%Y-%m-%d %H:%M")
+        listing = self._todoist.format_tasks(tasks) or "(нет)"
+        return f"=== {title} (снимок Todoist на {synced}) ===\n{listing}\n"
+
     def _html_to_markdown(self, html: str) -> str:
         """Convert Telegram HTML to Obsidian Markdown."""
         import re
@@ -124,28 +202,388 @@ week: {year}-W{week:02d}
                 moc_path.write_text(content)
                 logger.info("Updated MOC-weekly.md with link to %s", summary_path.stem)
 
-    def _update_graph(self) -> None:
-        """Run graph builder to add wiki-links after processing."""
-        script = self.vault_path / ".claude/skills/graph-builder/scripts/add_links.py"
-        if not script.exists():
-            return
+    def _process_cache_file(self, day: date) -> Path:
+        return self._state_dir / "process" / f"{day.isoformat()}.json"
+
+    def _load_cached_report(self, day: date, content_hash: str) -> str | None:
+        """Report of the last successful run if the daily file is unchanged."""
         try:
-            subprocess.run(
-                ["uv", "run", str(script), "--apply"],
-                cwd=self.vault_path.parent,
-                capture_output=True,
-                timeout=60,
-                check=False,
+            cached = json.loads(self._process_cache_file(day).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if cached.get("fingerprint") != content_hash:
+            return None
+        report: str | None = cached.get("report")
+        return report
+
+    def _save_cached_report(self, day: date, content_hash: str, report: str) -> None:
+        cache_file = self._process_cache_file(day)
+        cache_file.parent.mkdir(exist_ok=True)
+        cache_file.write_text(
+            json.dumps({"fingerprint": content_hash, "report": report}),
+            encoding="utf-8",
+        )
+
+    def _day_summary_file(self, day: date) -> Path:
+        return self._state_dir / "day-summaries" / f"{day.isoformat()}.json"
+
+    async def _summarize_day(
+        self,
+        day: date,
+        content: str,
+        job_id: str | None,
+        on_progress: ProgressCallback | None,
+    ) -> str | None:
+        """Short summary of one daily file, cached by its content hash.
+
+        The run belongs to the job `job_id`: cancelling the job kills it.
+        At most DAY_SUMMARY_CONCURRENCY summaries run at a time.
+        """
+        content_hash = fingerprint(content)
+        cache_file = self._day_summary_file(day)
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            if cached.get("fingerprint") == content_hash:
+                summary: str = cached["summary"]
+                return summary
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        if on_progress:
+            on_progress(ProgressEvent("tool", "summary", day.isoformat()))
+        prompt = f"""Кратко перескажи записи дня {day} (до 5 пунктов): события,
+решения, задачи, мысли. Только обычный текст, без HTML и без вступления.
+
+{content.replace(PROCESSED_MARKER, "")}"""
+        # Run as part of the job, not spooled: short enough to redo after
+        # a restart
+        async with self._summary_slots:
+            output, error = await self._run_claude(
+                prompt,
+                "Day summary",
+                parent_id=job_id,
+                timeout=DAY_SUMMARY_TIMEOUT,
+                mcp=False,
             )
-            logger.info("Graph updated successfully")
+        if error or not output:
+            logger.warning("Failed to summarize %s: %s", day, error)
+            return None
+
+        cache_file.parent.mkdir(exist_ok=True)
+        cache_file.write_text(
+            json.dumps({"fingerprint": content_hash, "summary": output}),
+            encoding="utf-8",
+        )
+        return output
+
+    async def summarize_days(
+        self,
+        days: list[date],
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> dict[date, str]:
+        """Summaries of the given days' daily files, in parallel where missing.
+
+        Days without a daily file are skipped; days whose summary failed are
+        left out, so callers fall back to the raw entries for them.
+
+        Args:
+            days: Days to summarize
+            job_id: Job the summary runs belong to (cancelled with it)
+            on_progress: Called when a summary run starts
+
+        Returns:
+            Summary per day
+        """
+
+        async def summarize(day: date) -> str | None:
+            daily_file = self.vault_path / "daily" / f"{day.isoformat()}.md"
+            if not daily_file.exists():
+                return None
+            return await self._summarize_day(
+                day, daily_file.read_text(encoding="utf-8"), job_id, on_progress
+            )
+
+        summaries = await asyncio.gather(*(summarize(day) for day in days))
+        return {
+            day: summary
+            for day, summary in zip(days, summaries, strict=True)
+            if summary is not None
+        }
+
+    def _summarize_later(self, day: date) -> None:
+        """Summarize a processed day in the background, for the weekly digest."""
+
+        async def summarize() -> None:
+            try:
+                await self.summarize_days([day])
+            except Exception:
+                logger.exception("Failed to summarize %s", day)
+
+        task = asyncio.create_task(summarize(), name=f"day-summary-{day}")
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain(self) -> None:
+        """Wait for background summaries (before a script's event loop ends)."""
+        if self._background:
+            await asyncio.gather(*self._background)
+
+    @asynccontextmanager
+    async def _process_lock(self) -> AsyncIterator[None]:
+        """Hold the cross-process daily processing lock."""
+        with self._process_lock_path.open("w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    logger.info("Daily processing is running elsewhere, waiting...")
+                    await asyncio.sleep(PROCESS_LOCK_POLL)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def _build_daily_prompt(self, day: date, entries: list[str]) -> str:
+        """Prompt for processing only the given entries of a daily file."""
+        # Load skill content directly (@ references don't work in --print mode)
+        skill_content = self._load_skill_content()
+        entries_text = "\n\n".join(entries)
+
+        todoist_context = (
+            self._get_todoist_context(
+                "ЗАДАЧИ НА СЕГОДНЯ И ПРОСРОЧЕННЫЕ", self._todoist.tasks_due(day)
+            )
+            if self._todoist
+            else ""
+        )
+        related_notes = await self._get_related_notes(entries_text)
+
+        return f"""Сегодня {day}. Выполни ежедневную обработку daily/{day}.md.
+
+Обработай только эти необработанные записи (остальные уже обработаны):
+
+{entries_text}
+
+{todoist_context}
+{related_notes}
+{skill_content}
+
+Vault: {self.vault_path}
+Вызывай mcp__todoist__* напрямую. Возвращай только RAW HTML."""
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a running Claude job.
+
+        Args:
+            job_id: ID passed to process_daily/execute_prompt/generate_weekly
+
+        Returns:
+            True if a running job was found and killed
+        """
+        return self.runner.cancel(job_id)
+
+    async def _get_related_notes(self, text: str) -> str:
+        """Existing notes relevant to `text`, from the search index."""
+        if self._index is None:
+            return ""
+        hits = await asyncio.to_thread(self._index.related, text)
+        if not hits:
+            return ""
+        lines = [
+            f"- {hit.path} ({hit.title}): "
+            + hit.snippet.replace(MATCH_START, "").replace(MATCH_END, "")
+            for hit in hits
+        ]
+        return "=== СВЯЗАННЫЕ ЗАМЕТКИ ===\n" + "\n".join(lines) + "\n=== КОНЕЦ ===\n"
+
+    def _checkpoint_path(self, job_id: str) -> Path | None:
+        # Next to the runner's spool, so it is removed with the job record
+        if self.runner.spool_dir is None:
+            return None
+        return Path(self.runner.spool_dir) / f"{job_id}.checkpoint"
+
+    async def _start_changes(self, job_id: str | None) -> int:
+        """Manifest checkpoint to collect the changes of a Claude run from.
+
+        The checkpoint of a job is kept on disk, so a run attached to after
+        a bot restart still reports what it changed before the restart.
+        """
+        path = self._checkpoint_path(job_id) if job_id else None
+        if path is not None:
+            try:
+                return int(path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                pass
+        checkpoint = (await asyncio.to_thread(self._manifest.refresh)).checkpoint
+        if path is not None:
+            path.write_text(str(checkpoint), encoding="utf-8")
+        return checkpoint
+
+    async def _finish_changes(self, checkpoint: int) -> list[str] | None:
+        """Update graph and search index, then list what changed since `checkpoint`.
+
+        Returns:
+            Absolute paths of changed and removed vault files, including
+            links added by the graph builder; None if they are unknown
+        """
+        await self._update_graph()
+        await self._update_index()
+        try:
+            changes = await asyncio.to_thread(self._manifest.changes_since, checkpoint)
+        except OSError:
+            logger.exception("Failed to collect vault changes")
+            return None
+        return [str(self.vault_path / key) for key in changes.paths]
+
+    async def _update_index(self) -> None:
+        """Re-index notes Claude created or changed."""
+        if self._index is None:
+            return
+        try:
+            await asyncio.to_thread(self._index.update)
+        except Exception as e:
+            logger.warning("Search index update failed: %s", e)
+
+    async def _update_graph(self) -> None:
+        """Add wiki-links to the notes changed by the run, if enabled."""
+        if not self._graph_links:
+            return
+        try:
+            update = await asyncio.to_thread(self._graph.update, True)
+            logger.info("Graph updated: %s", update.stats)
         except Exception as e:
             logger.warning("Graph update failed: %s", e)
 
-    def process_daily(self, day: date | None = None) -> dict[str, Any]:
+    async def _run_claude(
+        self,
+        prompt: str,
+        action: str,
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        mcp: bool = True,
+        parent_id: str | None = None,
+    ) -> tuple[str, str | None]:
+        """Run Claude CLI in print mode with the Todoist MCP server.
+
+        Output is requested as stream-json so tool calls can be reported
+        through `on_progress` while the run is still going. When the runner
+        has a spool and the job was started before a bot restart, this
+        attaches to that run instead of starting a new one.
+
+        Args:
+            prompt: Prompt text
+            action: Name of the run used in error messages
+            job_id: ID under which the run can be cancelled
+            on_progress: Called with every tool call Claude makes
+            timeout: Seconds before the run is killed
+            mcp: Whether to start the MCP servers (not needed for plain text work)
+            parent_id: Job this is a helper run of, instead of `job_id`
+
+        Returns:
+            Tuple of (final output, error message or None)
+
+        Raises:
+            FileNotFoundError: If Claude CLI is not installed
+        """
+        # Pass TODOIST_API_KEY to Claude subprocess
+        env = os.environ.copy()
+        if self.todoist_api_key:
+            env["TODOIST_API_KEY"] = self.todoist_api_key
+
+        args = [
+            "claude",
+            "--print",
+            "--dangerously-skip-permissions",
+            "--output-format",
+            "stream-json",
+            "--verbose",
+        ]
+        if mcp:
+            args += ["--mcp-config", str(self._get_mcp_config_path())]
+
+        parser = ClaudeStreamParser(on_progress)
+        result = await self.runner.run(
+            [*args, "-p", prompt],
+            job_id=job_id,
+            parent_id=parent_id,
+            cwd=self.vault_path.parent,
+            env=env,
+            timeout=timeout,
+            max_output=MAX_OUTPUT_BYTES,
+            on_stdout_line=parser.feed,
+        )
+
+        error = self._run_error(result, action)
+        if error is None and result.returncode is None and parser.result is None:
+            # Attached after a restart and the process died without a result
+            error = f"{action} interrupted"
+        if error is None and parser.is_error:
+            error = parser.text.strip()[:500] or f"{action} failed"
+        if error:
+            logger.error("%s failed (rc=%s): %s", action, result.returncode, error)
+        return parser.text.strip(), error
+
+    async def run_job(
+        self,
+        kind: str,
+        params: dict[str, Any],
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> dict[str, Any]:
+        """Run a scheduled job by kind, as stored in the job store.
+
+        Args:
+            kind: "process", "weekly" or "do"
+            params: Job parameters ("day" for process; "prompt", "user_id" for do)
+            job_id: ID under which the run can be cancelled
+            on_progress: Called with every tool call Claude makes
+
+        Returns:
+            Report of the job
+        """
+        try:
+            if kind == "process":
+                day = date.fromisoformat(params["day"]) if "day" in params else None
+                return await self.process_daily(day, job_id, on_progress)
+            if kind == "weekly":
+                return await self.generate_weekly(job_id, on_progress)
+            if kind == "do":
+                return await self.execute_prompt(
+                    params["prompt"], params.get("user_id", 0), job_id, on_progress
+                )
+            raise ValueError(f"Unknown job kind: {kind}")
+        finally:
+            if job_id is not None:
+                self.runner.forget(job_id)
+
+    @staticmethod
+    def _run_error(result: RunResult, action: str) -> str | None:
+        """Describe why a run did not succeed, or None if it did."""
+        if result.cancelled:
+            return f"{action} cancelled"
+        if result.timed_out:
+            return f"{action} timed out"
+        if result.output_exceeded:
+            return f"{action} output exceeded {MAX_OUTPUT_BYTES} bytes"
+        if result.returncode not in (0, None):
+            return (result.stderr or "").strip()[:500] or f"{action} failed"
+        return None
+
+    async def process_daily(
+        self,
+        day: date | None = None,
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> dict[str, Any]:
         """Process daily file with Claude.
 
         Args:
             day: Date to process (default: today)
+            job_id: ID under which the run can be cancelled
+            on_progress: Called with every tool call Claude makes
 
         Returns:
             Processing report as dict
@@ -160,67 +598,70 @@ week: {year}-W{week:02d}
             return {
                 "report": "📭 Записей нет",
                 "processed_entries": 0,
+                "touched_paths": [],
             }
 
-        # Load skill content directly (@ references don't work in --print mode)
-        skill_content = self._load_skill_content()
-
-        prompt = f"""Сегодня {day}. Выполни ежедневную обработку daily/{day}.md.
-
-{skill_content}
-
-Vault: {self.vault_path}
-Вызывай mcp__todoist__* напрямую. Возвращай только RAW HTML."""
+        # A job restored after a restart may have a run that already marked
+        # the entries as processed: attach to it for its report instead of
+        # short-circuiting on the processed file
+        resuming = job_id is not None and self.runner.has_spool(job_id)
 
         try:
-            # Pass TODOIST_API_KEY to Claude subprocess
-            env = os.environ.copy()
-            if self.todoist_api_key:
-                env["TODOIST_API_KEY"] = self.todoist_api_key
-
-            result = subprocess.run(
-                [
-                    "claude",
-                    "--print",
-                    "--dangerously-skip-permissions",
-                    "--mcp-config",
-                    str(self._mcp_config_path),
-                    "-p",
-                    prompt,
-                ],
-                cwd=self.vault_path.parent,
-                capture_output=True,
-                text=True,
-                timeout=DEFAULT_TIMEOUT,
-                check=False,
-                env=env,
-            )
+            async with self._process_lock():
+                content = daily_file.read_text(encoding="utf-8")
+                content_hash = fingerprint(content)
+                cached = None
+                if not resuming:
+                    cached = self._load_cached_report(day, content_hash)
+                if cached is not None:
+                    logger.info("Daily file for %s unchanged, using cached report", day)
+                    return {
+                        "report": cached,
+                        "processed_entries": 0,
+                        "touched_paths": [],
+                    }
+
+                pending = [e for e in parse_daily(content) if not e.processed]
+                if not pending and not resuming:
+                    logger.info("No unprocessed entries for %s, skipping", day)
+                    return {
+                        "report": "✅ Новых записей нет",
+                        "processed_entries": 0,
+                        "touched_paths": [],
+                    }
+
+                checkpoint = await self._start_changes(job_id)
+                output, error = await self._run_claude(
+                    await self._build_daily_prompt(day, [e.text for e in pending]),
+                    "Processing",
+                    job_id,
+                    on_progress,
+                )
+                if error:
+                    return {
+                        "error": error,
+                        "processed_entries": 0,
+                    }
 
-            if result.returncode != 0:
-                stderr_snippet = (result.stderr or "").strip()[:500]
-                logger.error("Claude processing failed (rc=%d): %s", result.returncode, stderr_snippet)
-                error_msg = stderr_snippet or "Claude processing failed"
-                return {
-                    "error": error_msg,
-                    "processed_entries": 0,
-                }
+                # Claude marked the entries as processed: remember the result
+                # for the file as it is now
+                processed = daily_file.read_text(encoding="utf-8")
+                self._save_cached_report(day, fingerprint(processed), output)
+
+            # Update graph and search index after processing
+            touched_paths = await self._finish_changes(checkpoint)
 
-            # Update graph after processing
-            self._update_graph()
+            # Summarize the day now, so the weekly digest finds it cached;
+            # a failed summary is made again by the digest
+            self._summarize_later(day)
 
             # Return human-readable output
-            output = result.stdout.strip()
             return {
                 "report": output,
-                "processed_entries": 1,  # успешно обработано
+                "processed_entries": len(pending),
+                "touched_paths": touched_paths,
             }
 
-        except subprocess.TimeoutExpired:
-            logger.error("Claude processing timed out")
-            return {
-                "error": "Processing timed out",
-                "processed_entries": 0,
-            }
         except FileNotFoundError:
             logger.error("Claude CLI not found")
             return {
@@ -234,12 +675,20 @@ Vault: {self.vault_path}
                 "processed_entries": 0,
             }
 
-    def execute_prompt(self, user_prompt: str, user_id: int = 0) -> dict[str, Any]:
+    async def execute_prompt(
+        self,
+        user_prompt: str,
+        user_id: int = 0,
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> dict[str, Any]:
         """Execute arbitrary prompt with Claude.
 
         Args:
             user_prompt: User's natural language request
             user_id: Telegram user ID for session context
+            job_id: ID under which the run can be cancelled
+            on_progress: Called with every tool call Claude makes
 
         Returns:
             Execution report as dict
@@ -249,51 +698,34 @@ Vault: {self.vault_path}
         # Load context
         todoist_ref = self._load_todoist_reference()
         session_context = self._get_session_context(user_id)
+        related_notes = await self._get_related_notes(user_prompt)
 
         prompt = f"""Дата: {today}. Vault: {self.vault_path}
 {session_context}
+{related_notes}
 Запрос: {user_prompt}
 
 Вызывай mcp__todoist__* напрямую. Возвращай только RAW HTML для Telegram (теги: b, i, code, s, u). Максимум 4096 символов."""
 
         try:
-            env = os.environ.copy()
-            if self.todoist_api_key:
-                env["TODOIST_API_KEY"] = self.todoist_api_key
-
-            result = subprocess.run(
-                [
-                    "claude",
-                    "--print",
-                    "--dangerously-skip-permissions",
-                    "--mcp-config",
-                    str(self._mcp_config_path),
-                    "-p",
-                    prompt,
-                ],
-                cwd=self.vault_path.parent,
-                capture_output=True,
-                text=True,
-                timeout=DEFAULT_TIMEOUT,
-                check=False,
-                env=env,
+            checkpoint = await self._start_changes(job_id)
+            output, error = await self._run_claude(
+                prompt, "Execution", job_id, on_progress
             )
-
-            if result.returncode != 0:
-                logger.error("Claude execution failed: %s", result.stderr)
+            if error:
                 return {
-                    "error": result.stderr or "Claude execution failed",
+                    "error": error,
                     "processed_entries": 0,
                 }
 
+            touched_paths = await self._finish_changes(checkpoint)
+
             return {
-                "report": result.stdout.strip(),
+                "report": output,
                 "processed_entries": 1,
+                "touched_paths": touched_paths,
             }
 
-        except subprocess.TimeoutExpired:
-            logger.error("Claude execution timed out")
-            return {"error": "Execution timed out", "processed_entries": 0}
         except FileNotFoundError:
             logger.error("Claude CLI not found")
             return {"error": "Claude CLI not installed", "processed_entries": 0}
@@ -301,55 +733,79 @@ Vault: {self.vault_path}
             logger.exception("Unexpected error during execution")
             return {"error": str(e), "processed_entries": 0}
 
-    def generate_weekly(self) -> dict[str, Any]:
+    async def generate_weekly(
+        self,
+        job_id: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> dict[str, Any]:
         """Generate weekly digest with Claude.
 
+        Args:
+            job_id: ID under which the run can be cancelled
+            on_progress: Called with every tool call Claude makes
+
         Returns:
             Weekly digest report as dict
         """
         today = date.today()
 
+        try:
+            # Map: short cached summaries per day; reduce: one digest run over
+            # them with the rest of the week's data collected locally
+            summaries = await self.summarize_days(week_days(today), job_id, on_progress)
+            if job_id is not None and self.runner.is_cancelled(job_id):
+                return {"error": "Weekly digest cancelled", "processed_entries": 0}
+            bundle = build_week_bundle(
+                self.vault_path,
+                today,
+                self._session or SessionStore(self.vault_path),
+                summaries,
+            )
+        except FileNotFoundError:
+            logger.error("Claude CLI not found")
+            return {"error": "Claude CLI not installed", "processed_entries": 0}
+        except Exception as e:
+            logger.exception("Unexpected error while preparing weekly digest")
+            return {"error": str(e), "processed_entries": 0}
+
+        completed = (
+            self._get_todoist_context(
+                "ВЫПОЛНЕННЫЕ ЗАДАЧИ ЗА НЕДЕЛЮ",
+                self._todoist.completed_since(week_days(today)[0]),
+            )
+            if self._todoist
+            else ""
+        )
+        completed_hint = (
+            "уже в списке выше"
+            if completed
+            else "через mcp__todoist__get-completed-tasks"
+        )
+
         prompt = f"""Сегодня {today}. Vault: {self.vault_path}
 Сгенерируй недельный дайджест.
 
-1. Прочитай daily/ файлы за неделю
-2. Проверь прогресс по goals/3-weekly.md
-3. Выполненные задачи — через mcp__todoist__get-completed-tasks
+Сводки дней, цели и новые заметки уже собраны ниже — не читай daily/ и goals/ файлы.
+
+{bundle}
+
+{completed}
+1. Оцени прогресс по целям недели
+2. Выполненные задачи — {completed_hint}
 
 Возвращай только RAW HTML для Telegram. Начни с 📅 <b>Недельный дайджест</b>. Теги: b, i, code. Максимум 4096 символов."""
 
         try:
-            env = os.environ.copy()
-            if self.todoist_api_key:
-                env["TODOIST_API_KEY"] = self.todoist_api_key
-
-            result = subprocess.run(
-                [
-                    "claude",
-                    "--print",
-                    "--dangerously-skip-permissions",
-                    "--mcp-config",
-                    str(self._mcp_config_path),
-                    "-p",
-                    prompt,
-                ],
-                cwd=self.vault_path.parent,
-                capture_output=True,
-                text=True,
-                timeout=DEFAULT_TIMEOUT,
-                check=False,
-                env=env,
+            checkpoint = await self._start_changes(job_id)
+            output, error = await self._run_claude(
+                prompt, "Weekly digest", job_id, on_progress
             )
-
-            if result.returncode != 0:
-                logger.error("Weekly digest failed: %s", result.stderr)
+            if error:
                 return {
-                    "error": result.stderr or "Weekly digest failed",
+                    "error": error,
                     "processed_entries": 0,
                 }
 
-            output = result.stdout.strip()
-
             # Save to summaries/ and update MOC
             try:
                 summary_path = self._save_weekly_summary(output, today)
@@ -357,17 +813,15 @@ Vault: {self.vault_path}
             except Exception as e:
                 logger.warning("Failed to save weekly summary: %s", e)
 
-            # Update graph after weekly digest
-            self._update_graph()
+            # Update graph and search index after weekly digest
+            touched_paths = await self._finish_changes(checkpoint)
 
             return {
                 "report": output,
                 "processed_entries": 1,
+                "touched_paths": touched_paths,
             }
 
-        except subprocess.TimeoutExpired:
-            logger.error("Weekly digest timed out")
-            return {"error": "Weekly digest timed out", "processed_entries": 0}
         except FileNotFoundError:
             logger.error("Claude CLI not found")
             return {"error": "Claude CLI not installed", "processed_entries": 0}
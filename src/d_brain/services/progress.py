@@ -0,0 +1,91 @@
+"""Progress events parsed from Claude CLI stream-json output."""
+
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Claude Code tools that take a file_path argument
+READ_TOOLS = {"Read"}
+WRITE_TOOLS = {"Write", "Edit", "MultiEdit", "NotebookEdit"}
+TODOIST_TOOL_PREFIX = "mcp__todoist__"
+
+
+@dataclass
+class ProgressEvent:
+    """A single step of a Claude run, as shown in the status message.
+
+    kind is one of: "tool" (generic tool call), "read" / "write" (file
+    access, `path` is set), "todoist" (Todoist MCP call), "queue" (the
+    job's queue position changed, `detail` holds it; 0 means running).
+    """
+
+    kind: str
+    tool: str
+    detail: str = ""
+    path: str | None = None
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+def _tool_event(block: dict[str, Any]) -> ProgressEvent:
+    name = str(block.get("name", "tool"))
+    tool_input = block.get("input") or {}
+    path = tool_input.get("file_path") or tool_input.get("notebook_path")
+
+    if name.startswith(TODOIST_TOOL_PREFIX):
+        return ProgressEvent("todoist", name, name.removeprefix(TODOIST_TOOL_PREFIX))
+    if name in WRITE_TOOLS and path:
+        return ProgressEvent("write", name, path, path=path)
+    if name in READ_TOOLS and path:
+        return ProgressEvent("read", name, path, path=path)
+
+    detail = tool_input.get("pattern") or tool_input.get("description") or ""
+    return ProgressEvent("tool", name, str(detail)[:80])
+
+
+class ClaudeStreamParser:
+    """Consumes `claude --output-format stream-json` lines.
+
+    Emits a ProgressEvent for every tool call and keeps the final result
+    text, which replaces the plain stdout of `--print` mode.
+    """
+
+    def __init__(self, on_progress: ProgressCallback | None = None) -> None:
+        self.on_progress = on_progress
+        self.result: str | None = None
+        self.is_error = False
+        self._last_text = ""
+
+    @property
+    def text(self) -> str:
+        """Final answer: the result event, or the last assistant text."""
+        return self.result if self.result is not None else self._last_text
+
+    def feed(self, line: str) -> None:
+        """Handle one line of stream-json output."""
+        if not line.strip():
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            logger.debug("Skipping non-JSON output line: %.200s", line)
+            return
+
+        msg_type = message.get("type")
+        if msg_type == "result":
+            self.result = str(message.get("result") or "")
+            self.is_error = bool(message.get("is_error"))
+        elif msg_type == "assistant":
+            for block in message.get("message", {}).get("content", []):
+                if block.get("type") == "text":
+                    self._last_text = block.get("text", "")
+                elif block.get("type") == "tool_use" and self.on_progress:
+                    try:
+                        self.on_progress(_tool_event(block))
+                    except Exception:
+                        logger.exception("Progress callback failed")
@@ -0,0 +1,550 @@
+"""Async subprocess runner for Claude CLI invocations."""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypedDict
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 65536
+KILL_GRACE_PERIOD = 5.0  # seconds between SIGTERM and SIGKILL
+SPOOL_POLL_INTERVAL = 0.5  # seconds between reads of a spooled output file
+BOOT_ID_PATH = Path("/proc/sys/kernel/random/boot_id")
+
+
+@dataclass
+class RunResult:
+    """Outcome of a subprocess run."""
+
+    returncode: int | None
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    cancelled: bool = False
+    output_exceeded: bool = False
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """Send a signal to the process group of a still running process."""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+class _ProcMeta(TypedDict):
+    """Identity of a spooled process, stored in {job_id}.proc.json."""
+
+    pid: int
+    started_at: float  # Wall clock, for timeouts
+    boot_id: str | None
+    start_ticks: int | None  # Field 22 of /proc/<pid>/stat
+
+
+def _boot_id() -> str | None:
+    try:
+        return BOOT_ID_PATH.read_text().strip()
+    except OSError:
+        return None
+
+
+def _start_ticks(pid: int) -> int | None:
+    """Start time of a process in clock ticks after boot (Linux only)."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the command name, which may contain spaces and ")";
+    # starttime is field 22 overall
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return int(fields[19])
+
+
+def _is_job_process(meta: _ProcMeta) -> bool:
+    """Check that the process recorded for a job is still that process.
+
+    After a reboot or once the pid was reused, the pid belongs to some
+    unrelated process. A process whose identity cannot be verified is
+    treated as gone, so it is never signalled.
+    """
+    if meta["boot_id"] is None or meta["boot_id"] != _boot_id():
+        return False
+    return (
+        meta["start_ticks"] is not None
+        and _pid_alive(meta["pid"])
+        and _start_ticks(meta["pid"]) == meta["start_ticks"]
+    )
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process that is not our child still exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _signal_job_group(meta: _ProcMeta, sig: int) -> None:
+    """Send a signal to the process group of a process we did not start."""
+    if not _is_job_process(meta):
+        return
+    try:
+        os.killpg(meta["pid"], sig)
+    except ProcessLookupError:
+        pass
+
+
+class ProcessRunner:
+    """Runs subprocesses on the event loop with limits and cancellation.
+
+    Each process is started in its own session, so cancelling or timing out
+    a job kills the whole process group (Claude and the MCP servers it
+    spawned), not just the direct child.
+
+    With a `spool_dir`, runs that have a job ID write their output to
+    {job_id}.out / {job_id}.err there instead of pipes, and record their
+    pid in {job_id}.proc.json. Such a process outlives the bot: when the
+    bot restarts, `run` with the same job ID attaches to it (or to what it
+    left behind) instead of starting the command again. The boot ID and
+    the process start time are recorded with the pid, so a pid reused by
+    another process is never followed or signalled; a job spooled before
+    a reboot is started again.
+    """
+
+    def __init__(self, spool_dir: Path | None = None) -> None:
+        self.spool_dir = spool_dir
+        self._running: dict[str, asyncio.subprocess.Process] = {}
+        self._attached: dict[str, _ProcMeta] = {}
+        self._children: dict[str, set[asyncio.subprocess.Process]] = {}
+        self._cancelled: set[str] = set()
+
+    def is_running(self, job_id: str) -> bool:
+        """Check whether a job with this ID has a live process."""
+        return (
+            job_id in self._running
+            or job_id in self._attached
+            or bool(self._children.get(job_id))
+        )
+
+    def has_spool(self, job_id: str) -> bool:
+        """Whether `run` would attach to a run of this job from this boot.
+
+        True for a job restored after a bot restart whose process is still
+        running or finished without its result being collected.
+        """
+        meta = self._read_spool_meta(job_id)
+        return meta is not None and meta["boot_id"] == _boot_id()
+
+    def is_cancelled(self, job_id: str) -> bool:
+        """Check whether a job was cancelled and has not finished yet."""
+        return job_id in self._cancelled
+
+    def forget(self, job_id: str) -> None:
+        """Drop the cancellation state of a finished job."""
+        self._cancelled.discard(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Kill the process group of a running job.
+
+        Args:
+            job_id: ID passed to `run`
+
+        Returns:
+            True if a running job was found
+        """
+        children = self._children.get(job_id)
+        if children:
+            # Helper runs of the job, e.g. day summaries before a digest
+            logger.info("Cancelling %d runs of job %s", len(children), job_id)
+            self._cancelled.add(job_id)
+            for child in children:
+                self._terminate(child)
+            return True
+
+        process = self._running.get(job_id)
+        if process is not None:
+            logger.info("Cancelling job %s (pid %d)", job_id, process.pid)
+            self._cancelled.add(job_id)
+            self._terminate(process)
+            return True
+
+        meta = self._attached.get(job_id)
+        if meta is not None:
+            logger.info("Cancelling attached job %s (pid %d)", job_id, meta["pid"])
+            self._cancelled.add(job_id)
+            self._terminate_job(meta)
+            return True
+        return False
+
+    @staticmethod
+    def _terminate(process: asyncio.subprocess.Process) -> None:
+        """SIGTERM the group now, SIGKILL it if still alive after a grace period."""
+        _signal_group(process, signal.SIGTERM)
+        asyncio.get_running_loop().call_later(
+            KILL_GRACE_PERIOD, _signal_group, process, signal.SIGKILL
+        )
+
+    @staticmethod
+    def _terminate_job(meta: _ProcMeta) -> None:
+        """Like `_terminate`, for a process left behind by a previous bot."""
+        _signal_job_group(meta, signal.SIGTERM)
+        asyncio.get_running_loop().call_later(
+            KILL_GRACE_PERIOD, _signal_job_group, meta, signal.SIGKILL
+        )
+
+    def _spool_path(self, job_id: str, suffix: str) -> Path:
+        assert self.spool_dir is not None
+        return self.spool_dir / f"{job_id}{suffix}"
+
+    def _read_spool_meta(self, job_id: str) -> _ProcMeta | None:
+        if self.spool_dir is None:
+            return None
+        try:
+            data: dict[str, Any] = json.loads(
+                self._spool_path(job_id, ".proc.json").read_text()
+            )
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Spools written before boot ID and start time were recorded
+        # cannot be verified and are never signalled
+        try:
+            return _ProcMeta(
+                pid=int(data["pid"]),
+                started_at=float(data["started_at"]),
+                boot_id=data.get("boot_id"),
+                start_ticks=data.get("start_ticks"),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _drop_spool(self, job_id: str) -> None:
+        assert self.spool_dir is not None
+        for path in self.spool_dir.glob(f"{job_id}.*"):
+            path.unlink(missing_ok=True)
+
+    def reap_orphans(self, keep: set[str]) -> int:
+        """Kill processes left in the spool by jobs nobody is waiting for.
+
+        Args:
+            keep: Job IDs whose processes should be left alone
+
+        Returns:
+            Number of processes killed
+        """
+        if self.spool_dir is None or not self.spool_dir.exists():
+            return 0
+
+        reaped = 0
+        for meta_path in self.spool_dir.glob("*.proc.json"):
+            job_id = meta_path.name.removesuffix(".proc.json")
+            if job_id in keep:
+                continue
+            meta = self._read_spool_meta(job_id)
+            if meta and _is_job_process(meta):
+                logger.warning("Killing orphaned job %s (pid %d)", job_id, meta["pid"])
+                _signal_job_group(meta, signal.SIGKILL)
+                reaped += 1
+            self._drop_spool(job_id)
+        return reaped
+
+    async def run(
+        self,
+        args: Sequence[str],
+        *,
+        job_id: str | None = None,
+        parent_id: str | None = None,
+        cwd: Path | None = None,
+        env: dict[str, str] | None = None,
+        timeout: float | None = None,
+        max_output: int | None = None,
+        on_stdout_line: Callable[[str], None] | None = None,
+    ) -> RunResult:
+        """Run a command, streaming its output.
+
+        Args:
+            args: Command and arguments
+            job_id: ID under which the job can be cancelled
+            parent_id: Instead of `job_id`, ID of the job this is a helper
+                run of: cancelling that job kills this run too. Such runs
+                are not spooled.
+            cwd: Working directory
+            env: Environment variables
+            timeout: Seconds before the process group is killed
+            max_output: Bytes of stdout+stderr before the process group is killed
+            on_stdout_line: Called with every complete stdout line as it arrives
+
+        Returns:
+            RunResult with the collected output; `returncode` is None when
+            the process was started by a previous bot and could not be waited for
+
+        Raises:
+            FileNotFoundError: If the executable does not exist
+        """
+        if job_id in self._cancelled or parent_id in self._cancelled:
+            # Cancelled between two runs of the job
+            return RunResult(None, "", "", cancelled=True)
+        if self.spool_dir is not None and job_id is not None:
+            meta = self._read_spool_meta(job_id)
+            if meta is not None and meta["boot_id"] != _boot_id():
+                # Killed by the reboot, or unverifiable: run it again
+                logger.info("Discarding spool of job %s from another boot", job_id)
+                self._drop_spool(job_id)
+                meta = None
+            if meta is not None:
+                return await self._attach(
+                    job_id, meta, timeout, max_output, on_stdout_line
+                )
+            return await self._run_spooled(
+                args, job_id, cwd, env, timeout, max_output, on_stdout_line
+            )
+
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        if job_id is not None:
+            self._running[job_id] = process
+        elif parent_id is not None:
+            self._children.setdefault(parent_id, set()).add(process)
+
+        stdout = bytearray()
+        stderr = bytearray()
+        output_exceeded = False
+
+        async def pump(
+            stream: asyncio.StreamReader,
+            sink: bytearray,
+            on_line: Callable[[str], None] | None,
+        ) -> None:
+            nonlocal output_exceeded
+            pending = b""
+            while chunk := await stream.read(READ_CHUNK_SIZE):
+                if max_output is not None and len(stdout) + len(stderr) >= max_output:
+                    if not output_exceeded:
+                        output_exceeded = True
+                        logger.warning("Output limit exceeded (pid %d)", process.pid)
+                        self._terminate(process)
+                    continue  # Drain the pipe until the process exits
+                sink.extend(chunk)
+                if on_line is not None:
+                    pending += chunk
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        on_line(line.decode("utf-8", errors="replace"))
+            if on_line is not None and pending:
+                on_line(pending.decode("utf-8", errors="replace"))
+
+        assert process.stdout is not None and process.stderr is not None
+        timed_out = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    pump(process.stdout, stdout, on_stdout_line),
+                    pump(process.stderr, stderr, None),
+                    process.wait(),
+                ),
+                timeout=timeout,
+            )
+        except TimeoutError:
+            timed_out = True
+            logger.warning("Process timed out after %ss (pid %d)", timeout, process.pid)
+            self._terminate(process)
+            await process.wait()
+        except asyncio.CancelledError:
+            self._terminate(process)
+            raise
+        finally:
+            if job_id is not None:
+                self._running.pop(job_id, None)
+            elif parent_id is not None:
+                self._children[parent_id].discard(process)
+                if not self._children[parent_id]:
+                    del self._children[parent_id]
+
+        cancelled = job_id is not None and job_id in self._cancelled
+        if job_id is not None:
+            self._cancelled.discard(job_id)
+        elif parent_id is not None:
+            # Left set for the job itself, which checks `is_cancelled`
+            cancelled = parent_id in self._cancelled
+
+        return RunResult(
+            returncode=process.returncode,
+            stdout=stdout.decode("utf-8", errors="replace"),
+            stderr=stderr.decode("utf-8", errors="replace"),
+            timed_out=timed_out,
+            cancelled=cancelled,
+            output_exceeded=output_exceeded,
+        )
+
+    async def _run_spooled(
+        self,
+        args: Sequence[str],
+        job_id: str,
+        cwd: Path | None,
+        env: dict[str, str] | None,
+        timeout: float | None,
+        max_output: int | None,
+        on_stdout_line: Callable[[str], None] | None,
+    ) -> RunResult:
+        """Run a command with its output in spool files."""
+        assert self.spool_dir is not None
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        with (
+            self._spool_path(job_id, ".out").open("wb") as out,
+            self._spool_path(job_id, ".err").open("wb") as err,
+        ):
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                cwd=cwd,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=out,
+                stderr=err,
+                start_new_session=True,
+            )
+        meta = _ProcMeta(
+            pid=process.pid,
+            started_at=time.time(),
+            boot_id=_boot_id(),
+            start_ticks=_start_ticks(process.pid),
+        )
+        meta_path = self._spool_path(job_id, ".proc.json")
+        meta_path.write_text(json.dumps(meta))
+
+        self._running[job_id] = process
+        try:
+            timed_out, output_exceeded = await self._follow(
+                job_id,
+                meta,
+                lambda: process.returncode is None,
+                lambda: self._terminate(process),
+                timeout,
+                max_output,
+                on_stdout_line,
+            )
+            await process.wait()
+        except asyncio.CancelledError:
+            # The bot is shutting down: leave the process running, the next
+            # bot attaches to it through the spool files
+            logger.info("Detaching from job %s (pid %d)", job_id, process.pid)
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        return self._spool_result(
+            job_id, process.returncode, timed_out, output_exceeded
+        )
+
+    async def _attach(
+        self,
+        job_id: str,
+        meta: _ProcMeta,
+        timeout: float | None,
+        max_output: int | None,
+        on_stdout_line: Callable[[str], None] | None,
+    ) -> RunResult:
+        """Follow a process started by a previous bot, or read what it left."""
+        logger.info("Attaching to job %s (pid %d)", job_id, meta["pid"])
+        self._attached[job_id] = meta
+        try:
+            timed_out, output_exceeded = await self._follow(
+                job_id,
+                meta,
+                lambda: _is_job_process(meta),
+                lambda: self._terminate_job(meta),
+                timeout,
+                max_output,
+                on_stdout_line,
+            )
+        finally:
+            self._attached.pop(job_id, None)
+
+        return self._spool_result(job_id, None, timed_out, output_exceeded)
+
+    async def _follow(
+        self,
+        job_id: str,
+        meta: _ProcMeta,
+        is_alive: Callable[[], bool],
+        terminate: Callable[[], None],
+        timeout: float | None,
+        max_output: int | None,
+        on_stdout_line: Callable[[str], None] | None,
+    ) -> tuple[bool, bool]:
+        """Tail a spooled output file until its process exits.
+
+        Returns:
+            Tuple of (timed out, output limit exceeded)
+        """
+        err_path = self._spool_path(job_id, ".err")
+        timed_out = output_exceeded = False
+        pending = b""
+        with self._spool_path(job_id, ".out").open("rb") as f:
+            while True:
+                alive = is_alive()
+                # Read after the liveness check so the last output is not missed
+                while chunk := f.read(READ_CHUNK_SIZE):
+                    if on_stdout_line is not None:
+                        pending += chunk
+                        *lines, pending = pending.split(b"\n")
+                        for line in lines:
+                            on_stdout_line(line.decode("utf-8", errors="replace"))
+                if not alive:
+                    break
+
+                err_size = err_path.stat().st_size if err_path.exists() else 0
+                size = f.tell() + err_size
+                if (
+                    max_output is not None
+                    and size >= max_output
+                    and not output_exceeded
+                ):
+                    output_exceeded = True
+                    logger.warning("Output limit exceeded (job %s)", job_id)
+                    terminate()
+                elapsed = time.time() - meta["started_at"]
+                if timeout is not None and elapsed >= timeout and not timed_out:
+                    timed_out = True
+                    logger.warning("Job %s timed out after %ss", job_id, timeout)
+                    terminate()
+                await asyncio.sleep(SPOOL_POLL_INTERVAL)
+
+        if on_stdout_line is not None and pending:
+            on_stdout_line(pending.decode("utf-8", errors="replace"))
+        return timed_out, output_exceeded
+
+    def _spool_result(
+        self,
+        job_id: str,
+        returncode: int | None,
+        timed_out: bool,
+        output_exceeded: bool,
+    ) -> RunResult:
+        cancelled = job_id in self._cancelled
+        self._cancelled.discard(job_id)
+        return RunResult(
+            returncode=returncode,
+            stdout=self._spool_path(job_id, ".out").read_text(errors="replace"),
+            stderr=self._spool_path(job_id, ".err").read_text(errors="replace"),
+            timed_out=timed_out,
+            cancelled=cancelled,
+            output_exceeded=output_exceeded,
+        )
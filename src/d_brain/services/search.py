@@ -0,0 +1,342 @@
+"""Full-text index of the vault (SQLite FTS5)."""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from d_brain.services.manifest import VaultManifest
+
+logger = logging.getLogger(__name__)
+
+INDEXED_DIRS = ("daily", "thoughts", "summaries", "goals")
+DEFAULT_LIMIT = 10
+SNIPPET_TOKENS = 16
+MIN_RELATED_TERM = 4
+MAX_RELATED_TERMS = 24
+
+# Marks matched terms in snippets; callers replace them with markup
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    title, tags, meta, body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+# bm25 weights of title, tags, meta and body
+RANK = "bm25(notes_fts, 10.0, 5.0, 2.0, 1.0)"
+
+FRONTMATTER = re.compile(r"\A---\n(.*?)\n---\n", re.DOTALL)
+FRONTMATTER_FIELD = re.compile(r"^([\w-]+):\s*(.*?)\s*$", re.MULTILINE)
+TITLE = re.compile(r"^# (.+)$", re.MULTILINE)
+WORD = re.compile(r"\w+")
+FILTER = re.compile(r"^([\w-]+):([\w-]+)$")
+
+
+# (title, tags, meta, body) columns of a note
+Columns = tuple[str, str, str, str]
+
+
+@dataclass
+class SearchHit:
+    """A note matching a search query."""
+
+    path: str
+    title: str
+    snippet: str
+    score: float
+
+
+def _parse(text: str, fallback_title: str) -> Columns:
+    """Split a note into (title, tags, meta, body) columns."""
+    fields: dict[str, str] = {}
+    body = text
+    if frontmatter := FRONTMATTER.match(text):
+        fields = dict(FRONTMATTER_FIELD.findall(frontmatter.group(1)))
+        body = text[frontmatter.end() :]
+    tags = " ".join(
+        tag.strip().strip("'\"")
+        for tag in fields.pop("tags", "").strip("[]").split(",")
+    )
+    meta = " ".join(f"{key} {value}" for key, value in fields.items() if value)
+    title = TITLE.search(body)
+    return (title.group(1).strip() if title else fallback_title), tags, meta, body
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_query(text: str) -> str | None:
+    """Turn user input into an FTS5 query.
+
+    Words must all match, the last one as a prefix. `#tag` matches
+    frontmatter tags, `key:value` any other frontmatter field
+    (e.g. `type:task`, `status:open`).
+
+    Returns:
+        FTS5 query, or None if the input has no searchable terms
+    """
+    parts = []
+    words = []
+    for token in text.split():
+        if token.startswith("#") and len(token) > 1:
+            parts.append(f"tags : {_quote(token[1:])}")
+        elif match := FILTER.match(token):
+            parts.append(f"meta : {_quote(' '.join(match.groups()))}")
+        else:
+            words.extend(WORD.findall(token))
+    parts.extend(_quote(word) for word in words)
+    if not parts:
+        return None
+    if words:
+        parts[-1] += "*"
+    return " ".join(parts)
+
+
+class VaultIndex:
+    """Incrementally updated FTS5 index of daily notes, thoughts, summaries, goals.
+
+    `update` re-reads only the notes the vault manifest reports as changed
+    since the previous update, and `update_file` re-indexes a single note
+    right after the bot appended to it.
+    """
+
+    def __init__(
+        self, vault_path: Path, db_path: Path, manifest: VaultManifest
+    ) -> None:
+        self.vault_path = Path(vault_path)
+        self.db_path = Path(db_path)
+        self.manifest = manifest
+        self._lock = threading.Lock()  # Guards the connection
+        self._update_lock = threading.Lock()  # One `update` at a time
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _is_indexed(key: str) -> bool:
+        return key.endswith(".md") and key.split("/", 1)[0] in INDEXED_DIRS
+
+    def _key(self, path: Path) -> str | None:
+        """Vault-relative key of an indexed note, None if it is not indexed."""
+        try:
+            relative = Path(path).resolve().relative_to(self.vault_path.resolve())
+        except ValueError:
+            return None
+        key = relative.as_posix()
+        return key if self._is_indexed(key) else None
+
+    def _read(self, key: str) -> tuple[os.stat_result, Columns] | None:
+        """Stat and parse a note, None if it no longer exists."""
+        path = self.vault_path / key
+        try:
+            stat = path.stat()
+            text = path.read_text(encoding="utf-8", errors="replace")
+        except FileNotFoundError:
+            return None
+        return stat, _parse(text, Path(key).stem)
+
+    def _store(
+        self, key: str, stat: os.stat_result, columns: Columns, note_id: int | None
+    ) -> None:
+        title, tags, meta, body = columns
+        if note_id is None:
+            cursor = self._db.execute(
+                "INSERT INTO notes (path, mtime_ns, size, title) VALUES (?, ?, ?, ?)",
+                (key, stat.st_mtime_ns, stat.st_size, title),
+            )
+            note_id = cursor.lastrowid
+        else:
+            self._db.execute(
+                "UPDATE notes SET mtime_ns = ?, size = ?, title = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, title, note_id),
+            )
+            self._db.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
+        self._db.execute(
+            "INSERT INTO notes_fts (rowid, title, tags, meta, body)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (note_id, title, tags, meta, body),
+        )
+
+    def _delete(self, note_id: int) -> None:
+        self._db.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
+        self._db.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+    def _known(self) -> dict[str, tuple[int, int, int]]:
+        """Indexed notes as path -> (id, mtime_ns, size)."""
+        return {
+            path: (note_id, mtime_ns, size)
+            for note_id, path, mtime_ns, size in self._db.execute(
+                "SELECT id, path, mtime_ns, size FROM notes"
+            )
+        }
+
+    def update(self) -> int:
+        """Re-index notes that changed since the last update.
+
+        The vault scan and note parsing run without holding the database
+        lock, so searches and `update_file` are not blocked meanwhile;
+        notes that `update_file` re-indexed in the meantime are left as is.
+
+        Returns:
+            Number of notes added, re-indexed or removed
+        """
+        with self._update_lock:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value FROM state WHERE key = 'checkpoint'"
+                ).fetchone()
+                known = self._known()
+            changes = self.manifest.changes_since(row[0] if row else 0)
+            candidates = [key for key in changes.changed if self._is_indexed(key)]
+            removed = set(changes.removed)
+            if changes.full:
+                removed |= known.keys() - set(candidates)
+
+            notes: dict[str, tuple[os.stat_result, Columns] | None] = {}
+            for key in candidates:
+                _, mtime_ns, size = known.get(key, (None, None, None))
+                note = self._read(key)
+                # Already indexed by update_file
+                if note and (mtime_ns, size) == (note[0].st_mtime_ns, note[0].st_size):
+                    continue
+                notes[key] = note
+
+            changed = 0
+            with self._lock, self._db:
+                current = self._known()
+                for key in removed:
+                    if key in current and current[key] == known.get(key):
+                        self._delete(current[key][0])
+                        changed += 1
+                for key, note in notes.items():
+                    if current.get(key) != known.get(key):
+                        continue  # Re-indexed by update_file meanwhile
+                    note_id = current[key][0] if key in current else None
+                    if note is not None:
+                        self._store(key, *note, note_id)
+                    elif note_id is not None:
+                        self._delete(note_id)
+                    else:
+                        continue
+                    changed += 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO state (key, value)"
+                    " VALUES ('checkpoint', ?)",
+                    (changes.checkpoint,),
+                )
+        if changed:
+            logger.info("Search index updated: %d notes changed", changed)
+        return changed
+
+    def update_file(self, path: Path) -> None:
+        """Re-index a single note (no-op for files outside the indexed folders)."""
+        key = self._key(path)
+        if key is None:
+            return
+        note = self._read(key)
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT id FROM notes WHERE path = ?", (key,)
+            ).fetchone()
+            note_id = row[0] if row else None
+            if note is not None:
+                self._store(key, *note, note_id)
+            elif note_id is not None:
+                self._delete(note_id)
+
+    def _query(
+        self, match: str, limit: int, exclude_prefix: str | None = None
+    ) -> list[SearchHit]:
+        sql = (
+            "SELECT notes.path, notes.title,"
+            f" snippet(notes_fts, 3, ?, ?, '…', {SNIPPET_TOKENS}), {RANK}"
+            " FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid"
+            " WHERE notes_fts MATCH ?"
+        )
+        params: list[object] = [MATCH_START, MATCH_END, match]
+        if exclude_prefix:
+            sql += " AND notes.path NOT LIKE ?"
+            params.append(f"{exclude_prefix}%")
+        sql += f" ORDER BY {RANK} LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def search(self, text: str, limit: int = DEFAULT_LIMIT) -> list[SearchHit]:
+        """Find notes matching user input (see `build_query`), best first.
+
+        Args:
+            text: Words and `#tag` / `key:value` filters
+            limit: Maximum number of hits
+
+        Returns:
+            Hits with snippets; matched terms are wrapped in
+            MATCH_START/MATCH_END
+        """
+        match = build_query(text)
+        if match is None:
+            return []
+        try:
+            return self._query(match, limit)
+        except sqlite3.OperationalError as e:
+            logger.warning("Search for %r failed: %s", text, e)
+            return []
+
+    def related(
+        self, text: str, limit: int = 5, exclude_prefix: str | None = "daily/"
+    ) -> list[SearchHit]:
+        """Notes most relevant to a piece of text, e.g. a prompt or new entries.
+
+        Any of the text's longer words may match; bm25 ranks notes sharing
+        more and rarer words first.
+
+        Args:
+            text: Free text
+            limit: Maximum number of hits
+            exclude_prefix: Skip notes under this path (daily notes by default)
+
+        Returns:
+            Hits with snippets, best first
+        """
+        terms = list(
+            dict.fromkeys(
+                word.lower()
+                for word in WORD.findall(text)
+                if len(word) >= MIN_RELATED_TERM and not word.isdigit()
+            )
+        )[:MAX_RELATED_TERMS]
+        if not terms:
+            return []
+        try:
+            return self._query(
+                " OR ".join(_quote(term) for term in terms), limit, exclude_prefix
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning("Related notes lookup failed: %s", e)
+            return []
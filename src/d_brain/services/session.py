@@ -4,44 +4,304 @@ Stores all bot interactions in JSONL format for history and analytics.
 Inspired by Clawdbot's session persistence pattern.
 """
 
+import gzip
 import json
-from datetime import datetime
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
+from d_brain.services.appender import AppendWriter
+
+logger = logging.getLogger(__name__)
+
+TAIL_BLOCK_SIZE = 8192
+INDEX_VERSION = 3
+
+
+def _read_tail_lines(path: Path, count: int) -> list[bytes]:
+    """Read the last `count` non-empty lines of a file by seeking backwards.
+
+    Reads fixed-size blocks from the end of the file until enough
+    newlines are seen, so cost depends on the size of the result
+    rather than the size of the file.
+    """
+    if count <= 0:
+        return []
+
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buffer = b""
+        while pos > 0 and buffer.count(b"\n") <= count:
+            read_size = min(TAIL_BLOCK_SIZE, pos)
+            pos -= read_size
+            f.seek(pos)
+            buffer = f.read(read_size) + buffer
+
+    lines = buffer.split(b"\n")
+    if pos > 0:
+        # First line may be cut in the middle of a block
+        lines = lines[1:]
+    return [line for line in lines if line.strip()][-count:]
+
+
+def _parse_lines(lines: list[bytes]) -> list[dict[str, Any]]:
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # Skip malformed lines
+    return entries
+
 
 class SessionStore:
     """Persistent session storage in JSONL format.
 
-    Each user gets their own session file at vault/.sessions/{user_id}.jsonl.
-    Entries are append-only for reliability and simplicity.
+    Each user gets a directory of monthly segments at
+    vault/.sessions/{user_id}/YYYY-MM.jsonl. Entries are append-only for
+    reliability and simplicity. Once a month is over its segment is
+    gzip-compressed to YYYY-MM.jsonl.gz and never touched again, so the
+    vault repository only sees small, bounded changes.
+
+    Next to the segments lives a small index ({user_id}.idx.json) with the
+    byte range and per-type entry counts of every day. Byte ranges are
+    offsets into the uncompressed segment of the day's month. The index is
+    updated by `append` and rebuilt from the segments when it is missing or
+    out of date (for example after the vault was pulled from another machine).
     """
 
-    def __init__(self, vault_path: Path | str) -> None:
+    def __init__(
+        self, vault_path: Path | str, writer: AppendWriter | None = None
+    ) -> None:
         self.sessions_dir = Path(vault_path) / ".sessions"
+        self.writer = writer or AppendWriter()
+        self._lock = threading.Lock()  # Serializes appends and index updates
         self.sessions_dir.mkdir(exist_ok=True)
+        self._ensure_gitignore()
+
+    def _ensure_gitignore(self) -> None:
+        """Keep derived index files out of the vault repository."""
+        gitignore = self.sessions_dir / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("*.idx.json\n", encoding="utf-8")
+
+    def _get_user_dir(self, user_id: int) -> Path:
+        return self.sessions_dir / str(user_id)
 
-    def _get_session_file(self, user_id: int) -> Path:
+    def _get_legacy_file(self, user_id: int) -> Path:
+        """Single-file log used before monthly segments."""
         return self.sessions_dir / f"{user_id}.jsonl"
 
-    def append(self, user_id: int, entry_type: str, **data: Any) -> None:
+    def _get_segment_file(self, user_id: int, month: str) -> Path:
+        return self._get_user_dir(user_id) / f"{month}.jsonl"
+
+    def _get_index_file(self, user_id: int) -> Path:
+        return self.sessions_dir / f"{user_id}.idx.json"
+
+    def _list_segments(self, user_id: int) -> dict[str, Path]:
+        """Map month (YYYY-MM) to its segment file, oldest first."""
+        user_dir = self._get_user_dir(user_id)
+        if not user_dir.exists():
+            return {}
+
+        segments: dict[str, Path] = {}
+        for path in user_dir.iterdir():
+            if path.name.endswith(".jsonl.gz"):
+                month = path.name.removesuffix(".jsonl.gz")
+                plain = path.with_name(f"{month}.jsonl")
+                if plain.exists():
+                    # Interrupted compression: the .gz is already complete
+                    plain.unlink()
+                segments[month] = path
+            elif path.suffix == ".jsonl":
+                segments.setdefault(path.stem, path)
+        return dict(sorted(segments.items()))
+
+    @staticmethod
+    def _open_segment(path: Path) -> Any:
+        if path.suffix == ".gz":
+            return gzip.open(path, "rb")
+        return path.open("rb")
+
+    def _migrate_legacy(self, user_id: int) -> None:
+        """Split a single-file log into monthly segments."""
+        legacy = self._get_legacy_file(user_id)
+        if not legacy.exists():
+            return
+
+        by_month: dict[str, list[bytes]] = {}
+        month = datetime.fromtimestamp(legacy.stat().st_mtime).strftime("%Y-%m")
+        with legacy.open("rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    month = json.loads(line).get("ts", "")[:7] or month
+                except json.JSONDecodeError:
+                    pass  # Keep malformed lines next to their neighbours
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                by_month.setdefault(month, []).append(line)
+
+        self._get_user_dir(user_id).mkdir(exist_ok=True)
+        for month, lines in by_month.items():
+            with self._get_segment_file(user_id, month).open("ab") as f:
+                f.writelines(lines)
+
+        legacy.unlink()
+        logger.info("Split session log of %s into %d segments", user_id, len(by_month))
+        self._compress_closed(user_id, current_month=max(by_month, default=""))
+
+    def _compress_closed(self, user_id: int, current_month: str) -> None:
+        """Gzip every uncompressed segment older than `current_month`."""
+        for month, path in self._list_segments(user_id).items():
+            if month >= current_month or path.suffix == ".gz":
+                continue
+            gz_path = path.with_name(f"{path.name}.gz")
+            tmp_path = path.with_name(f"{path.name}.gz.tmp")
+            with path.open("rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, gz_path)
+            path.unlink()
+            logger.info("Compressed session segment %s", gz_path)
+
+    def _load_index(self, user_id: int) -> dict[str, Any]:
+        """Load day index, rebuilding it if it does not match the segments."""
+        self._migrate_legacy(user_id)
+        segments = self._list_segments(user_id)
+
+        index_path = self._get_index_file(user_id)
+        if index_path.exists():
+            try:
+                index: dict[str, Any] = json.loads(
+                    index_path.read_text(encoding="utf-8")
+                )
+                if index.get("version") == INDEX_VERSION and self._index_matches(
+                    index, segments
+                ):
+                    return index
+            except (json.JSONDecodeError, OSError):
+                pass
+
+        return self.rebuild_index(user_id)
+
+    @staticmethod
+    def _index_matches(index: dict[str, Any], segments: dict[str, Path]) -> bool:
+        """Check the index against segment names and open segment sizes.
+
+        Compressed segments are immutable, so only their presence is checked.
+        """
+        indexed = index.get("segments", {})
+        if indexed.keys() != segments.keys():
+            return False
+        return all(
+            path.suffix == ".gz" or path.stat().st_size == indexed[month]
+            for month, path in segments.items()
+        )
+
+    def _save_index(self, user_id: int, index: dict[str, Any]) -> None:
+        index_path = self._get_index_file(user_id)
+        tmp_path = index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, index_path)
+
+    def list_users(self) -> list[int]:
+        """List user IDs that have a session log."""
+        names = {path.name for path in self.sessions_dir.iterdir() if path.is_dir()}
+        names |= {path.stem for path in self.sessions_dir.glob("*.jsonl")}
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def rebuild_index(self, user_id: int) -> dict[str, Any]:
+        """Rebuild the day index and counters by scanning every segment.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            The rebuilt index
+        """
+        self._migrate_legacy(user_id)
+        index: dict[str, Any] = {
+            "version": INDEX_VERSION,
+            "segments": {},
+            "days": {},
+            "counts": {},
+        }
+        for month, path in self._list_segments(user_id).items():
+            offset = 0
+            with self._open_segment(path) as f:
+                for line in f:
+                    start, offset = offset, offset + len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._index_entry(index, entry, start, offset)
+            index["segments"][month] = offset
+
+        self._save_index(user_id, index)
+        return index
+
+    @staticmethod
+    def _index_entry(
+        index: dict[str, Any], entry: dict[str, Any], start: int, end: int
+    ) -> None:
+        day = entry.get("ts", "")[:10]
+        if not day:
+            return
+        span = index["days"].get(day)
+        if span is None:
+            index["days"][day] = [start, end]
+        else:
+            span[0] = min(span[0], start)
+            span[1] = max(span[1], end)
+
+        entry_type = entry.get("type", "unknown")
+        counts = index["counts"].setdefault(day, {})
+        counts[entry_type] = counts.get(entry_type, 0) + 1
+
+    def append(self, user_id: int, entry_type: str, **data: Any) -> Path:
         """Append entry to user's session file.
 
         Args:
             user_id: Telegram user ID
             entry_type: Type of entry (voice, text, photo, forward, command, etc.)
             **data: Additional data to store (text, duration, msg_id, etc.)
+
+        Returns:
+            Directory of the user's segments (a rollover may touch several)
         """
         entry = {
             "ts": datetime.now().astimezone().isoformat(),
             "type": entry_type,
             **data,
         }
-        path = self._get_session_file(user_id)
-        with path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        month = entry["ts"][:7]
+
+        with self._lock:
+            index = self._load_index(user_id)
+            segments = self._list_segments(user_id)
+            if any(m < month and p.suffix != ".gz" for m, p in segments.items()):
+                # Month rolled over: close previous segments
+                self._compress_closed(user_id, current_month=month)
+
+            path = self._get_segment_file(user_id, month)
+            start = self.writer.append(path, line)
 
-    def get_recent(self, user_id: int, limit: int = 50) -> list[dict]:
+            self._index_entry(index, entry, start, start + len(line))
+            index["segments"][month] = start + len(line)
+            self._save_index(user_id, index)
+        return self._get_user_dir(user_id)
+
+    def get_recent(self, user_id: int, limit: int = 50) -> list[dict[str, Any]]:
         """Get recent session entries.
 
         Args:
@@ -51,22 +311,49 @@ class SessionStore:
         Returns:
             List of session entries, most recent last
         """
-        path = self._get_session_file(user_id)
-        if not path.exists():
+        self._migrate_legacy(user_id)
+
+        lines: list[bytes] = []
+        for path in reversed(self._list_segments(user_id).values()):
+            remaining = limit - len(lines)
+            if remaining <= 0:
+                break
+            if path.suffix == ".gz":
+                with gzip.open(path, "rb") as f:
+                    tail = [line for line in f.read().split(b"\n") if line.strip()]
+                lines = tail[-remaining:] + lines
+            else:
+                lines = _read_tail_lines(path, remaining) + lines
+
+        return _parse_lines(lines)
+
+    def get_day(self, user_id: int, day: str) -> list[dict[str, Any]]:
+        """Get session entries for a single day.
+
+        Args:
+            user_id: Telegram user ID
+            day: ISO date (YYYY-MM-DD)
+
+        Returns:
+            List of the day's entries in log order
+        """
+        span = self._load_index(user_id)["days"].get(day)
+        path = self._list_segments(user_id).get(day[:7])
+        if span is None or path is None:
             return []
 
-        entries = []
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        entries.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue  # Skip malformed lines
+        start, end = span
+        with self._open_segment(path) as f:
+            f.seek(start)
+            chunk = f.read(end - start)
 
-        return entries[-limit:]
+        return [
+            e
+            for e in _parse_lines(chunk.split(b"\n"))
+            if e.get("ts", "").startswith(day)
+        ]
 
-    def get_today(self, user_id: int) -> list[dict]:
+    def get_today(self, user_id: int) -> list[dict[str, Any]]:
         """Get today's session entries.
 
         Args:
@@ -76,15 +363,14 @@ class SessionStore:
             List of today's entries
         """
         today = datetime.now().date().isoformat()
-        return [
-            e
-            for e in self.get_recent(user_id, limit=200)
-            if e.get("ts", "").startswith(today)
-        ]
+        return self.get_day(user_id, today)
 
     def get_stats(self, user_id: int, days: int = 7) -> dict[str, int]:
         """Get usage statistics for the last N days.
 
+        Counts come from the per-day buckets of the index, so the window is
+        measured in calendar days: today and the N-1 days before it.
+
         Args:
             user_id: Telegram user ID
             days: Number of days to analyze
@@ -92,15 +378,13 @@ class SessionStore:
         Returns:
             Dict with counts by entry type
         """
-        from datetime import timedelta
-
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-        entries = self.get_recent(user_id, limit=1000)
+        cutoff = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+        index = self._load_index(user_id)
 
         stats: dict[str, int] = {}
-        for entry in entries:
-            if entry.get("ts", "") >= cutoff:
-                entry_type = entry.get("type", "unknown")
-                stats[entry_type] = stats.get(entry_type, 0) + 1
+        for day, counts in index["counts"].items():
+            if day >= cutoff:
+                for entry_type, count in counts.items():
+                    stats[entry_type] = stats.get(entry_type, 0) + count
 
         return stats
@@ -0,0 +1,26 @@
+"""Local state directory of the bot inside the vault."""
+
+from pathlib import Path
+
+STATE_DIR_NAME = ".d-brain"
+
+
+def ensure_state_dir(vault_path: Path | str) -> Path:
+    """Create vault/.d-brain for job records and caches.
+
+    The directory contains a `.gitignore` that ignores everything in it,
+    so its contents never end up in vault commits (including the
+    `git add -A` of scripts/process.sh).
+
+    Args:
+        vault_path: Path to the vault
+
+    Returns:
+        Path to the state directory
+    """
+    path = Path(vault_path) / STATE_DIR_NAME
+    path.mkdir(parents=True, exist_ok=True)
+    gitignore = path / ".gitignore"
+    if not gitignore.exists():
+        gitignore.write_text("*\n", encoding="utf-8")
+    return path
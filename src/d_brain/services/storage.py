@@ -1,14 +1,57 @@
 """Vault storage service for saving entries."""
 
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
 
+from d_brain.services.appender import AppendWriter
+from d_brain.services.daily import count_entries, entry_type
+from d_brain.services.search import VaultIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DayCounts:
+    """Entry counts of a daily file as of its (mtime, size)."""
+
+    mtime_ns: int
+    size: int
+    counts: Counter[str]
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 
 class VaultStorage:
-    """Service for storing entries in Obsidian vault."""
+    """Service for storing entries in Obsidian vault.
+
+    Entry counts per day are kept in memory and updated on every append,
+    so `entry_counts` does not read the daily file. A file edited outside
+    the bot (Claude, Obsidian) no longer matches the remembered mtime and
+    size and is counted again on the next call.
+    """
 
-    def __init__(self, vault_path: Path) -> None:
+    def __init__(
+        self,
+        vault_path: Path,
+        index: VaultIndex | None = None,
+        writer: AppendWriter | None = None,
+    ) -> None:
         self.vault_path = Path(vault_path)
+        self.index = index
+        self.writer = writer or AppendWriter()
+        self._counts: dict[date, DayCounts] = {}
+        self._lock = threading.Lock()  # Keeps counts in step with appends
         self.daily_path = self.vault_path / "daily"
         self.attachments_path = self.vault_path / "attachments"
 
@@ -34,52 +77,76 @@ class VaultStorage:
         text: str,
         timestamp: datetime,
         msg_type: str,
-    ) -> None:
+    ) -> Path:
         """Append entry to daily file.
 
         Args:
             text: Content to append
             timestamp: Entry timestamp
             msg_type: Type marker like [voice], [text], [photo], [forward from: Name]
+
+        Returns:
+            Path of the daily file that was written
         """
-        self._ensure_dirs()
-        file_path = self.get_daily_file(timestamp.date())
+        # The writer creates daily/ when it is missing
+        file_path = self.daily_path / f"{timestamp.date().isoformat()}.md"
 
         time_str = timestamp.strftime("%H:%M")
         entry = f"\n## {time_str} {msg_type}\n{text}\n"
 
-        with file_path.open("a", encoding="utf-8") as f:
-            f.write(entry)
+        with self._lock:
+            before = _stat_key(file_path)
+            self.writer.append(file_path, entry.encode("utf-8"))
+            self._count_entry(timestamp.date(), file_path, before, msg_type)
+
+        if self.index is not None:
+            try:
+                self.index.update_file(file_path)
+            except (OSError, sqlite3.Error):
+                logger.exception("Failed to index %s", file_path)
 
-    def get_attachments_dir(self, day: date) -> Path:
-        """Get attachments directory for given date."""
-        dir_path = self.attachments_path / day.isoformat()
-        dir_path.mkdir(parents=True, exist_ok=True)
-        return dir_path
+        return file_path
 
-    def save_attachment(
+    def _count_entry(
         self,
-        data: bytes,
         day: date,
-        timestamp: datetime,
-        extension: str = "jpg",
-    ) -> str:
-        """Save attachment and return relative path for Obsidian embed.
+        file_path: Path,
+        before: tuple[int, int] | None,
+        msg_type: str,
+    ) -> None:
+        """Add an appended entry to the day's counts if they are current."""
+        cached = self._counts.get(day)
+        if before is None:
+            counts: Counter[str] = Counter()
+        elif cached is not None and (cached.mtime_ns, cached.size) == before:
+            counts = cached.counts
+        else:
+            # Edited elsewhere since we last counted; recount on demand
+            self._counts.pop(day, None)
+            return
+        counts[entry_type(msg_type)] += 1
+        after = file_path.stat()
+        self._counts[day] = DayCounts(after.st_mtime_ns, after.st_size, counts)
+
+    def entry_counts(self, day: date) -> Counter[str]:
+        """Number of entries of a day by type ("voice", "text", "photo", ...).
 
         Args:
-            data: File bytes
-            day: Date for organizing
-            timestamp: Timestamp for filename
-            extension: File extension
+            day: Day of the daily file
 
         Returns:
-            Relative path for Obsidian embed: attachments/YYYY-MM-DD/img-HHMMSS.ext
+            Counts by entry type; empty if there is no daily file
         """
-        dir_path = self.get_attachments_dir(day)
-        time_str = timestamp.strftime("%H%M%S")
-        filename = f"img-{time_str}.{extension}"
-        file_path = dir_path / filename
-
-        file_path.write_bytes(data)
-
-        return f"attachments/{day.isoformat()}/{filename}"
+        file_path = self.daily_path / f"{day.isoformat()}.md"
+        with self._lock:
+            current = _stat_key(file_path)
+            if current is None:
+                self._counts.pop(day, None)
+                return Counter()
+
+            cached = self._counts.get(day)
+            if cached is None or (cached.mtime_ns, cached.size) != current:
+                content = file_path.read_text(encoding="utf-8")
+                cached = DayCounts(*current, count_entries(content))
+                self._counts[day] = cached
+            return Counter(cached.counts)
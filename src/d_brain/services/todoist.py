@@ -0,0 +1,276 @@
+"""Local mirror of Todoist tasks, synced incrementally in the background."""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.todoist.com/api/v1"
+SYNC_INTERVAL = 300.0
+COMPLETED_RETENTION_DAYS = 14
+REQUEST_TIMEOUT = 30.0
+
+# Fields kept from Sync API items and projects
+TASK_FIELDS = ("id", "content", "project_id", "priority", "due", "labels", "parent_id")
+PROJECT_FIELDS = ("id", "name")
+
+
+def _pick(data: dict[str, Any], fields: tuple[str, ...]) -> dict[str, Any]:
+    return {field: data.get(field) for field in fields}
+
+
+def _due_date(task: dict[str, Any]) -> str | None:
+    due = task.get("due") or {}
+    return (due.get("date") or "")[:10] or None
+
+
+def _iso(moment: datetime) -> str:
+    return moment.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _completed_day(task: dict[str, Any]) -> date | None:
+    """Local date a task was completed on (Todoist reports UTC)."""
+    value = task.get("completed_at")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).astimezone().date()
+    except ValueError:
+        return None
+
+
+class TodoistMirror:
+    """Snapshot of active tasks, projects and recently completed tasks.
+
+    Active tasks and projects come from the Sync API: the first sync is a
+    full one, later syncs send the stored sync token and only apply what
+    changed. Completed tasks are fetched for the time since the previous
+    sync and kept for COMPLETED_RETENTION_DAYS. The snapshot is saved as
+    JSON, so a restarted bot starts from it instead of a full sync.
+
+    All syncs share one HTTP client (and its connections), opened by
+    `start` or the first sync and closed by `stop`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        store_path: Path,
+        api_url: str = API_URL,
+        interval: float = SYNC_INTERVAL,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.store_path = Path(store_path)
+        self.api_url = api_url.rstrip("/")
+        self.interval = interval
+        self._api_key = api_key
+        self._transport = transport
+        self._state = self._load()
+        self._lock = asyncio.Lock()
+        self._client: httpx.AsyncClient | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            state: dict[str, Any] = json.loads(
+                self.store_path.read_text(encoding="utf-8")
+            )
+            return state
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {
+                "sync_token": "*",
+                "synced_at": None,
+                "tasks": {},
+                "projects": {},
+                "completed": [],
+            }
+
+    def _save(self) -> None:
+        tmp_path = self.store_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(self._state, ensure_ascii=False), encoding="utf-8"
+        )
+        os.replace(tmp_path, self.store_path)
+
+    @property
+    def synced_at(self) -> datetime | None:
+        """Time of the last successful sync."""
+        value = self._state.get("synced_at")
+        return datetime.fromisoformat(value) if value else None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                timeout=REQUEST_TIMEOUT,
+                transport=self._transport,
+            )
+        return self._client
+
+    def start(self) -> None:
+        """Start the background sync loop (requires a running event loop)."""
+        self._get_client()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="todoist-mirror")
+
+    async def stop(self) -> None:
+        """Stop the background sync loop and close the HTTP client."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except httpx.HTTPError as e:
+                logger.warning("Todoist sync failed: %s", e)
+            except Exception:
+                logger.exception("Todoist sync failed")
+            await asyncio.sleep(self.interval)
+
+    async def sync(self) -> None:
+        """Fetch changes since the last sync and save the snapshot.
+
+        Raises:
+            httpx.HTTPError: If Todoist cannot be reached
+        """
+        async with self._lock:
+            now = datetime.now(UTC)
+            client = self._get_client()
+            await self._sync_active(client)
+            await self._sync_completed(client, now)
+            self._state["synced_at"] = now.isoformat()
+            self._save()
+            logger.info(
+                "Todoist synced: %d active, %d completed",
+                len(self._state["tasks"]),
+                len(self._state["completed"]),
+            )
+
+    async def _sync_active(self, client: httpx.AsyncClient) -> None:
+        response = await client.post(
+            "/sync",
+            data={
+                "sync_token": self._state["sync_token"],
+                "resource_types": json.dumps(["items", "projects"]),
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("full_sync"):
+            self._state["tasks"] = {}
+            self._state["projects"] = {}
+        tasks = self._state["tasks"]
+        for item in data.get("items", []):
+            if item.get("is_deleted") or item.get("checked"):
+                tasks.pop(item["id"], None)
+            else:
+                tasks[item["id"]] = _pick(item, TASK_FIELDS)
+        projects = self._state["projects"]
+        for project in data.get("projects", []):
+            if project.get("is_deleted") or project.get("is_archived"):
+                projects.pop(project["id"], None)
+            else:
+                projects[project["id"]] = _pick(project, PROJECT_FIELDS)
+        self._state["sync_token"] = data["sync_token"]
+
+    async def _sync_completed(self, client: httpx.AsyncClient, now: datetime) -> None:
+        cutoff = now - timedelta(days=COMPLETED_RETENTION_DAYS)
+        last = self._state.get("synced_at")
+        since = max(datetime.fromisoformat(last), cutoff) if last else cutoff
+
+        completed = {task["id"]: task for task in self._state["completed"]}
+        cursor = None
+        while True:
+            params: dict[str, str | int] = {
+                "since": _iso(since),
+                "until": _iso(now),
+                "limit": 200,
+            }
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get(
+                "/tasks/completed/by_completion_date", params=params
+            )
+            response.raise_for_status()
+            data = response.json()
+            for item in data.get("items", []):
+                completed[item["id"]] = {
+                    **_pick(item, TASK_FIELDS),
+                    "completed_at": item.get("completed_at"),
+                }
+            cursor = data.get("next_cursor")
+            if not cursor:
+                break
+
+        self._state["completed"] = sorted(
+            (
+                task
+                for task in completed.values()
+                if (task.get("completed_at") or "") >= _iso(cutoff)
+            ),
+            key=lambda task: task.get("completed_at") or "",
+        )
+
+    def project_name(self, project_id: str | None) -> str:
+        """Name of a project, or an empty string if unknown."""
+        project = self._state["projects"].get(project_id or "")
+        return project["name"] if project else ""
+
+    def active_tasks(self) -> list[dict[str, Any]]:
+        """All active tasks, by due date (undated last) and priority."""
+        return sorted(
+            self._state["tasks"].values(),
+            key=lambda t: (_due_date(t) or "9999", -(t.get("priority") or 1)),
+        )
+
+    def tasks_due(self, day: date) -> list[dict[str, Any]]:
+        """Active tasks due on `day` or overdue before it."""
+        return [
+            task
+            for task in self.active_tasks()
+            if (due := _due_date(task)) is not None and due <= day.isoformat()
+        ]
+
+    def completed_since(self, since: date) -> list[dict[str, Any]]:
+        """Tasks completed on local day `since` or later (within retention)."""
+        return [
+            task
+            for task in self._state["completed"]
+            if (day := _completed_day(task)) is not None and day >= since
+        ]
+
+    def format_tasks(self, tasks: list[dict[str, Any]]) -> str:
+        """Plain-text task list for prompts and messages.
+
+        Priorities are shown as in the Todoist app: p1 is the highest
+        (API priority 4).
+        """
+        lines = []
+        for task in tasks:
+            details = [f"p{5 - (task.get('priority') or 1)}"]
+            if due := _due_date(task):
+                details.append(due)
+            if completed := _completed_day(task):
+                details.append(f"done {completed.isoformat()}")
+            if project := self.project_name(task.get("project_id")):
+                details.append(project)
+            lines.append(f"- {task['content']} ({', '.join(details)})")
+        return "\n".join(lines)
@@ -1,47 +1,424 @@
-"""Deepgram transcription service."""
+"""Speech-to-text: Deepgram, a local Whisper model and a router between them.
 
+The local backend needs faster-whisper (the `whisper` extra); without it
+every voice note goes to Deepgram.
+"""
+
+import asyncio
+import io
 import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Literal
+
+import httpx
 
-from deepgram import AsyncDeepgramClient
+try:
+    from faster_whisper import WhisperModel
+except ImportError:  # pragma: no cover - optional dependency
+    WhisperModel = None
 
 logger = logging.getLogger(__name__)
 
+RoutingPolicy = Literal["remote", "local", "auto"]
+
+API_URL = "https://api.deepgram.com"
+LISTEN_PARAMS = {
+    "model": "nova-3",
+    "language": "ru",
+    "punctuate": "true",
+    "smart_format": "true",
+}
+MAX_CONCURRENT = 4
+RETRIES = 3
+BACKOFF = 1.0  # Seconds before the first retry, doubled for each next one
+REQUEST_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Starting points of the latency estimates, refined from observed runs:
+# seconds per request, and seconds of processing per second of audio
+DEEPGRAM_OVERHEAD = 1.5
+DEEPGRAM_REALTIME_FACTOR = 0.05
+LOCAL_OVERHEAD = 0.3
+LOCAL_REALTIME_FACTOR = 0.4  # Whisper "small", int8, a few CPU cores
+LOCAL_MAX_DURATION = 30.0
+RATE_SMOOTHING = 0.2
+
+
+class TranscriptCache:
+    """Transcripts on disk, one file per key (Telegram's `file_unique_id`)."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        # file_unique_id is URL-safe base64, but never trust it as a path
+        return self.directory / (key.replace("/", "_").replace(".", "_") + ".txt")
+
+    def get(self, key: str) -> str | None:
+        """Cached transcript, None if there is none."""
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, transcript: str) -> None:
+        """Store a transcript."""
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(transcript, encoding="utf-8")
+        os.replace(tmp_path, path)
 
-class DeepgramTranscriber:
-    """Service for transcribing audio using Deepgram Nova-3."""
 
-    def __init__(self, api_key: str) -> None:
-        self.client = AsyncDeepgramClient(api_key=api_key)
+class Transcriber(ABC):
+    """Speech-to-text backend.
 
-    async def transcribe(self, audio_bytes: bytes) -> str:
+    Backends count the audio they are working on and learn how fast they
+    are, so `estimate` can tell how long a new voice note would take,
+    queueing included. Subclasses implement `_transcribe` and report the
+    time of the actual work with `_observe`.
+    """
+
+    name = "transcriber"
+
+    def __init__(
+        self, overhead: float, realtime_factor: float, concurrency: int
+    ) -> None:
+        self.overhead = overhead
+        self.realtime_factor = realtime_factor
+        self.concurrency = max(concurrency, 1)
+        self._pending = 0
+        self._pending_audio = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Voice notes queued or being transcribed."""
+        return self._pending
+
+    def estimate(self, duration: float) -> float:
+        """Expected seconds until a new voice note would be transcribed.
+
+        Args:
+            duration: Length of the audio in seconds
+        """
+        wait = 0.0
+        if self._pending >= self.concurrency:
+            average = self._pending_audio / self._pending
+            ahead = self._pending - self.concurrency + 1
+            job = self.overhead + average * self.realtime_factor
+            wait = ahead / self.concurrency * job
+        return wait + self.overhead + duration * self.realtime_factor
+
+    async def transcribe(self, audio_bytes: bytes, duration: float = 0.0) -> str:
         """Transcribe audio bytes to text.
 
         Args:
             audio_bytes: Audio file content
+            duration: Length of the audio in seconds, if known
 
         Returns:
             Transcribed text
-
-        Raises:
-            Exception: If transcription fails
         """
-        logger.info("Starting transcription, audio size: %d bytes", len(audio_bytes))
-
-        response = await self.client.listen.v1.media.transcribe_file(
-            request=audio_bytes,
-            model="nova-3",
-            language="ru",
-            punctuate=True,
-            smart_format=True,
-        )
+        self._pending += 1
+        self._pending_audio += duration
+        try:
+            return await self._transcribe(audio_bytes, duration)
+        finally:
+            self._pending -= 1
+            self._pending_audio -= duration
+
+    @abstractmethod
+    async def _transcribe(self, audio_bytes: bytes, duration: float) -> str:
+        """Transcribe without the queue accounting of `transcribe`."""
+
+    def _observe(self, duration: float, elapsed: float) -> None:
+        """Refine the realtime factor from a finished transcription."""
+        if duration <= 0:
+            return
+        rate = max(elapsed - self.overhead, 0.0) / duration
+        self.realtime_factor += RATE_SMOOTHING * (rate - self.realtime_factor)
+
+    async def close(self) -> None:  # noqa: B027 - optional for subclasses
+        """Release connections or workers."""
+
+
+class DeepgramTranscriber(Transcriber):
+    """Service for transcribing audio using Deepgram Nova-3.
+
+    One pooled HTTP client is shared by all requests, and at most
+    `max_concurrent` of them are in flight; a burst of voice notes waits
+    for a slot instead of opening a connection each. Timeouts, 429s and
+    5xx responses are retried `retries` times with exponential backoff.
+    """
+
+    name = "deepgram"
 
-        transcript = (
-            response.results.channels[0].alternatives[0].transcript
-            if response.results
-            and response.results.channels
-            and response.results.channels[0].alternatives
-            else ""
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = API_URL,
+        max_concurrent: int = MAX_CONCURRENT,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        super().__init__(DEEPGRAM_OVERHEAD, DEEPGRAM_REALTIME_FACTOR, max_concurrent)
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=api_url.rstrip("/"),
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_concurrent,
+                max_keepalive_connections=max_concurrent,
+            ),
+            transport=transport,
         )
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self._client.aclose()
+
+    async def _transcribe(self, audio_bytes: bytes, duration: float) -> str:
+        async with self._semaphore:
+            logger.info(
+                "Starting transcription, audio size: %d bytes", len(audio_bytes)
+            )
+            started = time.monotonic()
+            response = await self._request(audio_bytes)
+            self._observe(duration, time.monotonic() - started)
+
+        data = response.json()
+        channels = (data.get("results") or {}).get("channels") or []
+        alternatives = (channels[0].get("alternatives") or []) if channels else []
+        transcript = alternatives[0].get("transcript", "") if alternatives else ""
 
         logger.info("Transcription complete: %d chars", len(transcript))
         return transcript
+
+    async def _request(self, audio_bytes: bytes) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.post(
+                    "/v1/listen",
+                    params=LISTEN_PARAMS,
+                    headers={"Authorization": f"Token {self.api_key}"},
+                    content=audio_bytes,
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                error: httpx.HTTPError = httpx.HTTPStatusError(
+                    f"Deepgram returned {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+            except httpx.TransportError as e:  # Including timeouts
+                error = e
+
+            if attempt >= self.retries:
+                raise error
+            delay = self.backoff * 2**attempt * random.uniform(0.8, 1.2)
+            attempt += 1
+            logger.warning(
+                "Transcription failed (%s), retry %d in %.1fs", error, attempt, delay
+            )
+            await asyncio.sleep(delay)
+
+
+class LocalWhisperTranscriber(Transcriber):
+    """Offline transcription with a quantized Whisper model on the CPU.
+
+    Uses faster-whisper (CTranslate2, int8 by default). The model is
+    loaded on first use and runs in `workers` threads; CTranslate2 releases
+    the GIL, so the event loop is never blocked.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str = "small",
+        language: str = "ru",
+        compute_type: str = "int8",
+        threads: int = 0,
+        workers: int = 1,
+    ) -> None:
+        super().__init__(LOCAL_OVERHEAD, LOCAL_REALTIME_FACTOR, workers)
+        self.model = model
+        self.language = language
+        self.compute_type = compute_type
+        self.threads = threads
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="whisper"
+        )
+        self._model: Any = None
+        self._model_lock = threading.Lock()
+
+    @staticmethod
+    def is_available() -> bool:
+        """Whether faster-whisper is installed."""
+        return WhisperModel is not None
+
+    def _load(self) -> Any:
+        with self._model_lock:
+            if self._model is None:
+                logger.info("Loading Whisper model %s", self.model)
+                self._model = WhisperModel(
+                    self.model,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.threads,
+                    num_workers=self.concurrency,
+                )
+            return self._model
+
+    def _run(self, audio_bytes: bytes, duration: float) -> str:
+        model = self._load()
+        started = time.monotonic()
+        segments, _ = model.transcribe(
+            io.BytesIO(audio_bytes), language=self.language, vad_filter=True
+        )
+        transcript = " ".join(segment.text.strip() for segment in segments).strip()
+        self._observe(duration, time.monotonic() - started)
+        return transcript
+
+    async def _transcribe(self, audio_bytes: bytes, duration: float) -> str:
+        logger.info("Starting local transcription, audio: %.0fs", duration)
+        loop = asyncio.get_running_loop()
+        transcript = await loop.run_in_executor(
+            self._executor, self._run, audio_bytes, duration
+        )
+        logger.info("Local transcription complete: %d chars", len(transcript))
+        return transcript
+
+    async def close(self) -> None:
+        """Stop the worker threads once running transcriptions are done."""
+        self._executor.shutdown(wait=False)
+
+
+class TranscriptionRouter:
+    """Sends each voice note to a backend by duration, queue depth and policy.
+
+    Policies:
+    - "remote": always Deepgram;
+    - "local": always the local model, Deepgram if it fails;
+    - "auto": notes up to `local_max_duration` seconds stay local unless
+      its queue would make them slower than Deepgram; longer ones go to
+      whichever backend is estimated to finish first. The other backend
+      is the fallback.
+
+    Transcripts of keyed audio are kept in `cache`, so a forwarded or
+    re-sent voice note is not transcribed again, and concurrent requests
+    for the same key share one transcription.
+    """
+
+    def __init__(
+        self,
+        remote: DeepgramTranscriber,
+        local: Transcriber | None = None,
+        cache: TranscriptCache | None = None,
+        policy: RoutingPolicy = "remote",
+        local_max_duration: float = LOCAL_MAX_DURATION,
+    ) -> None:
+        self.remote = remote
+        self.local = local
+        self.cache = cache
+        self.policy = policy
+        self.local_max_duration = local_max_duration
+        self._in_flight: dict[str, asyncio.Future[str]] = {}
+
+    def route(self, duration: float) -> list[Transcriber]:
+        """Backends to try for a voice note, in order.
+
+        Args:
+            duration: Length of the audio in seconds
+        """
+        local, remote = self.local, self.remote
+        if local is None or self.policy == "remote":
+            return [remote]
+        if self.policy == "local":
+            return [local, remote]
+        if duration <= self.local_max_duration and (
+            local.queue_depth < local.concurrency
+            or local.estimate(duration) <= remote.estimate(duration)
+        ):
+            return [local, remote]
+        return sorted([local, remote], key=lambda backend: backend.estimate(duration))
+
+    def cached(self, key: str) -> str | None:
+        """Transcript of earlier audio with this key, to skip its download."""
+        return self.cache.get(key) if self.cache else None
+
+    async def transcribe(
+        self, audio_bytes: bytes, duration: float = 0.0, key: str | None = None
+    ) -> str:
+        """Transcribe audio bytes to text.
+
+        Args:
+            audio_bytes: Audio file content
+            duration: Length of the audio in seconds (Telegram reports it)
+            key: Stable ID of the audio (e.g. file_unique_id) for caching
+
+        Returns:
+            Transcribed text
+
+        Raises:
+            Exception: If every backend failed
+        """
+        if key is None:
+            return await self._transcribe(audio_bytes, duration)
+
+        if (transcript := self.cached(key)) is not None:
+            logger.info("Transcript of %s found in cache", key)
+            return transcript
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            transcript = await self._transcribe(audio_bytes, duration)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._in_flight[key]
+        future.set_result(transcript)
+        if transcript and self.cache:
+            self.cache.put(key, transcript)
+        return transcript
+
+    async def _transcribe(self, audio_bytes: bytes, duration: float) -> str:
+        backends = self.route(duration)
+        # Every backend but the last one has a fallback
+        for backend, fallback in zip(backends, backends[1:], strict=False):
+            try:
+                return await backend.transcribe(audio_bytes, duration)
+            except Exception as e:
+                logger.warning(
+                    "%s transcription failed (%s), trying %s",
+                    backend.name,
+                    e,
+                    fallback.name,
+                )
+        return await backends[-1].transcribe(audio_bytes, duration)
+
+    async def close(self) -> None:
+        """Close all backends."""
+        await self.remote.close()
+        if self.local is not None:
+            await self.local.close()
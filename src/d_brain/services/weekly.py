@@ -0,0 +1,128 @@
+"""Local pre-aggregation of a week of vault data for the weekly digest."""
+
+import logging
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from d_brain.services.daily import PROCESSED_MARKER, parse_daily
+from d_brain.services.session import SessionStore
+
+logger = logging.getLogger(__name__)
+
+WEEK_DAYS = 7
+MAX_ENTRY_CHARS = 300
+
+# Headings, quotes and checkbox tasks of goals/3-weekly.md
+GOAL_LINE = re.compile(r"^(#{1,3} |> |- \[[ xX]\] )")
+
+
+def week_days(end: date) -> list[date]:
+    """The 7 days ending with `end`, oldest first."""
+    return [end - timedelta(days=offset) for offset in reversed(range(WEEK_DAYS))]
+
+
+def _format_day(vault_path: Path, day: date, summary: str | None = None) -> list[str]:
+    daily_file = vault_path / "daily" / f"{day.isoformat()}.md"
+    if not daily_file.exists():
+        return [f"### {day.isoformat()}", "(нет записей)"]
+
+    entries = parse_daily(daily_file.read_text(encoding="utf-8"))
+    counts = Counter(entry.kind or "other" for entry in entries)
+    by_type = ", ".join(f"{kind}: {count}" for kind, count in counts.most_common())
+    lines = [f"### {day.isoformat()} ({by_type or 'нет записей'})"]
+    if summary is not None:
+        lines.append(summary.strip())
+        return lines
+
+    for entry in entries:
+        body = entry.text.split("\n", 1)[1] if "\n" in entry.text else ""
+        body = " ".join(body.replace(PROCESSED_MARKER, "").split())
+        if len(body) > MAX_ENTRY_CHARS:
+            body = body[:MAX_ENTRY_CHARS] + "…"
+        lines.append(f"- {entry.time} [{entry.kind}] {body}")
+    return lines
+
+
+def _goal_lines(vault_path: Path) -> list[str]:
+    goals_file = vault_path / "goals" / "3-weekly.md"
+    if not goals_file.exists():
+        return ["(нет файла)"]
+    return [
+        line.rstrip()
+        for line in goals_file.read_text(encoding="utf-8").splitlines()
+        if GOAL_LINE.match(line)
+    ]
+
+
+def _new_thoughts(vault_path: Path, since: date) -> list[str]:
+    thoughts_dir = vault_path / "thoughts"
+    if not thoughts_dir.exists():
+        return []
+    cutoff = datetime.combine(since, datetime.min.time()).timestamp()
+    return sorted(
+        str(path.relative_to(vault_path))
+        for path in thoughts_dir.rglob("*.md")
+        if path.stat().st_mtime >= cutoff
+    )
+
+
+def _session_stats(session: SessionStore) -> Counter[str]:
+    stats: Counter[str] = Counter()
+    for user_id in session.list_users():
+        stats.update(session.get_stats(user_id, days=WEEK_DAYS))
+    return stats
+
+
+def build_week_bundle(
+    vault_path: Path,
+    end: date,
+    session: SessionStore | None = None,
+    day_summaries: dict[date, str] | None = None,
+) -> str:
+    """Collect the week's data into a compact text block for the prompt.
+
+    Holds the entries of every daily file by day and type, bot usage from
+    the session logs, goal lines of goals/3-weekly.md and the notes under
+    thoughts/ changed during the week, so Claude does not have to read
+    them through tool calls.
+
+    Args:
+        vault_path: Path to the vault
+        end: Last day of the week (inclusive)
+        session: Session store for usage stats (skipped if None)
+        day_summaries: Summaries that replace the raw entries of their days
+
+    Returns:
+        Bundle text
+    """
+    vault_path = Path(vault_path)
+    days = week_days(end)
+
+    lines = [f"=== НЕДЕЛЯ {days[0].isoformat()} — {end.isoformat()} ===", ""]
+    lines.append("## Записи по дням")
+    for day in days:
+        lines.extend(_format_day(vault_path, day, (day_summaries or {}).get(day)))
+    lines.append("")
+
+    if session is not None:
+        stats = _session_stats(session)
+        lines.append("## Активность в боте")
+        lines.append(
+            ", ".join(f"{kind}: {count}" for kind, count in stats.most_common())
+            or "(нет данных)"
+        )
+        lines.append("")
+
+    lines.append("## Цели недели (goals/3-weekly.md)")
+    lines.extend(_goal_lines(vault_path))
+    lines.append("")
+
+    lines.append("## Новые и изменённые заметки в thoughts/")
+    lines.extend(f"- {path}" for path in _new_thoughts(vault_path, days[0]))
+    lines.append("=== КОНЕЦ НЕДЕЛИ ===")
+
+    bundle = "\n".join(lines)
+    logger.info("Week bundle built: %d chars", len(bundle))
+    return bundle
@@ -0,0 +1,118 @@
+"""McpBridge against a tiny stdio MCP server."""
+
+import json
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from d_brain.services.mcp_bridge import McpBridge
+
+# Answers initialize and ping, echoes the arguments of every tool call
+ECHO_SERVER = """\
+import json, sys
+
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" not in message:
+        continue
+    if message["method"] == "initialize":
+        result = {"protocolVersion": "2025-06-18", "capabilities": {"tools": {}},
+                  "serverInfo": {"name": "echo", "version": "1"}}
+    elif message["method"] == "tools/call":
+        result = {"content": [{"type": "text",
+                               "text": json.dumps(message["params"]["arguments"])}]}
+    else:
+        result = {}
+    print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}),
+          flush=True)
+"""
+
+
+@pytest.fixture
+async def bridge(tmp_path: Path) -> AsyncIterator[McpBridge]:
+    script = tmp_path / "echo_server.py"
+    script.write_text(ECHO_SERVER, encoding="utf-8")
+    source = tmp_path / "mcp-config.json"
+    source.write_text(
+        json.dumps(
+            {"mcpServers": {"echo": {"command": sys.executable, "args": [str(script)]}}}
+        ),
+        encoding="utf-8",
+    )
+    bridge = McpBridge(
+        source,
+        tmp_path / "bridged.json",
+        token_path=tmp_path / "token",
+    )
+    await bridge.start()
+    assert await bridge.servers["echo"].wait_ready(timeout=10)
+    yield bridge
+    await bridge.stop()
+
+
+def _server_config(bridge: McpBridge) -> dict[str, Any]:
+    config = json.loads(bridge.config_path.read_text(encoding="utf-8"))
+    server: dict[str, Any] = config["mcpServers"]["echo"]
+    return server
+
+
+async def test_forwards_requests_with_token(bridge: McpBridge) -> None:
+    server = _server_config(bridge)
+    assert server["type"] == "http"
+    async with httpx.AsyncClient(headers=server["headers"]) as client:
+        response = await client.post(
+            server["url"],
+            json={"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        )
+        assert response.status_code == 200
+        assert response.headers["mcp-session-id"]
+        assert response.json()["result"]["serverInfo"]["name"] == "echo"
+
+        response = await client.post(
+            server["url"],
+            json={
+                "jsonrpc": "2.0",
+                "id": "call-7",
+                "method": "tools/call",
+                "params": {"name": "echo", "arguments": {"text": "привет"}},
+            },
+        )
+        message = response.json()
+        assert message["id"] == "call-7"  # Client IDs survive the rewrite
+        assert json.loads(message["result"]["content"][0]["text"]) == {"text": "привет"}
+
+
+async def test_rejects_requests_without_token(bridge: McpBridge) -> None:
+    url = _server_config(bridge)["url"]
+    ping = {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json=ping)
+        assert response.status_code == 401
+        response = await client.post(
+            url, json=ping, headers={"Authorization": "Bearer wrong"}
+        )
+        assert response.status_code == 401
+
+
+async def test_reuses_stored_token(bridge: McpBridge, tmp_path: Path) -> None:
+    assert (tmp_path / "token").read_text(encoding="utf-8") == bridge.token
+    assert bridge.config_path.stat().st_mode & 0o777 == 0o600
+    restarted = McpBridge(tmp_path, tmp_path, token_path=tmp_path / "token")
+    assert restarted._load_token() == bridge.token
+
+
+async def test_probe_with_stored_token(bridge: McpBridge, tmp_path: Path) -> None:
+    # What scripts/process.sh does before choosing the bridge config
+    token = (tmp_path / "token").read_text(encoding="utf-8")
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            _server_config(bridge)["url"],
+            json={"jsonrpc": "2.0", "id": 1, "method": "ping"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert response.status_code == 200
+    assert response.json() == {"jsonrpc": "2.0", "id": 1, "result": {}}
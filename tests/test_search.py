@@ -0,0 +1,63 @@
+"""VaultIndex over a temporary vault."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from d_brain.services.manifest import VaultChanges, VaultManifest
+from d_brain.services.search import VaultIndex
+
+
+@pytest.fixture
+def vault(tmp_path: Path) -> Path:
+    vault = tmp_path / "vault"
+    (vault / "thoughts").mkdir(parents=True)
+    (vault / "thoughts" / "coffee.md").write_text(
+        "---\ntags: [horeca]\n---\n# Coffee shop\n\nEspresso machine prices\n",
+        encoding="utf-8",
+    )
+    return vault
+
+
+@pytest.fixture
+def index(vault: Path, tmp_path: Path) -> Iterator[VaultIndex]:
+    manifest = VaultManifest(vault, tmp_path / "manifest.json")
+    index = VaultIndex(vault, tmp_path / "search.db", manifest)
+    yield index
+    index.close()
+
+
+def _paths(index: VaultIndex, text: str) -> list[str]:
+    return [hit.path for hit in index.search(text)]
+
+
+def test_update_indexes_changes(index: VaultIndex, vault: Path) -> None:
+    assert index.update() == 1
+    assert _paths(index, "espres") == ["thoughts/coffee.md"]
+    assert _paths(index, "#horeca") == ["thoughts/coffee.md"]
+    assert index.update() == 0
+
+    (vault / "thoughts" / "coffee.md").unlink()
+    assert index.update() == 1
+    assert _paths(index, "espresso") == []
+
+
+def test_update_file_during_update(
+    index: VaultIndex, vault: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    note = vault / "thoughts" / "coffee.md"
+    changes_since = index.manifest.changes_since
+
+    def append_while_scanning(checkpoint: int) -> VaultChanges:
+        changes = changes_since(checkpoint)
+        # What append_to_daily does from a handler thread meanwhile; the
+        # scan must not hold the lock update_file needs
+        with note.open("a", encoding="utf-8") as f:
+            f.write("Grinder arrived\n")
+        index.update_file(note)
+        return changes
+
+    monkeypatch.setattr(index.manifest, "changes_since", append_while_scanning)
+    index.update()
+    assert _paths(index, "grinder") == ["thoughts/coffee.md"]
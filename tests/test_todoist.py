@@ -0,0 +1,171 @@
+"""TodoistMirror against a mocked Todoist API."""
+
+import json
+import time
+from collections.abc import Iterator
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from d_brain.services.todoist import COMPLETED_RETENTION_DAYS, TodoistMirror
+
+
+class FakeTodoist:
+    """Answers /sync and completed-task requests, recording what was sent."""
+
+    def __init__(self) -> None:
+        self.sync_responses: list[dict[str, Any]] = []
+        self.completed_pages: list[dict[str, Any]] = []
+        self.sync_requests: list[dict[str, list[str]]] = []
+        self.completed_requests: list[dict[str, str]] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"] == "Bearer key"
+        if request.url.path.endswith("/sync"):
+            self.sync_requests.append(parse_qs(request.content.decode()))
+            return httpx.Response(200, json=self.sync_responses.pop(0))
+        if request.url.path.endswith("/tasks/completed/by_completion_date"):
+            self.completed_requests.append(dict(request.url.params))
+            page = self.completed_pages.pop(0) if self.completed_pages else {}
+            return httpx.Response(200, json={"items": [], **page})
+        return httpx.Response(404)
+
+
+def _item(task_id: str, content: str, **fields: Any) -> dict[str, Any]:
+    return {"id": task_id, "content": content, "priority": 1, **fields}
+
+
+@pytest.fixture
+def api() -> FakeTodoist:
+    return FakeTodoist()
+
+
+@pytest.fixture
+def mirror(api: FakeTodoist, tmp_path: Path) -> TodoistMirror:
+    return TodoistMirror(
+        "key", tmp_path / "todoist.json", transport=httpx.MockTransport(api.handler)
+    )
+
+
+@pytest.fixture
+def local_tz(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Run in UTC+5, so UTC evenings are the next local day."""
+    monkeypatch.setenv("TZ", "Asia/Tashkent")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+async def test_incremental_sync(
+    api: FakeTodoist, mirror: TodoistMirror, tmp_path: Path
+) -> None:
+    api.sync_responses = [
+        {
+            "full_sync": True,
+            "sync_token": "token-1",
+            "items": [_item("1", "Buy milk"), _item("2", "Call mom")],
+            "projects": [{"id": "p1", "name": "Inbox"}],
+        },
+        {
+            "full_sync": False,
+            "sync_token": "token-2",
+            "items": [
+                _item("1", "Buy milk", checked=True),
+                _item("3", "Write report", project_id="p1"),
+            ],
+            "projects": [],
+        },
+    ]
+
+    await mirror.sync()
+    assert api.sync_requests[0]["sync_token"] == ["*"]
+    assert [t["content"] for t in mirror.active_tasks()] == ["Buy milk", "Call mom"]
+
+    await mirror.sync()
+    assert api.sync_requests[1]["sync_token"] == ["token-1"]
+    assert sorted(t["content"] for t in mirror.active_tasks()) == [
+        "Call mom",
+        "Write report",
+    ]
+    assert mirror.project_name("p1") == "Inbox"
+
+    # A restarted mirror continues from the saved sync token
+    saved = json.loads((tmp_path / "todoist.json").read_text(encoding="utf-8"))
+    assert saved["sync_token"] == "token-2"
+    await mirror.stop()
+
+
+async def test_completed_pagination(api: FakeTodoist, mirror: TodoistMirror) -> None:
+    api.sync_responses = [{"full_sync": True, "sync_token": "t", "items": []}]
+    now = datetime.now(UTC)
+    api.completed_pages = [
+        {
+            "items": [_item("1", "First", completed_at=now.isoformat())],
+            "next_cursor": "page-2",
+        },
+        {"items": [_item("2", "Second", completed_at=now.isoformat())]},
+    ]
+
+    await mirror.sync()
+    assert len(api.completed_requests) == 2
+    assert "cursor" not in api.completed_requests[0]
+    assert api.completed_requests[1]["cursor"] == "page-2"
+    completed = mirror.completed_since(date.today() - timedelta(days=1))
+    assert {t["content"] for t in completed} == {"First", "Second"}
+    await mirror.stop()
+
+
+async def test_completed_retention(
+    api: FakeTodoist, mirror: TodoistMirror, tmp_path: Path
+) -> None:
+    now = datetime.now(UTC)
+    old = now - timedelta(days=COMPLETED_RETENTION_DAYS + 1)
+    recent = now - timedelta(days=1)
+    api.sync_responses = [
+        {"full_sync": True, "sync_token": "t1", "items": []},
+        {"full_sync": False, "sync_token": "t2", "items": []},
+    ]
+    api.completed_pages = [
+        {
+            "items": [
+                _item("1", "Old", completed_at=old.isoformat()),
+                _item("2", "Recent", completed_at=recent.isoformat()),
+            ]
+        }
+    ]
+
+    await mirror.sync()
+    assert [t["content"] for t in mirror.completed_since(date.min)] == ["Recent"]
+    first_since = datetime.fromisoformat(api.completed_requests[0]["since"])
+    assert now - first_since >= timedelta(days=COMPLETED_RETENTION_DAYS - 1)
+
+    # Later syncs only ask for what was completed since the previous one
+    await mirror.sync()
+    second_since = datetime.fromisoformat(api.completed_requests[1]["since"])
+    assert now - second_since < timedelta(minutes=1)
+    assert [t["content"] for t in mirror.completed_since(date.min)] == ["Recent"]
+    await mirror.stop()
+
+
+@pytest.mark.usefixtures("local_tz")
+async def test_completed_since_uses_local_day(
+    api: FakeTodoist, mirror: TodoistMirror
+) -> None:
+    # 21:00 UTC is 02:00 of the next day in UTC+5
+    completed_at = datetime.now(UTC).replace(hour=21, minute=0) - timedelta(days=2)
+    local_day = completed_at.astimezone().date()
+    api.sync_responses = [{"full_sync": True, "sync_token": "t", "items": []}]
+    api.completed_pages = [
+        {"items": [_item("1", "Late", completed_at=completed_at.isoformat())]}
+    ]
+
+    await mirror.sync()
+    assert local_day == completed_at.date() + timedelta(days=1)
+    assert [t["content"] for t in mirror.completed_since(local_day)] == ["Late"]
+    assert mirror.completed_since(local_day + timedelta(days=1)) == []
+    await mirror.stop()
@@ -0,0 +1,82 @@
+"""Deepgram transcription against a mocked API."""
+
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import httpx
+import pytest
+
+from d_brain.services.transcription import (
+    DeepgramTranscriber,
+    TranscriptCache,
+    TranscriptionRouter,
+)
+
+
+class FakeDeepgram:
+    """Answers /v1/listen, failing with `statuses` first."""
+
+    def __init__(self, *statuses: int) -> None:
+        self.statuses = list(statuses)
+        self.requests: list[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.url.path == "/v1/listen"
+        assert request.headers["authorization"] == "Token key"
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0))
+        transcript = {"transcript": f"{len(request.content)} bytes"}
+        results = {"channels": [{"alternatives": [transcript]}]}
+        return httpx.Response(200, json={"results": results})
+
+
+@pytest.fixture
+def api() -> FakeDeepgram:
+    return FakeDeepgram(429, 429)
+
+
+@pytest.fixture
+async def deepgram(api: FakeDeepgram) -> AsyncIterator[DeepgramTranscriber]:
+    transcriber = DeepgramTranscriber(
+        "key", retries=3, backoff=0, transport=httpx.MockTransport(api.handler)
+    )
+    yield transcriber
+    await transcriber.close()
+
+
+async def test_retries_rate_limits_until_success(
+    api: FakeDeepgram, deepgram: DeepgramTranscriber
+) -> None:
+    assert await deepgram.transcribe(b"audio", 2.0) == "5 bytes"
+    assert len(api.requests) == 3
+    assert deepgram.queue_depth == 0
+
+
+async def test_gives_up_after_retries(api: FakeDeepgram) -> None:
+    api.statuses = [429] * 3
+    transcriber = DeepgramTranscriber(
+        "key", retries=2, backoff=0, transport=httpx.MockTransport(api.handler)
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        await transcriber.transcribe(b"audio")
+    assert len(api.requests) == 3
+    await transcriber.close()
+
+
+async def test_cached_transcript_skips_request(
+    api: FakeDeepgram, deepgram: DeepgramTranscriber, tmp_path: Path
+) -> None:
+    router = TranscriptionRouter(deepgram, cache=TranscriptCache(tmp_path))
+    assert router.cached("voice-1") is None
+
+    assert await router.transcribe(b"audio", 2.0, key="voice-1") == "5 bytes"
+    requests = len(api.requests)
+    assert router.cached("voice-1") == "5 bytes"
+    assert await router.transcribe(b"other", 2.0, key="voice-1") == "5 bytes"
+    assert len(api.requests) == requests
+
+    # A new router (e.g. after a restart) reads the same cache
+    restarted = TranscriptionRouter(deepgram, cache=TranscriptCache(tmp_path))
+    assert await restarted.transcribe(b"audio", 2.0, key="voice-1") == "5 bytes"
+    assert len(api.requests) == requests